@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Measure the instrumentation overhead of logging a cycle event.
+
+Usage::
+
+    python scripts/bench_instrumentation.py --events 500
+
+The monitor is started without GPIO and logs ``--events`` simulated events
+twice.  The first pass times the events.  The second counts every counter,
+gauge and histogram update the monitor makes, on the capture path and in the
+writer thread.  That mix of updates is then timed on a private registry and
+reported as a share of the cost of one event.
+
+Everything is written to a temporary configuration directory, selected
+before the package is imported, so the Pi's real state, metrics, rollups,
+summaries and machine state are not touched.  Run it on the Pi itself for
+representative numbers.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+SCRATCH = Path(tempfile.mkdtemp(prefix="fw-cycle-bench-"))
+os.environ["FW_CYCLE_MONITOR_CONFIG_DIR"] = str(SCRATCH)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from fw_cycle_monitor.config import AppConfig  # noqa: E402
+from fw_cycle_monitor.gpio_monitor import CycleMonitor  # noqa: E402
+from fw_cycle_monitor.instrumentation import Counter, Gauge, Histogram, Registry  # noqa: E402
+
+UPDATES = (("counter", Counter, "inc"), ("gauge", Gauge, "set"), ("histogram", Histogram, "observe"))
+
+
+def _count_updates(run: Callable[[], None]) -> Dict[str, int]:
+    counts = {kind: 0 for kind, _, _ in UPDATES}
+    lock = threading.Lock()
+    originals = {}
+    for kind, cls, method in UPDATES:
+        original = getattr(cls, method)
+        originals[(cls, method)] = original
+
+        def counted(self, *args, _original=original, _kind=kind, **kwargs):
+            with lock:
+                counts[_kind] += 1
+            return _original(self, *args, **kwargs)
+
+        setattr(cls, method, counted)
+    try:
+        run()
+    finally:
+        for (cls, method), original in originals.items():
+            setattr(cls, method, original)
+    return counts
+
+
+def _update_costs(rounds: int) -> Dict[str, float]:
+    registry = Registry()
+    counter = registry.counter("bench_events", "benchmark")
+    gauge = registry.gauge("bench_depth", "benchmark")
+    histogram = registry.histogram("bench_latency", "benchmark")
+    calls = {"counter": counter.inc, "gauge": lambda: gauge.set(1), "histogram": lambda: histogram.observe(0.001)}
+    costs = {}
+    for kind, call in calls.items():
+        began = time.perf_counter()
+        for _ in range(rounds):
+            call()
+        costs[kind] = (time.perf_counter() - began) / rounds
+    return costs
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=500, help="simulated events per pass")
+    parser.add_argument("--rounds", type=int, default=100000, help="timed calls per update type")
+    args = parser.parse_args(argv)
+
+    try:
+        monitor = CycleMonitor(AppConfig(machine_id="BENCH", csv_directory=SCRATCH / "csv"))
+        monitor.start(gpio=False)
+        monitor.simulate_event()
+        began = time.perf_counter()
+        for _ in range(args.events):
+            monitor.simulate_event()
+        event_cost = (time.perf_counter() - began) / args.events
+
+        def counted_pass() -> None:
+            for _ in range(args.events):
+                monitor.simulate_event()
+            monitor.stop()
+
+        counts = _count_updates(counted_pass)
+    finally:
+        shutil.rmtree(SCRATCH, ignore_errors=True)
+
+    costs = _update_costs(args.rounds)
+    per_event = {kind: counts[kind] / args.events for kind in counts}
+    instrumentation_cost = sum(per_event[kind] * costs[kind] for kind in per_event)
+
+    mix = ", ".join(f"{per_event[kind]:.1f} {kind}" for kind in per_event)
+    print(f"Instrument updates per event:   {mix}")
+    print(f"Instrumentation cost per event: {instrumentation_cost * 1e6:.2f} us")
+    print(f"Logged event cost:              {event_cost * 1e6:.2f} us")
+    print(f"Overhead:                       {100.0 * instrumentation_cost / event_cost:.3f} %")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
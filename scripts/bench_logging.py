@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Compare the per-event logging cost on the capture path before and after the queue.
+
+Usage::
+
+    python scripts/bench_logging.py --events 20000
+
+Each scenario logs the service's per-cycle ``"Cycle logged at %s"`` message
+``--events`` times from one thread and reports the time spent in the logging
+call itself, which is what the GPIO callback pays:
+
+* ``sync-text`` – ``logging.basicConfig`` writing to a file, as the service
+  did before, so every call formats and writes the line;
+* ``queue-<format>`` – :func:`fw_cycle_monitor.log_pipeline.configure_logging`,
+  where the call only runs the rate-limit check and enqueues the record.  The
+  rate limit is lifted so every record is queued and written.
+
+Output goes to a temporary file (or journald for ``queue-journal`` when its
+socket exists), and the listener is drained before the next scenario.  Run it
+on the Pi itself for representative numbers.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from fw_cycle_monitor import log_pipeline  # noqa: E402
+
+LOGGER = logging.getLogger("fw_cycle_monitor.service_runner")
+
+
+def _reset_root() -> None:
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+
+def _measure(events: int) -> List[float]:
+    timestamp = datetime.now(timezone.utc).isoformat()
+    samples: List[float] = []
+    for _ in range(events):
+        started = time.perf_counter()
+        LOGGER.info("Cycle logged at %s", timestamp)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _sync_text(events: int, stream) -> List[float]:
+    _reset_root()
+    logging.basicConfig(level=logging.INFO, format=log_pipeline.TEXT_FORMAT, stream=stream, force=True)
+    return _measure(events)
+
+
+def _queued(format_name: str) -> Callable[[int, object], List[float]]:
+    def run(events: int, stream) -> List[float]:
+        _reset_root()
+        sys.stderr, original = stream, sys.stderr
+        try:
+            listener = log_pipeline.configure_logging(logging.INFO, format_name)
+        finally:
+            sys.stderr = original
+        for handler in logging.getLogger().handlers:
+            handler.filters.clear()
+        try:
+            return _measure(events)
+        finally:
+            listener.stop()
+
+    return run
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20000, help="log calls per scenario")
+    args = parser.parse_args(argv)
+
+    scenarios = [("sync-text", _sync_text), ("queue-text", _queued("text")), ("queue-json", _queued("json"))]
+    if os.path.exists(log_pipeline.JOURNAL_SOCKET):
+        scenarios.append(("queue-journal", _queued("journal")))
+
+    print(f"{'scenario':14s} {'mean us':>9s} {'p99 us':>9s} {'max us':>9s}")
+    with tempfile.TemporaryDirectory() as scratch:
+        for name, run in scenarios:
+            with open(Path(scratch) / f"{name}.log", "w") as stream:
+                samples = sorted(run(args.events, stream))
+            mean = sum(samples) / len(samples)
+            p99 = samples[int(len(samples) * 0.99) - 1]
+            print(f"{name:14s} {mean * 1e6:9.2f} {p99 * 1e6:9.2f} {samples[-1] * 1e6:9.2f}")
+    _reset_root()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Compare CPU time per request for the supervisor's response encodings.
+
+Usage::
+
+    python scripts/bench_supervisor_encoding.py --events 5000 --iterations 50
+
+The payload mimics ``/history/events``.  Each row of the output is one way of
+turning it into a response body:
+
+* ``fastapi-default`` – ``jsonable_encoder`` followed by ``json.dumps``, which
+  is what FastAPI does for a plain ``dict`` return value;
+* ``pydantic-items`` – one pydantic model per event, as a ``response_model``
+  with a list of items would build;
+* ``json``/``orjson``/``msgpack`` – :func:`serialise` from
+  ``fw_cycle_monitor.remote_supervisor.encoding``, optionally followed by gzip
+  or brotli as negotiated for bodies above the compression threshold.
+
+Run it on the Pi itself; a desktop CPU hides most of the difference.  Rows for
+libraries that are not installed are skipped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from fw_cycle_monitor.remote_supervisor import encoding  # noqa: E402
+
+
+def _payload(count: int) -> Dict[str, Any]:
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    events: List[Dict[str, Any]] = []
+    for index in range(count):
+        timestamp = start + timedelta(seconds=21.5 * index)
+        events.append(
+            {
+                "timestamp": timestamp.isoformat(),
+                "cycle_number": index + 1,
+                "cycle_seconds": 21.5 if index else None,
+            }
+        )
+    return {"machine_id": "M201", "count": count, "events": events}
+
+
+def _fastapi_default(payload: Dict[str, Any]) -> bytes:
+    from fastapi.encoders import jsonable_encoder
+
+    return json.dumps(jsonable_encoder(payload)).encode("utf-8")
+
+
+def _pydantic_items(payload: Dict[str, Any]) -> bytes:
+    from pydantic import BaseModel
+
+    class Event(BaseModel):
+        timestamp: str
+        cycle_number: int
+        cycle_seconds: Optional[float] = None
+
+    class Page(BaseModel):
+        machine_id: str
+        count: int
+        events: List[Event]
+
+    return Page(**payload).model_dump_json().encode("utf-8")
+
+
+def _encoder(name: str) -> Optional[Callable[[Dict[str, Any]], bytes]]:
+    if name == "json":
+        return lambda payload: json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    if name == "orjson":
+        if encoding._get_orjson() is None:
+            return None
+        return lambda payload: encoding.serialise(payload)
+    if name == "msgpack":
+        if encoding._get_msgpack() is None:
+            return None
+        return lambda payload: encoding.serialise(payload, encoding.MSGPACK_MEDIA_TYPES[0])
+    raise ValueError(name)
+
+
+def _compressor(name: str) -> Optional[Callable[[bytes], bytes]]:
+    if name == "identity":
+        return lambda body: body
+    if name == "gzip":
+        return lambda body: gzip.compress(body, compresslevel=encoding.GZIP_LEVEL, mtime=0)
+    if name == "br":
+        brotli = encoding._get_brotli()
+        if brotli is None:
+            return None
+        return lambda body: brotli.compress(body, quality=encoding.BROTLI_QUALITY)
+    raise ValueError(name)
+
+
+def _measure(render: Callable[[], bytes], iterations: int) -> tuple[float, int]:
+    body = render()  # warm-up, and the size to report
+    started = time.process_time()
+    for _ in range(iterations):
+        render()
+    return (time.process_time() - started) / iterations, len(body)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=5000, help="events in the payload")
+    parser.add_argument("--iterations", type=int, default=50, help="renders per measurement")
+    args = parser.parse_args(argv)
+
+    payload = _payload(args.events)
+    rows: List[tuple[str, float, int]] = []
+    for name, render in (("fastapi-default", _fastapi_default), ("pydantic-items", _pydantic_items)):
+        try:
+            cpu, size = _measure(lambda: render(payload), args.iterations)
+        except ImportError:
+            continue
+        rows.append((name, cpu, size))
+
+    for encoder_name in ("json", "orjson", "msgpack"):
+        encoder = _encoder(encoder_name)
+        if encoder is None:
+            continue
+        for coding in ("identity", "gzip", "br"):
+            compress = _compressor(coding)
+            if compress is None:
+                continue
+            cpu, size = _measure(lambda: compress(encoder(payload)), args.iterations)
+            rows.append((f"{encoder_name}+{coding}", cpu, size))
+
+    baseline = rows[0][1] if rows else None
+    print(f"{'encoding':18s} {'cpu ms/request':>15s} {'body bytes':>12s} {'vs first':>9s}")
+    for name, cpu, size in rows:
+        ratio = f"{baseline / cpu:8.1f}x" if baseline and cpu else "       -"
+        print(f"{name:18s} {cpu * 1000:15.2f} {size:12d} {ratio}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
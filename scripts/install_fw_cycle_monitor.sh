@@ -276,6 +276,7 @@ Environment=FW_CYCLE_MONITOR_CONFIG_DIR=${CONFIG_HOME}
 Environment=FW_CYCLE_MONITOR_INSTALL_EXTRAS=${INSTALL_EXTRAS}
 Environment=PYTHONPATH=${INSTALL_DIR}/src
 ExecStart=${VENV_BIN}/python -m fw_cycle_monitor.service_runner
+ExecReload=/bin/kill -HUP \$MAINPID
 Restart=on-failure
 RestartSec=5
 
@@ -380,7 +381,7 @@ configure_sudoers_for_remote_supervisor() {
     local sudoers_file="/etc/sudoers.d/fw-cycle-monitor"
 
     cat > "${sudoers_file}" <<SUDOERS
-${INSTALL_USER} ALL=(ALL) NOPASSWD: /bin/systemctl start fw-cycle-monitor.service, /bin/systemctl stop fw-cycle-monitor.service, /bin/systemctl restart fw-cycle-monitor.service, /bin/systemctl status fw-cycle-monitor.service, /bin/systemctl start fw-remote-supervisor.service, /bin/systemctl stop fw-remote-supervisor.service, /bin/systemctl restart fw-remote-supervisor.service, /bin/systemctl status fw-remote-supervisor.service, /bin/systemctl is-active fw-remote-supervisor.service, /usr/sbin/shutdown
+${INSTALL_USER} ALL=(ALL) NOPASSWD: /bin/systemctl start fw-cycle-monitor.service, /bin/systemctl stop fw-cycle-monitor.service, /bin/systemctl restart fw-cycle-monitor.service, /bin/systemctl reload fw-cycle-monitor.service, /bin/systemctl status fw-cycle-monitor.service, /bin/systemctl start fw-remote-supervisor.service, /bin/systemctl stop fw-remote-supervisor.service, /bin/systemctl restart fw-remote-supervisor.service, /bin/systemctl status fw-remote-supervisor.service, /bin/systemctl is-active fw-remote-supervisor.service, /usr/sbin/shutdown
 SUDOERS
 
     chmod 0440 "${sudoers_file}"
@@ -1,6 +1,19 @@
-"""Module entry point to launch the GUI directly."""
+"""Module entry point: ``replay`` runs the CSV replay tool, anything else the GUI."""
+
+import sys
+
+
+def main() -> int:
+    if sys.argv[1:2] == ["replay"]:
+        # Dispatched before anything else is imported: replay redirects the
+        # configuration directory, and the GUI would also need tkinter.
+        from .replay import main as replay_main
+
+        return replay_main(sys.argv[2:])
+    from .gui import main as gui_main
+
+    return gui_main()
 
-from .gui import main
 
 if __name__ == "__main__":  # pragma: no cover
-    main()
+    sys.exit(main())
@@ -0,0 +1,333 @@
+"""Streaming anomaly detection on cycle times.
+
+:class:`AnomalyDetector` is fed every cycle event by the monitor and keeps a
+fixed handful of numbers, so each event costs the same no matter how long
+the press has been running:
+
+* a fast EWMA of the cycle time and its variance flags **outliers**, single
+  cycles more than ``outlier_sigmas`` standard deviations from recent
+  behaviour;
+* a two-sided CUSUM against a slowly adapting baseline flags **drift**, a
+  sustained shift of the cycle time (a worn tool, a temperature issue) that
+  is too gradual to show up in the rolling averages.
+
+Both checks run on the cycle that completes the anomaly.  Gaps longer than
+``idle_threshold_seconds`` are stops, not cycles, and are left to the machine
+state tracker.  The first :data:`WARMUP_CYCLES` cycles only train the model.
+
+Alerts and the detector state are published to ``anomalies.json`` in the
+configuration directory; the remote supervisor serves them on ``/anomalies``.
+The saved state is restored on start-up so a service restart does not need
+to warm up again.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from .config import CONFIG_DIR, AppConfig, ensure_config_dir
+from .instrumentation import REGISTRY
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["AnomalyDetector", "DetectorSettings", "load_anomalies"]
+
+ALERTS_PATH = CONFIG_DIR / "anomalies.json"
+PUBLISH_INTERVAL_SECONDS = 60.0
+WARMUP_CYCLES = 30
+MAX_ALERTS = 100
+#: EWMA weights of the fast (outlier) and slow (drift baseline) models.
+FAST_ALPHA = 0.1
+BASELINE_ALPHA = 0.002
+#: CUSUM allowance in standard deviations; shifts smaller than this are ignored.
+CUSUM_ALLOWANCE = 0.75
+#: The standard deviation is never taken below this share of the mean, so a
+#: very consistent press does not alert on jitter of a few milliseconds.
+MIN_RELATIVE_SIGMA = 0.02
+
+_ALERTS = {
+    kind: REGISTRY.counter("fw_cycle_monitor_anomalies", "Cycle-time anomalies detected.", {"kind": kind})
+    for kind in ("outlier", "drift")
+}
+_CUSUM = {
+    direction: REGISTRY.gauge(
+        "fw_cycle_monitor_cusum", "CUSUM statistic of the cycle time in standard deviations.", {"direction": direction}
+    )
+    for direction in ("up", "down")
+}
+
+
+@dataclass(frozen=True)
+class DetectorSettings:
+    """Thresholds for one sensitivity level."""
+
+    outlier_sigmas: float
+    drift_threshold: float
+
+
+#: Higher sensitivity alerts earlier at the cost of more false alarms.
+SENSITIVITIES: Dict[str, DetectorSettings] = {
+    "low": DetectorSettings(outlier_sigmas=6.0, drift_threshold=12.0),
+    "medium": DetectorSettings(outlier_sigmas=4.5, drift_threshold=8.0),
+    "high": DetectorSettings(outlier_sigmas=3.5, drift_threshold=5.0),
+}
+
+
+class _Ewma:
+    """Exponentially weighted mean and variance."""
+
+    __slots__ = ("alpha", "mean", "variance")
+
+    def __init__(self, alpha: float, mean: Optional[float] = None, variance: float = 0.0) -> None:
+        self.alpha = alpha
+        self.mean = mean
+        self.variance = variance
+
+    def update(self, value: float) -> None:
+        if self.mean is None:
+            self.mean = value
+            return
+        delta = value - self.mean
+        self.mean += self.alpha * delta
+        self.variance = (1 - self.alpha) * (self.variance + self.alpha * delta * delta)
+
+    def sigma(self) -> float:
+        mean = self.mean or 0.0
+        return max(math.sqrt(self.variance), MIN_RELATIVE_SIGMA * mean, 1e-3)
+
+
+class AnomalyDetector:
+    """EWMA outlier and CUSUM drift detector with constant memory per event."""
+
+    def __init__(
+        self,
+        machine_id: str,
+        sensitivity: str = "medium",
+        idle_threshold_seconds: float = 300.0,
+        *,
+        publishing: bool = True,
+    ) -> None:
+        self.machine_id = machine_id
+        self.sensitivity = sensitivity
+        self.settings = SENSITIVITIES.get(sensitivity, SENSITIVITIES["medium"])
+        self.idle_threshold_seconds = idle_threshold_seconds
+        #: Only the process watching the pin should publish alerts.
+        self.publishing = publishing
+        self._lock = threading.Lock()
+        self._fast = _Ewma(FAST_ALPHA)
+        self._baseline = _Ewma(BASELINE_ALPHA)
+        self._cusum_up = 0.0
+        self._cusum_down = 0.0
+        self._cycles = 0
+        self._last_timestamp: Optional[datetime] = None
+        self._alerts: Deque[Dict[str, Any]] = deque(maxlen=MAX_ALERTS)
+        self._last_publish = 0.0
+
+    @classmethod
+    def from_config(cls, config: AppConfig, *, publishing: bool = True) -> "AnomalyDetector":
+        return cls(
+            config.machine_id,
+            config.anomaly_sensitivity,
+            float(config.idle_threshold_seconds),
+            publishing=publishing,
+        )
+
+    # -----------------
+    # Detection
+
+    def observe(self, timestamp: datetime) -> List[Dict[str, Any]]:
+        """Feed the cycle completed at ``timestamp`` and return any new alerts."""
+
+        with self._lock:
+            previous = self._last_timestamp
+            self._last_timestamp = timestamp
+            if previous is None:
+                return []
+            cycle_seconds = (timestamp - previous).total_seconds()
+            if cycle_seconds <= 0 or cycle_seconds > self.idle_threshold_seconds:
+                return []
+            alerts = self._update(timestamp, cycle_seconds)
+            self._alerts.extend(alerts)
+        for alert in alerts:
+            _ALERTS[alert["kind"]].inc()
+            LOGGER.warning(
+                "Cycle-time %s on %s: %.2f s against an expected %.2f s",
+                alert["kind"],
+                self.machine_id,
+                alert["cycle_seconds"],
+                alert["expected_seconds"],
+            )
+        self.publish(force=bool(alerts))
+        return alerts
+
+    def _update(self, timestamp: datetime, cycle_seconds: float) -> List[Dict[str, Any]]:
+        """Run both checks for one cycle (caller holds ``_lock``)."""
+
+        self._cycles += 1
+        if self._cycles <= WARMUP_CYCLES:
+            # Plain running mean and variance, so the models start unbiased.
+            warmup = self._baseline
+            if warmup.mean is None:
+                warmup.mean = cycle_seconds
+            else:
+                delta = cycle_seconds - warmup.mean
+                warmup.mean += delta / self._cycles
+                warmup.variance += (delta * (cycle_seconds - warmup.mean) - warmup.variance) / self._cycles
+            if self._cycles == WARMUP_CYCLES:
+                self._fast = _Ewma(FAST_ALPHA, warmup.mean, warmup.variance)
+            return []
+
+        alerts: List[Dict[str, Any]] = []
+        fast_mean, fast_sigma = self._fast.mean or cycle_seconds, self._fast.sigma()
+        deviation = (cycle_seconds - fast_mean) / fast_sigma
+        limit = self.settings.outlier_sigmas
+        if abs(deviation) > limit:
+            alerts.append(self._alert("outlier", timestamp, cycle_seconds, fast_mean, deviation))
+            # Clip so a single jam does not drag the models along with it.
+            cycle_seconds = fast_mean + math.copysign(limit * fast_sigma, deviation)
+        self._fast.update(cycle_seconds)
+
+        base_mean, base_sigma = self._baseline.mean or cycle_seconds, self._baseline.sigma()
+        z = (cycle_seconds - base_mean) / base_sigma
+        self._cusum_up = max(0.0, self._cusum_up + z - CUSUM_ALLOWANCE)
+        self._cusum_down = max(0.0, self._cusum_down - z - CUSUM_ALLOWANCE)
+        threshold = self.settings.drift_threshold
+        if self._cusum_up > threshold or self._cusum_down > threshold:
+            direction = "up" if self._cusum_up > threshold else "down"
+            alerts.append(
+                self._alert("drift", timestamp, self._fast.mean or cycle_seconds, base_mean, z, direction=direction)
+            )
+            # Accept the new level as the baseline and start watching again.
+            self._baseline.mean = self._fast.mean
+            self._baseline.variance = max(self._baseline.variance, self._fast.variance)
+            self._cusum_up = self._cusum_down = 0.0
+        else:
+            self._baseline.update(cycle_seconds)
+        _CUSUM["up"].set(self._cusum_up)
+        _CUSUM["down"].set(self._cusum_down)
+        return alerts
+
+    def _alert(
+        self,
+        kind: str,
+        timestamp: datetime,
+        cycle_seconds: float,
+        expected_seconds: float,
+        deviation: float,
+        direction: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        if direction is None:
+            direction = "up" if deviation > 0 else "down"
+        return {
+            "kind": kind,
+            "direction": direction,
+            "timestamp": timestamp.isoformat(),
+            "cycle_seconds": round(cycle_seconds, 3),
+            "expected_seconds": round(expected_seconds, 3),
+            "deviation_sigmas": round(deviation, 2),
+        }
+
+    # -----------------
+    # Persistence
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "machine_id": self.machine_id,
+                "sensitivity": self.sensitivity,
+                "warming_up": self._cycles < WARMUP_CYCLES,
+                "cycles": self._cycles,
+                "expected_seconds": self._fast.mean,
+                "expected_sigma": self._fast.sigma() if self._fast.mean is not None else None,
+                "baseline_seconds": self._baseline.mean,
+                "cusum": {"up": round(self._cusum_up, 3), "down": round(self._cusum_down, 3)},
+                "last_timestamp": self._last_timestamp.isoformat() if self._last_timestamp else None,
+                "model": {
+                    "fast": [self._fast.mean, self._fast.variance],
+                    "baseline": [self._baseline.mean, self._baseline.variance],
+                },
+                "alerts": list(self._alerts),
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }
+
+    def restore(self) -> None:
+        """Resume from the published state if it belongs to this machine."""
+
+        data = _read_alerts_file()
+        if not data or data.get("machine_id") != self.machine_id:
+            return
+        try:
+            model = data["model"]
+            fast_mean, fast_variance = model["fast"]
+            base_mean, base_variance = model["baseline"]
+            cycles = int(data.get("cycles", 0))
+            last = data.get("last_timestamp")
+            last_timestamp = datetime.fromisoformat(last) if last else None
+            cusum = data.get("cusum", {})
+            alerts = [alert for alert in data.get("alerts", []) if isinstance(alert, dict)]
+            with self._lock:
+                self._fast = _Ewma(FAST_ALPHA, fast_mean, float(fast_variance))
+                self._baseline = _Ewma(BASELINE_ALPHA, base_mean, float(base_variance))
+                self._cycles = cycles
+                self._last_timestamp = last_timestamp
+                self._cusum_up = float(cusum.get("up", 0.0))
+                self._cusum_down = float(cusum.get("down", 0.0))
+                self._alerts.extend(alerts)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            LOGGER.warning("Ignoring invalid anomaly detector state in %s", ALERTS_PATH)
+
+    def publish(self, force: bool = False) -> None:
+        if not self.publishing:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_publish < PUBLISH_INTERVAL_SECONDS:
+            return
+        self._last_publish = now
+        payload = self.snapshot()
+        ensure_config_dir()
+        tmp_path = ALERTS_PATH.with_suffix(ALERTS_PATH.suffix + ".tmp")
+        try:
+            tmp_path.write_text(json.dumps(payload))
+            tmp_path.replace(ALERTS_PATH)
+        except OSError:
+            LOGGER.debug("Unable to publish anomaly alerts to %s", ALERTS_PATH, exc_info=True)
+
+
+def _read_alerts_file() -> Optional[Dict[str, Any]]:
+    if not ALERTS_PATH.exists():
+        return None
+    try:
+        data = json.loads(ALERTS_PATH.read_text())
+    except (OSError, json.JSONDecodeError):
+        LOGGER.debug("Unable to read anomaly alerts %s", ALERTS_PATH, exc_info=True)
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def load_anomalies(since: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """Return the published detector state and alerts, optionally only those after ``since``."""
+
+    data = _read_alerts_file()
+    if data is None:
+        return None
+    data.pop("model", None)
+    if since is not None:
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        recent = []
+        for alert in data.get("alerts", []):
+            try:
+                if datetime.fromisoformat(alert["timestamp"]) > since:
+                    recent.append(alert)
+            except (KeyError, TypeError, ValueError):
+                continue
+        data["alerts"] = recent
+    return data
@@ -5,9 +5,10 @@ from __future__ import annotations
 import json
 import logging
 import os
+import threading
 from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 
 LOGGER = logging.getLogger(__name__)
 
@@ -38,20 +39,86 @@ def _determine_config_dir() -> Path:
 CONFIG_DIR = _determine_config_dir()
 CONFIG_PATH = CONFIG_DIR / "config.json"
 
+#: CSV durability modes: no explicit sync, group commit every
+#: ``durability_interval_ms``, or a sync after every flush of new events.
+DURABILITY_MODES = ("none", "interval", "every-event")
+DEFAULT_DURABILITY_INTERVAL_MS = 1000
 
-@dataclass
+#: Rows the writer queue may hold before they are spilled to the local
+#: overflow spool (see ``fw_cycle_monitor.spool.OverflowSpool``).
+DEFAULT_WRITE_QUEUE_CAPACITY = 1000
+
+#: Storage layouts: write straight to ``csv_directory``, or commit to a local
+#: primary log first and replicate it to ``csv_directory`` in the background.
+STORAGE_MODES = ("direct", "local-first")
+DEFAULT_LOCAL_LOG_DIRECTORY = CONFIG_DIR / "journal"
+
+#: Event stores: the CSV only, or the CSV plus an indexed SQLite database.
+EVENT_STORES = ("csv", "sqlite")
+
+#: Cycle-time anomaly detection: disabled, or how readily it alerts.
+ANOMALY_SENSITIVITIES = ("off", "low", "medium", "high")
+
+
+# ``AppConfig`` is frozen; ``__post_init__`` normalises fields through this.
+_set = object.__setattr__
+
+
+@dataclass(frozen=True)
 class AppConfig:
-    """User editable configuration."""
+    """User editable configuration.
+
+    Instances are immutable because :func:`load_config` hands the same cached
+    snapshot to every caller; use :func:`dataclasses.replace` to derive a
+    modified copy.
+    """
 
     machine_id: str = "M201"
     gpio_pin: int = 17
     csv_directory: Path = Path.home() / "fw_cycle_monitor_data"
     reset_hour: int = 3
+    durability: str = "none"
+    durability_interval_ms: int = DEFAULT_DURABILITY_INTERVAL_MS
+    write_queue_capacity: int = DEFAULT_WRITE_QUEUE_CAPACITY
+    storage_mode: str = "direct"
+    local_log_directory: Path = DEFAULT_LOCAL_LOG_DIRECTORY
+    event_store: str = "csv"
+    idle_threshold_seconds: int = 300
+    slow_cycle_seconds: int = 60
+    down_threshold_seconds: int = 1800
+    anomaly_sensitivity: str = "medium"
 
     def __post_init__(self) -> None:
-        self.machine_id = _sanitize_machine_id(self.machine_id)
+        _set(self, "machine_id", _sanitize_machine_id(self.machine_id))
         if not isinstance(self.csv_directory, Path):
-            self.csv_directory = Path(self.csv_directory)
+            _set(self, "csv_directory", Path(self.csv_directory))
+        _set(self, "durability", str(self.durability).strip().lower().replace("_", "-"))
+        if self.durability not in DURABILITY_MODES:
+            LOGGER.warning("Unknown durability mode %r; using 'none'", self.durability)
+            _set(self, "durability", "none")
+        if not isinstance(self.local_log_directory, Path):
+            _set(self, "local_log_directory", Path(self.local_log_directory))
+        _set(self, "storage_mode", str(self.storage_mode).strip().lower().replace("_", "-"))
+        if self.storage_mode not in STORAGE_MODES:
+            LOGGER.warning("Unknown storage mode %r; using 'direct'", self.storage_mode)
+            _set(self, "storage_mode", "direct")
+        _set(self, "event_store", str(self.event_store).strip().lower())
+        if self.event_store not in EVENT_STORES:
+            LOGGER.warning("Unknown event store %r; using 'csv'", self.event_store)
+            _set(self, "event_store", "csv")
+        _set(self, "anomaly_sensitivity", str(self.anomaly_sensitivity).strip().lower())
+        if self.anomaly_sensitivity not in ANOMALY_SENSITIVITIES:
+            LOGGER.warning("Unknown anomaly sensitivity %r; using 'medium'", self.anomaly_sensitivity)
+            _set(self, "anomaly_sensitivity", "medium")
+        if not self.slow_cycle_seconds <= self.idle_threshold_seconds <= self.down_threshold_seconds:
+            LOGGER.warning(
+                "Machine state thresholds must satisfy slow <= idle <= down; got %s/%s/%s",
+                self.slow_cycle_seconds,
+                self.idle_threshold_seconds,
+                self.down_threshold_seconds,
+            )
+            _set(self, "slow_cycle_seconds", min(self.slow_cycle_seconds, self.idle_threshold_seconds))
+            _set(self, "down_threshold_seconds", max(self.down_threshold_seconds, self.idle_threshold_seconds))
 
     def csv_path(self) -> Path:
         """Return the CSV path derived from the machine id."""
@@ -59,6 +126,18 @@ class AppConfig:
         sanitized_machine = _sanitize_machine_id(self.machine_id)
         return Path(self.csv_directory).expanduser() / f"CM_{sanitized_machine}.csv"
 
+    def primary_csv_path(self) -> Path:
+        """Return the CSV the monitor commits events to.
+
+        In ``local-first`` mode this is a log on the Pi's own storage that is
+        replicated to :meth:`csv_path`; otherwise it is :meth:`csv_path` itself.
+        """
+
+        if self.storage_mode != "local-first":
+            return self.csv_path()
+        sanitized_machine = _sanitize_machine_id(self.machine_id)
+        return Path(self.local_log_directory).expanduser() / f"CM_{sanitized_machine}.csv"
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "AppConfig":
         defaults = cls()
@@ -70,55 +149,139 @@ class AppConfig:
         if not 0 <= reset_hour <= 23:
             reset_hour = defaults.reset_hour
 
+        def positive_int(key: str) -> int:
+            default = getattr(defaults, key)
+            try:
+                value = int(data.get(key, default))
+            except (TypeError, ValueError):
+                return default
+            return value if value > 0 else default
+
         return cls(
             machine_id=_sanitize_machine_id(str(data.get("machine_id", defaults.machine_id))),
             gpio_pin=int(data.get("gpio_pin", defaults.gpio_pin)),
             csv_directory=csv_directory,
             reset_hour=reset_hour,
+            durability=str(data.get("durability", defaults.durability)),
+            durability_interval_ms=positive_int("durability_interval_ms"),
+            write_queue_capacity=positive_int("write_queue_capacity"),
+            storage_mode=str(data.get("storage_mode", defaults.storage_mode)),
+            local_log_directory=Path(data.get("local_log_directory", defaults.local_log_directory)),
+            event_store=str(data.get("event_store", defaults.event_store)),
+            idle_threshold_seconds=positive_int("idle_threshold_seconds"),
+            slow_cycle_seconds=positive_int("slow_cycle_seconds"),
+            down_threshold_seconds=positive_int("down_threshold_seconds"),
+            anomaly_sensitivity=str(data.get("anomaly_sensitivity", defaults.anomaly_sensitivity)),
         )
 
 
+_config_dir_ready = False
+
+#: Process-wide cache of the parsed ``config.json``: the file's identity
+#: (device, inode, mtime, size) and the snapshot built from it.
+_CacheKey = Tuple[int, int, int, int]
+_cache_lock = threading.Lock()
+_cached: Optional[Tuple[Optional[_CacheKey], AppConfig]] = None
+
+
 def ensure_config_dir() -> None:
     """Ensure the configuration directory exists."""
 
+    global _config_dir_ready
+    if _config_dir_ready:
+        return
     CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+    _config_dir_ready = True
+
+
+def _config_key() -> Optional[_CacheKey]:
+    try:
+        info = os.stat(CONFIG_PATH)
+    except FileNotFoundError:
+        return None
+    return (info.st_dev, info.st_ino, info.st_mtime_ns, info.st_size)
 
 
 def load_config() -> AppConfig:
-    """Load configuration from disk, returning defaults when missing."""
+    """Return the configuration on disk, or defaults when it is missing.
 
-    ensure_config_dir()
-    if not CONFIG_PATH.exists():
-        LOGGER.debug("Config file %s not found; using defaults", CONFIG_PATH)
-        return AppConfig()
+    The parsed file is cached for the life of the process and only re-read
+    when a ``stat`` shows it was replaced or modified, so frequent callers
+    (supervisor requests, the GUI) pay for one system call instead of a read
+    and parse.  The returned :class:`AppConfig` is shared and immutable.
+    """
 
+    global _cached
     try:
-        data = json.loads(CONFIG_PATH.read_text())
-        LOGGER.debug("Loaded config: %s", data)
-        return AppConfig.from_dict(data)
-    except (json.JSONDecodeError, OSError) as exc:
-        LOGGER.warning("Failed to load config %s: %s", CONFIG_PATH, exc)
+        key = _config_key()
+    except OSError as exc:
+        LOGGER.warning("Failed to stat config %s: %s", CONFIG_PATH, exc)
         return AppConfig()
 
+    cached = _cached
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    if key is None:
+        LOGGER.debug("Config file %s not found; using defaults", CONFIG_PATH)
+        config = AppConfig()
+    else:
+        try:
+            data = json.loads(CONFIG_PATH.read_text())
+            LOGGER.debug("Loaded config: %s", data)
+            config = AppConfig.from_dict(data)
+        except (json.JSONDecodeError, OSError) as exc:
+            LOGGER.warning("Failed to load config %s: %s", CONFIG_PATH, exc)
+            return AppConfig()
+        # A write that landed between the stat and the read is picked up on
+        # the next call because the key no longer matches.
+
+    with _cache_lock:
+        _cached = (key, config)
+    return config
+
 
 def save_config(config: AppConfig) -> None:
-    """Persist configuration to disk."""
+    """Persist configuration to disk.
 
+    The file is written to a temporary sibling and renamed over
+    ``config.json``, so readers (including other processes) only ever see the
+    previous or the new configuration, never a partial file.
+    """
+
+    global _cached
     ensure_config_dir()
 
     previous_config: AppConfig | None = None
     if CONFIG_PATH.exists():
         try:
-            existing = json.loads(CONFIG_PATH.read_text())
-            previous_config = AppConfig.from_dict(existing)
-        except (json.JSONDecodeError, OSError, ValueError, TypeError):
+            previous_config = load_config()
+        except (ValueError, TypeError):
             LOGGER.debug("Existing configuration could not be loaded for comparison", exc_info=True)
 
     serializable = asdict(config)
     serializable["csv_directory"] = str(config.csv_directory)
-    CONFIG_PATH.write_text(json.dumps(serializable, indent=2))
+    serializable["local_log_directory"] = str(config.local_log_directory)
+    tmp_path = CONFIG_PATH.with_suffix(CONFIG_PATH.suffix + ".tmp")
+    try:
+        tmp_path.write_text(json.dumps(serializable, indent=2))
+        tmp_path.replace(CONFIG_PATH)
+    except OSError:
+        try:
+            tmp_path.unlink(missing_ok=True)  # type: ignore[arg-type]
+        except OSError:
+            LOGGER.debug("Failed to remove temporary config file %s", tmp_path, exc_info=True)
+        raise
     LOGGER.debug("Saved config to %s", CONFIG_PATH)
 
+    try:
+        key = _config_key()
+    except OSError:
+        key = None
+    if key is not None:
+        with _cache_lock:
+            _cached = (key, config)
+
     if previous_config:
         _handle_machine_change(previous_config, config)
 
@@ -131,6 +294,12 @@ def _handle_machine_change(previous: AppConfig, current: AppConfig) -> None:
     prev_directory = Path(previous.csv_directory).expanduser()
     curr_directory = Path(current.csv_directory).expanduser()
 
+    if previous.storage_mode != current.storage_mode and previous.storage_mode == "local-first":
+        LOGGER.warning(
+            "Storage mode changed from local-first; events not yet replicated from %s stay there",
+            previous.primary_csv_path(),
+        )
+
     if prev_machine == curr_machine and prev_directory == curr_directory:
         return
 
@@ -150,6 +319,8 @@ def _handle_machine_change(previous: AppConfig, current: AppConfig) -> None:
             LOGGER.debug("Unable to clear stored metrics for %s", prev_machine, exc_info=True)
 
         _remove_machine_sidecars(prev_machine, prev_directory)
+        if previous.storage_mode == "local-first":
+            _remove_machine_sidecars(prev_machine, Path(previous.local_log_directory))
 
 
 def _remove_machine_sidecars(machine_id: str, csv_directory: Path) -> None:
@@ -163,6 +334,7 @@ def _remove_machine_sidecars(machine_id: str, csv_directory: Path) -> None:
     base = csv_dir / f"CM_{sanitized}.csv"
     targets = [
         base.with_name(base.name + ".pending"),
+        base.with_name(base.name + ".pending.offset"),
         base.with_name(base.name + ".state.json"),
     ]
 
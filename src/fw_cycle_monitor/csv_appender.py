@@ -0,0 +1,103 @@
+"""Persistent append-only handle for the cycle CSV."""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["CsvAppender"]
+
+#: Minimum seconds between checks for external deletion or rotation.
+IDENTITY_CHECK_INTERVAL = 1.0
+
+
+class CsvAppender:
+    """Keep the CSV open with ``O_APPEND`` and write preformatted bytes.
+
+    Opening, writing and closing the file for every flush costs several
+    syscalls plus a ``stat``/``chmod`` pair.  Instead the descriptor stays
+    open and each batch is a single ``write``.  At most once per
+    :data:`IDENTITY_CHECK_INTERVAL` the path is ``stat``-ed and its inode and
+    device compared with the open descriptor, so an external delete or log
+    rotation causes a reopen without paying for the check on every event.
+    """
+
+    def __init__(self, path: Path, file_mode: int = 0o664) -> None:
+        self.path = path
+        self.file_mode = file_mode
+        self._fd: Optional[int] = None
+        self._identity: Optional[tuple[int, int]] = None
+        self._last_check = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self._fd is not None
+
+    def _open(self) -> int:
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, self.file_mode)
+        try:
+            info = os.fstat(fd)
+            if info.st_mode & 0o777 != self.file_mode:
+                try:
+                    os.fchmod(fd, self.file_mode)
+                except OSError:
+                    LOGGER.debug("Unable to adjust permissions for %s", self.path, exc_info=True)
+        except OSError:
+            os.close(fd)
+            raise
+        self._fd = fd
+        self._identity = (info.st_dev, info.st_ino)
+        self._last_check = time.monotonic()
+        LOGGER.debug("Opened %s for appending", self.path)
+        return fd
+
+    def ensure_current(self, force: bool = False) -> None:
+        """Reopen the file if it was deleted or replaced since it was opened."""
+
+        if self._fd is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_check < IDENTITY_CHECK_INTERVAL:
+            return
+        self._last_check = now
+        try:
+            info = os.stat(self.path)
+        except FileNotFoundError:
+            LOGGER.warning("CSV file %s was removed; recreating it", self.path)
+            self.close()
+            return
+        if (info.st_dev, info.st_ino) != self._identity:
+            LOGGER.info("CSV file %s was replaced; reopening", self.path)
+            self.close()
+
+    def write(self, data: bytes) -> int:
+        """Append ``data`` in full, opening the file on demand."""
+
+        fd = self._fd if self._fd is not None else self._open()
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+        return len(data)
+
+    def flush(self) -> None:
+        """Writes go straight to the descriptor; provided for file-like callers."""
+
+    def fileno(self) -> int:
+        return self._fd if self._fd is not None else self._open()
+
+    def close(self) -> None:
+        fd = self._fd
+        self._fd = None
+        self._identity = None
+        if fd is None:
+            return
+        try:
+            os.close(fd)
+        except OSError:
+            LOGGER.debug("Error closing %s", self.path, exc_info=True)
@@ -0,0 +1,465 @@
+"""Production-day summaries computed incrementally at the reset-hour rollover.
+
+A production day runs from ``reset_hour`` to ``reset_hour`` on the next day,
+the same window the cycle counter uses.  :class:`DailySummaryRecorder` keeps a
+small accumulator for the current day and, when the counter rolls over,
+appends one summary line to ``daily_summaries.jsonl`` in the configuration
+directory:
+
+* total cycles, and mean/median cycle time of running cycles,
+* the longest gap between consecutive events,
+* running versus idle time, where a gap longer than
+  ``idle_threshold_seconds`` counts as idle.
+
+The open accumulator is saved to the machine's file under ``daily_summary/``
+(see :mod:`fw_cycle_monitor.shards`) at most every
+:data:`PERSIST_INTERVAL_SECONDS` and when the monitor stops, so a restart in
+the middle of a day keeps its totals.  The single
+``daily_summary_state.json`` used by earlier versions is still read for
+machines that have no file of their own yet.
+
+Run ``python -m fw_cycle_monitor.daily_summary backfill`` to build summaries
+for existing history in a single streaming pass.  It reads the SQLite event
+store when one is configured and the CSV otherwise, and takes the same lock as
+the live recorder's appends, so it can run while the service is recording.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import logging
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .config import CONFIG_DIR, ensure_config_dir
+from .rollups import QuantileSketch
+from .shards import locked_file, read_shard, shard_path, write_shard
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["DailySummaryRecorder", "backfill_summaries", "load_daily_summaries"]
+
+SUMMARY_PATH = CONFIG_DIR / "daily_summaries.jsonl"
+STATE_DIR = CONFIG_DIR / "daily_summary"
+#: Legacy open days of all machines in one file.
+STATE_PATH = CONFIG_DIR / "daily_summary_state.json"
+DEFAULT_IDLE_THRESHOLD_SECONDS = 300
+PERSIST_INTERVAL_SECONDS = 30.0
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+@dataclass
+class DayAccumulator:
+    """Running totals for one production day."""
+
+    day_start: datetime
+    day_end: datetime
+    cycles: int = 0
+    running_cycles: int = 0
+    running_cycle_seconds: float = 0.0
+    longest_gap_seconds: float = 0.0
+    running_seconds: float = 0.0
+    idle_seconds: float = 0.0
+    first_event: Optional[datetime] = None
+    last_event: Optional[datetime] = None
+    sketch: QuantileSketch = field(default_factory=QuantileSketch)
+
+    def add(self, timestamp: datetime, previous: Optional[datetime], idle_threshold: float) -> None:
+        """Account for an event at ``timestamp`` following the event at ``previous``."""
+
+        # Only the part of a gap that falls inside this day counts towards it.
+        window_start = self.day_start if previous is None else max(previous, self.day_start)
+        portion = max((timestamp - window_start).total_seconds(), 0.0)
+        if previous is not None and timestamp > previous:
+            gap = (timestamp - previous).total_seconds()
+            self.longest_gap_seconds = max(self.longest_gap_seconds, gap)
+            if gap <= idle_threshold:
+                self.running_cycles += 1
+                self.running_cycle_seconds += gap
+                self.sketch.add(gap)
+                self.running_seconds += portion
+            else:
+                self.idle_seconds += portion
+        else:
+            self.idle_seconds += portion
+        self.cycles += 1
+        if self.first_event is None:
+            self.first_event = timestamp
+        self.last_event = timestamp
+
+    def finish(self, machine_id: str, previous: Optional[datetime], idle_threshold: float, source: str) -> Dict[str, Any]:
+        """Close the day at ``day_end`` and return its summary record."""
+
+        window_start = self.day_start if previous is None else max(previous, self.day_start)
+        tail = max((self.day_end - window_start).total_seconds(), 0.0)
+        running = self.running_seconds
+        idle = self.idle_seconds
+        if previous is not None and tail <= idle_threshold:
+            running += tail
+        else:
+            idle += tail
+        return {
+            "machine_id": machine_id,
+            "day": self.day_start.date().isoformat(),
+            "start": self.day_start.isoformat(),
+            "end": self.day_end.isoformat(),
+            "cycles": self.cycles,
+            "mean_cycle_seconds": self.running_cycle_seconds / self.running_cycles if self.running_cycles else None,
+            "median_cycle_seconds": self.sketch.quantile(0.5),
+            "longest_gap_seconds": self.longest_gap_seconds,
+            "running_seconds": round(running, 3),
+            "idle_seconds": round(idle, 3),
+            "first_cycle": self.first_event.isoformat() if self.first_event else None,
+            "last_cycle": self.last_event.isoformat() if self.last_event else None,
+            "idle_threshold_seconds": idle_threshold,
+            "source": source,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "day_start": self.day_start.isoformat(),
+            "day_end": self.day_end.isoformat(),
+            "cycles": self.cycles,
+            "running_cycles": self.running_cycles,
+            "running_cycle_seconds": self.running_cycle_seconds,
+            "longest_gap_seconds": self.longest_gap_seconds,
+            "running_seconds": self.running_seconds,
+            "idle_seconds": self.idle_seconds,
+            "first_event": self.first_event.isoformat() if self.first_event else None,
+            "last_event": self.last_event.isoformat() if self.last_event else None,
+            "sketch": self.sketch.to_json(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> Optional["DayAccumulator"]:
+        day_start = _parse_datetime(data.get("day_start"))
+        day_end = _parse_datetime(data.get("day_end"))
+        if day_start is None or day_end is None:
+            return None
+        try:
+            return cls(
+                day_start=day_start,
+                day_end=day_end,
+                cycles=int(data.get("cycles", 0)),
+                running_cycles=int(data.get("running_cycles", 0)),
+                running_cycle_seconds=float(data.get("running_cycle_seconds", 0.0)),
+                longest_gap_seconds=float(data.get("longest_gap_seconds", 0.0)),
+                running_seconds=float(data.get("running_seconds", 0.0)),
+                idle_seconds=float(data.get("idle_seconds", 0.0)),
+                first_event=_parse_datetime(data.get("first_event")),
+                last_event=_parse_datetime(data.get("last_event")),
+                sketch=QuantileSketch.from_json(str(data.get("sketch", "{}"))),
+            )
+        except (TypeError, ValueError):
+            return None
+
+
+# -----------------
+# Summary file
+
+
+def append_summary(summary: Dict[str, Any], path: Optional[Path] = None) -> None:
+    """Append one summary record to the daily summary file.
+
+    Holds the file's lock so a concurrent :func:`backfill_summaries` cannot
+    replace the file underneath the append.
+    """
+
+    target = path or SUMMARY_PATH
+    if target == SUMMARY_PATH:
+        ensure_config_dir()
+    with locked_file(target), target.open("a", encoding="utf-8") as summary_file:
+        summary_file.write(json.dumps(summary, separators=(",", ":")) + "\n")
+
+
+def _iter_summaries(path: Path) -> Iterator[Dict[str, Any]]:
+    try:
+        with path.open("r", encoding="utf-8") as summary_file:
+            for line in summary_file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(record, dict):
+                    yield record
+    except FileNotFoundError:
+        return
+
+
+def load_daily_summaries(
+    machine_id: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    path: Optional[Path] = None,
+) -> List[Dict[str, Any]]:
+    """Return summaries for ``machine_id`` between ``start`` and ``end`` inclusive.
+
+    When a day was summarised more than once (for example by a backfill) the
+    latest record wins.
+    """
+
+    latest: Dict[str, Dict[str, Any]] = {}
+    for record in _iter_summaries(path or SUMMARY_PATH):
+        if record.get("machine_id") != machine_id:
+            continue
+        day = str(record.get("day", ""))
+        if start and day < start.isoformat():
+            continue
+        if end and day > end.isoformat():
+            continue
+        latest[day] = record
+    return [latest[day] for day in sorted(latest)]
+
+
+# -----------------
+# Live recorder
+
+
+class DailySummaryRecorder:
+    """Maintain the current production day and emit its summary at rollover."""
+
+    def __init__(
+        self,
+        machine_id: str,
+        idle_threshold: float = DEFAULT_IDLE_THRESHOLD_SECONDS,
+        *,
+        summary_path: Optional[Path] = None,
+        state_path: Optional[Path] = None,
+        source: str = "live",
+    ) -> None:
+        self.machine_id = machine_id
+        self.idle_threshold = float(idle_threshold)
+        self._summary_path = summary_path
+        self._state_path = state_path
+        self._source = source
+        self._current: Optional[DayAccumulator] = None
+        self._last_event: Optional[datetime] = None
+        # Backfills start from a clean slate instead of the live open day.
+        self._loaded = source != "live"
+        self._last_persist = 0.0
+        self._dirty = False
+
+    # Persistence of the open day
+
+    def _state_file(self) -> Path:
+        return self._state_path or shard_path(STATE_DIR, self.machine_id)
+
+    def _load_legacy_entry(self) -> Optional[Dict[str, Any]]:
+        try:
+            data = json.loads(STATE_PATH.read_text())
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError):
+            LOGGER.warning("Failed to read daily summary state %s", STATE_PATH, exc_info=True)
+            return None
+        machines = data.get("machines") if isinstance(data, dict) else None
+        entry = machines.get(self.machine_id) if isinstance(machines, dict) else None
+        return entry if isinstance(entry, dict) else None
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        entry = read_shard(self._state_file())
+        if entry is None and self._state_path is None:
+            entry = self._load_legacy_entry()
+        if entry is None:
+            return
+        self._current = DayAccumulator.from_dict(entry.get("day") or {})
+        self._last_event = _parse_datetime(entry.get("last_event"))
+
+    def persist(self, force: bool = False) -> None:
+        """Save the open day, throttled to :data:`PERSIST_INTERVAL_SECONDS`."""
+
+        if self._source != "live" or not self._dirty:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_persist < PERSIST_INTERVAL_SECONDS:
+            return
+        path = self._state_file()
+        entry = {
+            "day": self._current.to_dict() if self._current else None,
+            "last_event": self._last_event.isoformat() if self._last_event else None,
+        }
+        try:
+            # Only this machine's file is replaced, so recorders for other
+            # machines in other processes cannot lose each other's open day.
+            write_shard(path, entry)
+        except OSError:
+            LOGGER.warning("Unable to persist daily summary state to %s", path, exc_info=True)
+            return
+        self._last_persist = now
+        self._dirty = False
+
+    # Day boundaries
+
+    def _emit(self, accumulator: DayAccumulator) -> Dict[str, Any]:
+        summary = accumulator.finish(self.machine_id, self._last_event, self.idle_threshold, self._source)
+        try:
+            append_summary(summary, self._summary_path)
+        except OSError:
+            LOGGER.exception("Failed to write daily summary for %s on %s", self.machine_id, summary["day"])
+        else:
+            LOGGER.info(
+                "Production day %s for %s: %s cycles, running %.0f s, idle %.0f s",
+                summary["day"],
+                self.machine_id,
+                summary["cycles"],
+                summary["running_seconds"],
+                summary["idle_seconds"],
+            )
+        return summary
+
+    def roll_over(self, boundary: datetime) -> Optional[Dict[str, Any]]:
+        """Close the day ending at ``boundary`` and open the next one."""
+
+        self._load()
+        summary = None
+        current = self._current
+        if current is not None and current.day_end <= boundary:
+            summary = self._emit(current)
+        if current is None or current.day_end <= boundary:
+            self._current = DayAccumulator(day_start=boundary, day_end=boundary + timedelta(days=1))
+            self._dirty = True
+            self.persist(force=True)
+        return summary
+
+    def catch_up(self, day_end: datetime) -> None:
+        """Emit a saved day that ended while the monitor was not running."""
+
+        self._load()
+        current = self._current
+        if current is not None and current.day_end < day_end:
+            self.roll_over(current.day_end)
+
+    def add(self, timestamp: datetime, day_end: datetime) -> None:
+        """Record an event at ``timestamp`` in the day ending at ``day_end``."""
+
+        self._load()
+        current = self._current
+        if current is None or current.day_end != day_end:
+            if current is not None and current.day_end < day_end:
+                self._emit(current)
+            current = self._current = DayAccumulator(day_start=day_end - timedelta(days=1), day_end=day_end)
+        current.add(timestamp, self._last_event, self.idle_threshold)
+        self._last_event = timestamp
+        self._dirty = True
+        self.persist()
+
+
+# -----------------
+# Backfill
+
+
+def _iter_csv_timestamps(csv_path: Path) -> Iterator[datetime]:
+    with csv_path.open("r", newline="") as csv_file:
+        for row in csv.reader(csv_file):
+            if not row:
+                continue
+            timestamp = _parse_datetime(row[0].strip())
+            if timestamp is not None:
+                yield timestamp
+
+
+def backfill_summaries(
+    machine_id: str,
+    timestamps: Iterable[datetime],
+    reset_hour: int,
+    idle_threshold: float = DEFAULT_IDLE_THRESHOLD_SECONDS,
+    summary_path: Optional[Path] = None,
+) -> int:
+    """Summarise every completed production day in ``timestamps`` in one pass.
+
+    Existing summaries for the same machine and days are replaced under the
+    summary file's lock, so summaries the live recorder appends meanwhile are
+    kept.  Returns the number of days written.
+    """
+
+    from .gpio_monitor import _CycleCounter
+
+    target = summary_path or SUMMARY_PATH
+    scratch = target.with_name(target.name + ".backfill")
+    scratch.unlink(missing_ok=True)
+    recorder = DailySummaryRecorder(machine_id, idle_threshold, summary_path=scratch, source="backfill")
+    counter = _CycleCounter(reset_hour, on_rollover=recorder.roll_over)
+    for timestamp in timestamps:
+        counter.record(timestamp.astimezone())
+        recorder.add(timestamp.astimezone(), counter.next_reset)
+    # The day containing the last event is still open and is left to the live recorder.
+
+    new_records = list(_iter_summaries(scratch))
+    scratch.unlink(missing_ok=True)
+    new_days = {record["day"] for record in new_records}
+    if target == SUMMARY_PATH:
+        ensure_config_dir()
+    tmp_path = target.with_name(target.name + ".tmp")
+    with locked_file(target):
+        kept = [
+            record
+            for record in _iter_summaries(target)
+            if not (record.get("machine_id") == machine_id and record.get("day") in new_days)
+        ]
+        with tmp_path.open("w", encoding="utf-8") as summary_file:
+            for record in sorted(
+                kept + new_records, key=lambda item: (str(item.get("day")), str(item.get("machine_id")))
+            ):
+                summary_file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        tmp_path.replace(target)
+    return len(new_records)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from .config import load_config
+    from .event_store import DATABASE_PATH, iter_event_timestamps
+
+    config = load_config()
+    parser = argparse.ArgumentParser(description="Production-day summaries for the FW Cycle Time Monitor.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    backfill = subparsers.add_parser("backfill", help="Summarise existing history in one streaming pass")
+    backfill.add_argument(
+        "--csv",
+        type=Path,
+        default=None,
+        help="CSV to read (defaults to the event store when it is enabled, else the configured machine's CSV)",
+    )
+    backfill.add_argument("--machine-id", default=config.machine_id)
+    backfill.add_argument("--reset-hour", type=int, default=config.reset_hour)
+    backfill.add_argument("--idle-threshold", type=float, default=config.idle_threshold_seconds)
+    args = parser.parse_args(argv)
+
+    machine_id = args.machine_id.strip().upper()
+    timestamps: Iterable[datetime]
+    if args.csv is None and config.event_store == "sqlite" and DATABASE_PATH.exists():
+        # The store already holds every event the writer committed.
+        source = DATABASE_PATH
+        timestamps = iter_event_timestamps(machine_id)
+    else:
+        source = args.csv or config.primary_csv_path()
+        if not source.exists():
+            print(f"CSV file {source} does not exist", file=sys.stderr)
+            return 1
+        timestamps = _iter_csv_timestamps(source)
+    started = time.perf_counter()
+    days = backfill_summaries(machine_id, timestamps, args.reset_hour, args.idle_threshold)
+    print(f"Wrote {days} daily summaries from {source} to {SUMMARY_PATH} in {time.perf_counter() - started:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
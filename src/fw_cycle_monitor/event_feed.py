@@ -0,0 +1,262 @@
+"""Incremental reads of the cycle CSV for downstream ingestion.
+
+Consumers such as the ERP poll ``/events`` with the cursor returned by their
+previous call and receive only the rows appended since.  A cursor is an opaque
+token holding the device and inode of the CSV plus a byte offset into it, so
+a request seeks straight to the first new row: the cost depends on the number
+of new events, not on the size of the file.
+
+The cursor survives restarts because it only refers to the file on disk.  If
+the CSV was rotated, the file named by the cursor is looked up among its
+siblings (``CM_<machine>.csv.*``) by inode, its remaining rows are returned
+first and reading then continues at the start of the current CSV.  When the
+cursor's file no longer exists, or was truncated below the offset, reading
+restarts at the beginning of the current CSV and the response is flagged
+``reset`` so the consumer can deduplicate.
+
+:func:`locate_time_range` maps a time range to a byte range for bulk exports.
+Rows are appended in time order, so the file itself is the index: a binary
+search over byte offsets reads one row per step instead of parsing the file.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from .spool import parse_row_timestamp
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["EventCursor", "complete_size", "locate_time_range", "read_events_after"]
+
+CURSOR_VERSION = 1
+READ_CHUNK_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True)
+class EventCursor:
+    """Position just after the last row returned to a consumer."""
+
+    device: int
+    inode: int
+    offset: int
+
+    def encode(self) -> str:
+        raw = f"{CURSOR_VERSION}:{self.device}:{self.inode}:{self.offset}".encode("ascii")
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+    @classmethod
+    def decode(cls, token: str) -> "EventCursor":
+        """Parse a token produced by :meth:`encode`; raise ``ValueError`` if it is malformed."""
+
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            version, device, inode, offset = base64.urlsafe_b64decode(padded).decode("ascii").split(":")
+            cursor = cls(int(device), int(inode), int(offset))
+        except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+            raise ValueError(f"Invalid event cursor {token!r}") from exc
+        if int(version) != CURSOR_VERSION or cursor.offset < 0:
+            raise ValueError(f"Unsupported event cursor {token!r}")
+        return cursor
+
+    @property
+    def identity(self) -> Tuple[int, int]:
+        return (self.device, self.inode)
+
+
+def _identity(info: os.stat_result) -> Tuple[int, int]:
+    return (info.st_dev, info.st_ino)
+
+
+def _find_rotated(csv_path: Path, identity: Tuple[int, int]) -> Optional[Path]:
+    """Return the sibling of ``csv_path`` that is the file with ``identity``, if any."""
+
+    try:
+        siblings = list(csv_path.parent.glob(csv_path.name + ".*"))
+    except OSError:
+        return None
+    for candidate in siblings:
+        try:
+            if _identity(candidate.stat()) == identity and candidate.is_file():
+                return candidate
+        except OSError:
+            continue
+    return None
+
+
+def _parse_row(line: bytes) -> Optional[Dict[str, Any]]:
+    timestamp = parse_row_timestamp(line)
+    if timestamp is None:
+        return None
+    fields = line.decode("utf-8", "replace").strip().split(",")
+    pulse_seconds: Optional[float] = None
+    if len(fields) > 1 and fields[1]:
+        try:
+            pulse_seconds = float(fields[1])
+        except ValueError:
+            pulse_seconds = None
+    return {"timestamp": timestamp.isoformat(), "pulse_seconds": pulse_seconds}
+
+
+def _read_rows(path: Path, offset: int, limit: int, events: List[Dict[str, Any]]) -> Tuple[int, bool]:
+    """Append up to ``limit`` events from ``path`` starting at ``offset``.
+
+    Returns the offset after the last complete row consumed and whether any
+    complete rows remain after it.
+    """
+
+    with path.open("rb") as handle:
+        handle.seek(offset)
+        buffered = b""
+        while True:
+            chunk = handle.read(READ_CHUNK_BYTES)
+            if not chunk:
+                # A trailing partial row is still being written; leave it.
+                return offset, False
+            buffered += chunk
+            lines = buffered.split(b"\n")
+            buffered = lines.pop()
+            for line in lines:
+                if len(events) >= limit:
+                    return offset, True
+                offset += len(line) + 1
+                event = _parse_row(line)
+                if event is not None:
+                    events.append(event)
+
+
+def read_events_after(csv_path: Path, cursor: Optional[str], limit: int = 500) -> Dict[str, Any]:
+    """Return up to ``limit`` events appended to ``csv_path`` after ``cursor``.
+
+    Raises ``ValueError`` for a malformed cursor.
+    """
+
+    limit = max(int(limit), 1)
+    position = EventCursor.decode(cursor) if cursor else None
+    events: List[Dict[str, Any]] = []
+    reset = False
+
+    try:
+        current_info: Optional[os.stat_result] = csv_path.stat()
+    except FileNotFoundError:
+        current_info = None
+
+    start_offset = 0
+    if position is not None:
+        if current_info is not None and position.identity == _identity(current_info):
+            if position.offset <= current_info.st_size:
+                start_offset = position.offset
+            else:
+                LOGGER.info("CSV %s is shorter than the event cursor; restarting from its beginning", csv_path)
+                reset = True
+        else:
+            rotated = _find_rotated(csv_path, position.identity)
+            if rotated is None:
+                reset = True
+            else:
+                try:
+                    offset, more = _read_rows(rotated, position.offset, limit, events)
+                except OSError:
+                    LOGGER.warning("Unable to read rotated CSV %s", rotated, exc_info=True)
+                    reset = True
+                else:
+                    if more or current_info is None:
+                        return {
+                            "events": events,
+                            "cursor": EventCursor(position.device, position.inode, offset).encode(),
+                            "more": more,
+                            "reset": False,
+                        }
+
+    if current_info is None:
+        return {"events": events, "cursor": cursor, "more": False, "reset": reset}
+
+    offset, more = _read_rows(csv_path, start_offset, limit, events)
+    device, inode = _identity(current_info)
+    return {
+        "events": events,
+        "cursor": EventCursor(device, inode, offset).encode(),
+        "more": more,
+        "reset": reset,
+    }
+
+
+# -----------------
+# Time-range lookup
+
+
+def complete_size(handle: BinaryIO, size: int) -> int:
+    """Return the length of ``handle`` up to and including its last newline."""
+
+    position = size
+    while position > 0:
+        start = max(position - READ_CHUNK_BYTES, 0)
+        handle.seek(start)
+        newline = handle.read(position - start).rfind(b"\n")
+        if newline >= 0:
+            return start + newline + 1
+        position = start
+    return 0
+
+
+def _row_at(handle: BinaryIO, offset: int) -> bytes:
+    handle.seek(offset)
+    return handle.readline()
+
+
+def _first_row_at_or_after(handle: BinaryIO, offset: int) -> int:
+    if offset == 0:
+        return 0
+    handle.seek(offset - 1)
+    handle.readline()
+    return handle.tell()
+
+
+def _locate(handle: BinaryIO, size: int, target: datetime) -> int:
+    """Return the offset of the first row at or after ``target`` (``size`` if none)."""
+
+    # Invariant: the answer is a row start in [low, high]; both are row starts
+    # (or ``size``).  Rows that do not parse are treated as earlier than the target.
+    low, high = 0, size
+    while low < high:
+        start = _first_row_at_or_after(handle, (low + high) // 2)
+        if start >= high:
+            start = low
+        row = _row_at(handle, start)
+        timestamp = parse_row_timestamp(row)
+        if timestamp is None or timestamp < target:
+            low = start + len(row)
+        else:
+            high = start
+    return low
+
+
+def locate_time_range(
+    handle: BinaryIO,
+    size: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Tuple[int, int]:
+    """Return the byte range of rows with ``start <= timestamp < end`` in an open CSV.
+
+    ``size`` should come from :func:`complete_size` so a row that is still
+    being written is never included.
+    """
+
+    def bound(value: Optional[datetime], default: int) -> int:
+        if value is None:
+            return default
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return _locate(handle, size, value)
+
+    first = bound(start, 0)
+    last = bound(end, size)
+    return first, max(first, last)
@@ -0,0 +1,324 @@
+"""Optional SQLite event store with indexed range queries.
+
+When ``event_store`` is set to ``sqlite`` the monitor's writer thread also
+records every event in ``events.sqlite3`` in the configuration directory.  The
+database holds the raw events, the latest counter per machine, and one rollup
+row per machine and production day (the day starting at ``reset_hour``), so
+history can be queried without re-reading the CSV or the JSON state files.
+The CSV is still written in every mode for compatibility.
+
+The database runs in WAL mode: the writer commits batches in a single
+transaction while readers such as the remote supervisor open their own
+connections and query concurrently without blocking it.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .config import CONFIG_DIR, ensure_config_dir
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["EventStore", "StoredEvent", "iter_event_timestamps", "query_daily_rollups", "query_events"]
+
+DATABASE_PATH = CONFIG_DIR / "events.sqlite3"
+BUSY_TIMEOUT_MS = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    machine_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    timestamp TEXT NOT NULL,
+    cycle_number INTEGER NOT NULL,
+    cycle_seconds REAL
+);
+CREATE INDEX IF NOT EXISTS events_machine_ts ON events (machine_id, ts);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+
+CREATE TABLE IF NOT EXISTS counters (
+    machine_id TEXT PRIMARY KEY,
+    last_cycle INTEGER NOT NULL,
+    last_timestamp TEXT NOT NULL,
+    last_ts REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    machine_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    cycles INTEGER NOT NULL,
+    timed_cycles INTEGER NOT NULL,
+    total_seconds REAL NOT NULL,
+    min_seconds REAL,
+    max_seconds REAL,
+    first_timestamp TEXT NOT NULL,
+    last_timestamp TEXT NOT NULL,
+    PRIMARY KEY (machine_id, day)
+);
+"""
+
+_UPSERT_ROLLUP = """
+INSERT INTO daily_rollups (
+    machine_id, day, cycles, timed_cycles, total_seconds, min_seconds, max_seconds, first_timestamp, last_timestamp
+) VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (machine_id, day) DO UPDATE SET
+    cycles = cycles + 1,
+    timed_cycles = timed_cycles + excluded.timed_cycles,
+    total_seconds = total_seconds + excluded.total_seconds,
+    min_seconds = CASE
+        WHEN excluded.min_seconds IS NULL THEN min_seconds
+        WHEN min_seconds IS NULL OR excluded.min_seconds < min_seconds THEN excluded.min_seconds
+        ELSE min_seconds END,
+    max_seconds = CASE
+        WHEN excluded.max_seconds IS NULL THEN max_seconds
+        WHEN max_seconds IS NULL OR excluded.max_seconds > max_seconds THEN excluded.max_seconds
+        ELSE max_seconds END,
+    last_timestamp = excluded.last_timestamp
+"""
+
+_UPSERT_COUNTER = """
+INSERT INTO counters (machine_id, last_cycle, last_timestamp, last_ts) VALUES (?, ?, ?, ?)
+ON CONFLICT (machine_id) DO UPDATE SET
+    last_cycle = excluded.last_cycle,
+    last_timestamp = excluded.last_timestamp,
+    last_ts = excluded.last_ts
+"""
+
+
+@dataclass(frozen=True)
+class StoredEvent:
+    """A cycle event waiting to be written to the store."""
+
+    timestamp: datetime
+    cycle_number: int
+
+
+def production_day(timestamp: datetime, reset_hour: int) -> date:
+    """Return the production day ``timestamp`` belongs to."""
+
+    return (timestamp.astimezone() - timedelta(hours=reset_hour)).date()
+
+
+def _connect(path: Path, *, read_only: bool = False) -> sqlite3.Connection:
+    if read_only:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=BUSY_TIMEOUT_MS / 1000.0)
+    else:
+        # Opened by the writer thread but closed by ``stop()`` and ``reload()``;
+        # the monitor's flush lock serialises every use.
+        connection = sqlite3.connect(
+            str(path), timeout=BUSY_TIMEOUT_MS / 1000.0, isolation_level=None, check_same_thread=False
+        )
+    connection.row_factory = sqlite3.Row
+    return connection
+
+
+class EventStore:
+    """Writer-side handle on the SQLite database.
+
+    A single connection is written by the monitor's writer thread; every
+    call to :meth:`write_batch` runs in one transaction.
+    """
+
+    def __init__(self, path: Path = DATABASE_PATH, reset_hour: int = 3) -> None:
+        self.path = path
+        self.reset_hour = reset_hour
+        self._connection: Optional[sqlite3.Connection] = None
+        self._last_ts: Dict[str, Optional[float]] = {}
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        if self._connection is not None:
+            return self._connection
+        if self.path == DATABASE_PATH:
+            ensure_config_dir()
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = _connect(self.path)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            # WAL with synchronous=NORMAL only risks the last transactions on
+            # power loss, never corruption, and avoids an fsync per commit.
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+        except sqlite3.Error:
+            connection.close()
+            raise
+        self._connection = connection
+        LOGGER.debug("Opened event store %s", self.path)
+        return connection
+
+    def _previous_ts(self, connection: sqlite3.Connection, machine_id: str) -> Optional[float]:
+        if machine_id not in self._last_ts:
+            row = connection.execute(
+                "SELECT last_ts FROM counters WHERE machine_id = ?", (machine_id,)
+            ).fetchone()
+            self._last_ts[machine_id] = row["last_ts"] if row else None
+        return self._last_ts[machine_id]
+
+    def write_batch(self, machine_id: str, events: Iterable[StoredEvent]) -> int:
+        """Insert ``events`` with their counter and rollup updates atomically.
+
+        Raises :class:`sqlite3.Error` when the batch could not be committed.
+        """
+
+        batch = list(events)
+        if not batch:
+            return 0
+        with self._lock:
+            connection = self._open()
+            previous = self._previous_ts(connection, machine_id)
+            last_ts = previous
+            try:
+                connection.execute("BEGIN IMMEDIATE")
+                for event in batch:
+                    timestamp = event.timestamp
+                    if timestamp.tzinfo is None:
+                        timestamp = timestamp.replace(tzinfo=timezone.utc)
+                    ts = timestamp.timestamp()
+                    cycle_seconds = ts - last_ts if last_ts is not None and ts >= last_ts else None
+                    iso = timestamp.isoformat()
+                    connection.execute(
+                        "INSERT INTO events (machine_id, ts, timestamp, cycle_number, cycle_seconds) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (machine_id, ts, iso, event.cycle_number, cycle_seconds),
+                    )
+                    connection.execute(
+                        _UPSERT_ROLLUP,
+                        (
+                            machine_id,
+                            production_day(timestamp, self.reset_hour).isoformat(),
+                            1 if cycle_seconds is not None else 0,
+                            cycle_seconds or 0.0,
+                            cycle_seconds,
+                            cycle_seconds,
+                            iso,
+                            iso,
+                        ),
+                    )
+                    last_ts = ts
+                    last_event = (event.cycle_number, iso, ts)
+                connection.execute(_UPSERT_COUNTER, (machine_id, *last_event))
+                connection.execute("COMMIT")
+            except sqlite3.Error:
+                try:
+                    connection.execute("ROLLBACK")
+                except sqlite3.Error:
+                    LOGGER.debug("Rollback of event batch failed", exc_info=True)
+                raise
+            self._last_ts[machine_id] = last_ts
+        return len(batch)
+
+    def close(self) -> None:
+        with self._lock:
+            connection = self._connection
+            self._connection = None
+            if connection is not None:
+                connection.close()
+
+
+# -----------------
+# Read-side queries
+
+
+def _open_reader(path: Path) -> Optional[sqlite3.Connection]:
+    if not path.exists():
+        return None
+    return _connect(path, read_only=True)
+
+
+def _timestamp_bound(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def query_events(
+    machine_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 1000,
+    path: Path = DATABASE_PATH,
+) -> List[Dict[str, Any]]:
+    """Return events for ``machine_id`` with ``start <= timestamp < end``."""
+
+    clauses = ["machine_id = ?"]
+    params: List[Any] = [machine_id]
+    if start is not None:
+        clauses.append("ts >= ?")
+        params.append(_timestamp_bound(start))
+    if end is not None:
+        clauses.append("ts < ?")
+        params.append(_timestamp_bound(end))
+    params.append(max(int(limit), 0))
+
+    connection = _open_reader(path)
+    if connection is None:
+        return []
+    try:
+        rows = connection.execute(
+            "SELECT timestamp, cycle_number, cycle_seconds FROM events "
+            f"WHERE {' AND '.join(clauses)} ORDER BY ts LIMIT ?",
+            params,
+        ).fetchall()
+    finally:
+        connection.close()
+    return [dict(row) for row in rows]
+
+
+def iter_event_timestamps(machine_id: str, path: Path = DATABASE_PATH) -> Iterator[datetime]:
+    """Yield every stored event timestamp for ``machine_id`` in order, streaming."""
+
+    connection = _open_reader(path)
+    if connection is None:
+        return
+    try:
+        for row in connection.execute("SELECT timestamp FROM events WHERE machine_id = ? ORDER BY ts", (machine_id,)):
+            yield datetime.fromisoformat(row["timestamp"])
+    finally:
+        connection.close()
+
+
+def query_daily_rollups(
+    machine_id: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    path: Path = DATABASE_PATH,
+) -> List[Dict[str, Any]]:
+    """Return daily rollups for ``machine_id`` between ``start`` and ``end`` inclusive."""
+
+    clauses = ["machine_id = ?"]
+    params: List[Any] = [machine_id]
+    if start is not None:
+        clauses.append("day >= ?")
+        params.append(start.isoformat())
+    if end is not None:
+        clauses.append("day <= ?")
+        params.append(end.isoformat())
+
+    connection = _open_reader(path)
+    if connection is None:
+        return []
+    try:
+        rows = connection.execute(
+            "SELECT day, cycles, timed_cycles, total_seconds, min_seconds, max_seconds, "
+            f"first_timestamp, last_timestamp FROM daily_rollups WHERE {' AND '.join(clauses)} ORDER BY day",
+            params,
+        ).fetchall()
+    finally:
+        connection.close()
+    result = []
+    for row in rows:
+        entry = dict(row)
+        timed = entry["timed_cycles"]
+        entry["average_seconds"] = entry["total_seconds"] / timed if timed else None
+        result.append(entry)
+    return result
@@ -3,32 +3,158 @@
 from __future__ import annotations
 
 import csv
+import io
 import json
 import logging
 import os
+import sqlite3
 import threading
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, fields
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Callable, Optional
 
-from .config import AppConfig
-from .metrics import record_cycle_event
+from . import startup_profile
+from .anomaly import AnomalyDetector
+from .config import CONFIG_DIR, AppConfig
+from .csv_appender import CsvAppender
+from .daily_summary import DailySummaryRecorder
+from .event_store import EventStore, StoredEvent
+from .instrumentation import REGISTRY
+from .machine_state import MachineStateTracker, StateThresholds
+from .metrics import record_cycle_events
+from .replication import CsvReplicator
+from .rollups import record_cycles
+from .spool import OverflowSpool, PendingSpool
 from .state import MachineState, load_cycle_state, save_cycle_state
 
 LOGGER = logging.getLogger(__name__)
 
 __all__ = ["CycleMonitor", "GPIOUnavailableError", "MonitorStats"]
 
-try:  # pragma: no cover - hardware-specific import
-    import RPi.GPIO as GPIO  # type: ignore
-
-    GPIO.setmode(GPIO.BCM)
-    GPIO.setwarnings(False)
-    _GPIO_AVAILABLE = True
-except Exception:  # pragma: no cover - executed on non-RPi systems
-    GPIO = None  # type: ignore
-    _GPIO_AVAILABLE = False
+GPIO = None  # type: ignore
+_GPIO_AVAILABLE: Optional[bool] = None
+_GPIO_LOCK = threading.Lock()
+
+
+def _load_gpio() -> bool:
+    """Import and initialise ``RPi.GPIO`` on first use.
+
+    The import is deferred so that tools which only need the CSV and counter
+    logic (the GUI's test events, replay tooling) start quickly and never
+    touch the hardware.
+    """
+
+    global GPIO, _GPIO_AVAILABLE
+    if _GPIO_AVAILABLE is not None:
+        return _GPIO_AVAILABLE
+    with _GPIO_LOCK:
+        if _GPIO_AVAILABLE is not None:
+            return _GPIO_AVAILABLE
+        try:  # pragma: no cover - hardware-specific import
+            with startup_profile.phase("import RPi.GPIO"):
+                import RPi.GPIO as gpio_module  # type: ignore
+
+                gpio_module.setmode(gpio_module.BCM)
+                gpio_module.setwarnings(False)
+            GPIO = gpio_module
+            _GPIO_AVAILABLE = True
+        except Exception:  # pragma: no cover - executed on non-RPi systems
+            LOGGER.debug("RPi.GPIO could not be loaded", exc_info=True)
+            GPIO = None
+            _GPIO_AVAILABLE = False
+    return _GPIO_AVAILABLE
+
+
+_CALLBACKS = REGISTRY.counter("fw_cycle_monitor_gpio_callbacks", "GPIO edge callbacks received.")
+_EDGES_REJECTED_LOW = REGISTRY.counter(
+    "fw_cycle_monitor_edges_rejected", "Edges ignored by the level check.", {"reason": "low_level"}
+)
+_EDGES_REJECTED_HIGH = REGISTRY.counter(
+    "fw_cycle_monitor_edges_rejected", "Edges ignored by the level check.", {"reason": "already_high"}
+)
+_PULSES_UNMEASURED = REGISTRY.counter(
+    "fw_cycle_monitor_pulses_unmeasured", "Cycles logged without a pulse width because no falling edge arrived."
+)
+_EVENTS_RECORDED = REGISTRY.counter("fw_cycle_monitor_events_recorded", "Cycle events recorded.")
+_RECORD_FAILURES = REGISTRY.counter("fw_cycle_monitor_record_failures", "Cycle events dropped by storage errors.")
+_FLUSHES = REGISTRY.counter("fw_cycle_monitor_flushes", "Successful CSV flushes.")
+_FLUSH_FAILURES = REGISTRY.counter("fw_cycle_monitor_flush_failures", "CSV flushes that failed and spooled rows.")
+_WRITE_QUEUE_DEPTH = REGISTRY.gauge("fw_cycle_monitor_write_queue_depth", "Rows waiting for the writer thread.")
+_SPOOL_ROWS = REGISTRY.gauge("fw_cycle_monitor_spool_rows", "Rows held in the pending spool.")
+_SPOOL_BYTES = REGISTRY.gauge("fw_cycle_monitor_spool_bytes", "Undrained bytes in the pending spool.")
+_SPOOL_AGE = REGISTRY.gauge("fw_cycle_monitor_spool_age_seconds", "Age of the oldest row in the pending spool.")
+_WRITE_QUEUE_HIGH_WATER = REGISTRY.gauge(
+    "fw_cycle_monitor_write_queue_high_water", "Deepest the write queue has been since start-up."
+)
+_WRITE_QUEUE_OVERFLOWS = REGISTRY.counter(
+    "fw_cycle_monitor_write_queue_overflows", "Times a full write queue was spilled to the overflow spool."
+)
+_OVERFLOW_ROWS = REGISTRY.gauge("fw_cycle_monitor_overflow_rows", "Rows held in the local overflow spool.")
+_OVERFLOW_BYTES = REGISTRY.gauge("fw_cycle_monitor_overflow_bytes", "Undrained bytes in the local overflow spool.")
+_ROWS_DROPPED = REGISTRY.counter(
+    "fw_cycle_monitor_rows_dropped", "Cycle rows discarded because neither spool could store them."
+)
+_CALLBACK_SECONDS = REGISTRY.histogram(
+    "fw_cycle_monitor_callback_duration_seconds", "Time spent in the GPIO edge callback."
+)
+_RECORD_SECONDS = REGISTRY.histogram(
+    "fw_cycle_monitor_record_event_duration_seconds", "Time spent recording a cycle event."
+)
+_FLUSH_SECONDS = REGISTRY.histogram(
+    "fw_cycle_monitor_flush_duration_seconds", "Time spent flushing queued rows to the CSV."
+)
+_SAVE_STATE_SECONDS = REGISTRY.histogram(
+    "fw_cycle_monitor_save_cycle_state_duration_seconds", "Time spent persisting the cycle counter state."
+)
+_SYNC_SECONDS = REGISTRY.histogram(
+    "fw_cycle_monitor_csv_sync_duration_seconds", "Time spent in fdatasync on the CSV file."
+)
+_PULSE_SECONDS = REGISTRY.histogram(
+    "fw_cycle_monitor_pulse_width_seconds",
+    "Time the cycle signal stayed high, from rising to falling edge.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0),
+)
+_RECORD_METRICS_SECONDS = REGISTRY.histogram(
+    "fw_cycle_monitor_record_cycle_event_duration_seconds", "Time spent updating the rolling cycle metrics."
+)
+_STORE_SECONDS = REGISTRY.histogram(
+    "fw_cycle_monitor_event_store_batch_duration_seconds", "Time spent committing a batch to the SQLite event store."
+)
+_ROLLUP_SECONDS = REGISTRY.histogram(
+    "fw_cycle_monitor_rollup_batch_duration_seconds", "Time spent committing a batch of cycle times to the rollups."
+)
+
+#: Events kept in memory for the SQLite store (and cycle times for the
+#: rollups) while it is failing.
+_STORE_RETRY_LIMIT = 10000
+
+#: A replaying monitor saves its counter state and metrics once per this many
+#: cycles, or this often, instead of for every cycle.
+_REPLAY_BATCH_EVENTS = 1000
+_REPLAY_BATCH_SECONDS = 1.0
+
+
+_fdatasync = getattr(os, "fdatasync", os.fsync)
+
+
+def _format_rows(rows: list[list[str]]) -> bytes:
+    """Return ``rows`` encoded exactly as ``csv.writer`` writes them to the CSV."""
+
+    if not rows:
+        return b""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _is_timestamp(value: str) -> bool:
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
 
 
 class GPIOUnavailableError(RuntimeError):
@@ -41,15 +167,27 @@ class MonitorStats:
 
     last_event_time: Optional[datetime] = None
     events_logged: int = 0
+    last_pulse_seconds: Optional[float] = None
+    pulses_measured: int = 0
+
+
+@dataclass
+class _OpenPulse:
+    """A cycle whose CSV row and saved state wait for the falling edge."""
+
+    rising_edge: float
+    timestamp: datetime
+    cycle_number: int
 
 
 class _CycleCounter:
     """Track cycle numbers with automatic daily resets."""
 
-    def __init__(self, reset_hour: int = 3):
+    def __init__(self, reset_hour: int = 3, on_rollover: Optional[Callable[[datetime], object]] = None):
         self._reset_hour = reset_hour
         self._count = 0
         self._next_reset: Optional[datetime] = None
+        self._on_rollover = on_rollover
 
     def _calculate_next_reset(self, reference: datetime) -> datetime:
         cycle_reset = reference.replace(
@@ -72,36 +210,134 @@ class _CycleCounter:
             self.configure(timestamp, self._count)
 
         while self._next_reset and timestamp >= self._next_reset:
+            boundary = self._next_reset
             self._count = 0
             self._next_reset = self._next_reset + timedelta(days=1)
+            if self._on_rollover is not None:
+                try:
+                    self._on_rollover(boundary)
+                except Exception:  # pragma: no cover - summaries must not block counting
+                    LOGGER.exception("Daily rollover handler failed")
 
         self._count += 1
         return self._count
 
+    def set_reset_hour(self, reset_hour: int, reference: datetime) -> None:
+        """Move the daily reset to ``reset_hour`` without touching today's count."""
+
+        self._reset_hour = reset_hour
+        if self._next_reset is not None:
+            self._next_reset = self._calculate_next_reset(reference)
+
     @property
     def count(self) -> int:
         return self._count
 
+    @property
+    def next_reset(self) -> Optional[datetime]:
+        return self._next_reset
+
 
 class CycleMonitor:
     """Monitor a GPIO pin for rising edges and log cycle times."""
 
-    def __init__(self, config: AppConfig, callback: Optional[Callable[[datetime], None]] = None):
+    def __init__(
+        self,
+        config: AppConfig,
+        callback: Optional[Callable[[datetime], None]] = None,
+        *,
+        capture_tuning: Optional[Callable[[], object]] = None,
+        replay: bool = False,
+    ):
         self.config = config
         self._callback = callback
+        # Fed recorded history through ``replay_event``: the machine state
+        # follows the event timestamps and cycles are saved in batches.
+        self._replay = replay
+        # Called once from each thread that delivers edge callbacks, which
+        # RPi.GPIO creates itself (see ``fw_cycle_monitor.low_jitter``).
+        self._capture_tuning = capture_tuning
+        self._tuned_thread: Optional[int] = None
         self._lock = threading.Lock()
+        # Held by ``reload`` while it swaps the configuration and per-machine
+        # trackers, and by ``_record_event`` while it uses them, so an event
+        # is recorded entirely before or entirely after a reload.  Taken
+        # before any other lock; re-entrant because releasing a held pulse
+        # happens both inside and outside those two.
+        self._reload_lock = threading.RLock()
         self._stats = MonitorStats()
         self._running = False
-        self._counter = _CycleCounter(config.reset_hour)
+        self._uses_gpio = False
+        self._summaries: DailySummaryRecorder
+        self._counter: _CycleCounter
+        self._machine_state: MachineStateTracker
+        self._anomalies: Optional[AnomalyDetector] = None
+        self._create_machine_trackers(config)
         self._counter_initialized = False
         self._csv_initialized = False
-        self._pending_rows: list[list[str]] = []
+        self._appender: Optional[CsvAppender] = None
+        self._replicator: Optional[CsvReplicator] = None
+        self._event_store: Optional[EventStore] = None
+        self._store_queue: list[StoredEvent] = []
+        # ``(machine_id, timestamp, cycle seconds)`` for the rollups, written
+        # by the writer thread like ``_store_queue``.
+        self._rollup_queue: list[tuple[str, datetime, float]] = []
+        # ``(timestamp, cycle number, pulse width)`` committed but not yet in
+        # the saved state and metrics; guarded by ``_reload_lock``.
+        self._unsaved_cycles: list[tuple[datetime, int, Optional[float]]] = []
+        self._cycles_saved_at = time.monotonic()
+        self._spool: Optional[PendingSpool] = None
         self._pending_loaded = False
+        self._flush_lock = threading.Lock()
         self._write_queue: list[list[str]] = []
+        # Rows that do not fit in the queue, on local storage.  Guarded by
+        # ``_overflow_lock``, which may be taken while holding ``_lock`` but
+        # not the other way round.
+        self._overflow: Optional[OverflowSpool] = None
+        self._overflow_lock = threading.Lock()
+        self._batch_sequence = 0
+        self._queue_high_water = 0
         self._queue_event = threading.Event()
         self._writer_stop = threading.Event()
         self._writer_thread: Optional[threading.Thread] = None
         self._signal_high = False
+        self._open_pulse: Optional[_OpenPulse] = None
+        self._last_sync = time.monotonic()
+        self._sync_pending = False
+
+    def _create_machine_trackers(self, config: AppConfig) -> None:
+        """Build the per-machine counter, summaries, state and anomaly trackers."""
+
+        self._summaries = DailySummaryRecorder(config.machine_id, config.idle_threshold_seconds)
+        self._counter = _CycleCounter(config.reset_hour, on_rollover=self._summaries.roll_over)
+        self._machine_state = MachineStateTracker(
+            config.machine_id,
+            StateThresholds.from_config(config),
+            config.reset_hour,
+            publishing=False,
+            event_clock=self._replay,
+        )
+        self._anomalies = None
+        if config.anomaly_sensitivity != "off":
+            self._anomalies = AnomalyDetector.from_config(config, publishing=False)
+
+    def _publish_machine_trackers(self) -> None:
+        """Let the trackers of a running monitor write their snapshot files."""
+
+        if self._counter.next_reset is not None:
+            self._summaries.catch_up(self._counter.next_reset)
+        self._machine_state.restore()
+        self._machine_state.publishing = True
+        self._machine_state.publish(force=True)
+        if self._anomalies is not None:
+            self._anomalies.restore()
+            self._anomalies.publishing = True
+
+    def _retire_machine_trackers(self) -> None:
+        self._summaries.persist(force=True)
+        self._machine_state.mark_down()
+        if self._anomalies is not None:
+            self._anomalies.publish(force=True)
 
     @property
     def stats(self) -> MonitorStats:
@@ -176,8 +412,14 @@ class CycleMonitor:
         self._counter.configure(reference, chosen_state.last_cycle)
         self._counter_initialized = True
 
-    def start(self) -> None:
-        if not _GPIO_AVAILABLE:
+    def start(self, *, gpio: bool = True) -> None:
+        """Start the writer thread and, unless ``gpio`` is false, edge detection.
+
+        Without GPIO the monitor only records what :meth:`replay_event` feeds
+        it, which is how ``fw-cycle-monitor replay`` drives the pipeline.
+        """
+
+        if gpio and not _load_gpio():
             raise GPIOUnavailableError(
                 "RPi.GPIO is not available. Run on a Raspberry Pi with the library installed."
             )
@@ -187,11 +429,16 @@ class CycleMonitor:
                 LOGGER.debug("CycleMonitor already running")
                 return
             self._running = True
+            self._uses_gpio = gpio
 
         try:
-            LOGGER.info("Starting monitor on pin %s for machine %s", self.config.gpio_pin, self.config.machine_id)
+            if gpio:
+                LOGGER.info("Starting monitor on pin %s for machine %s", self.config.gpio_pin, self.config.machine_id)
+            else:
+                LOGGER.info("Starting monitor without GPIO for machine %s", self.config.machine_id)
             self._restore_counter_state()
             self._prepare_storage()
+            self._publish_machine_trackers()
         except Exception:
             with self._lock:
                 self._running = False
@@ -204,7 +451,10 @@ class CycleMonitor:
             self._writer_thread = writer_thread
 
         writer_thread.start()
+        self._start_replicator()
 
+        if not gpio:
+            return
         try:
             self._setup_gpio()
         except Exception:
@@ -215,22 +465,135 @@ class CycleMonitor:
         self._queue_event.set()
 
     def stop(self) -> None:
-        if not _GPIO_AVAILABLE:
-            return
-
         with self._lock:
             if not self._running:
                 return
-            LOGGER.info("Stopping monitor on pin %s", self.config.gpio_pin)
-            try:
-                GPIO.remove_event_detect(self.config.gpio_pin)  # type: ignore[attr-defined]
-            except Exception:  # pragma: no cover - best effort cleanup
-                LOGGER.debug("Event detect removal failed", exc_info=True)
-            GPIO.cleanup(self.config.gpio_pin)  # type: ignore[attr-defined]
+            if self._uses_gpio:
+                LOGGER.info("Stopping monitor on pin %s", self.config.gpio_pin)
+                self._release_gpio(self.config.gpio_pin)
             self._running = False
+            self._uses_gpio = False
 
+        self._release_open_pulse()
+        with self._reload_lock:
+            self._save_cycles()
         self._stop_writer_thread()
         self._flush_queue()
+        if self._sync_pending:
+            self._sync_csv_path()
+        self._close_appender()
+        self._close_event_store()
+        self._stop_replicator()
+        self._retire_machine_trackers()
+
+    def _release_gpio(self, pin: int) -> None:
+        try:
+            GPIO.remove_event_detect(pin)  # type: ignore[attr-defined]
+        except Exception:  # pragma: no cover - best effort cleanup
+            LOGGER.debug("Event detect removal failed", exc_info=True)
+        GPIO.cleanup(pin)  # type: ignore[attr-defined]
+
+    def reload(self, config: AppConfig) -> list[str]:
+        """Switch to ``config`` in place and return the names of the changed settings.
+
+        Only what the change affects is touched: the GPIO pin is re-armed when
+        ``gpio_pin`` changes, rows still in the write queue go to the new CSV
+        target, and the per-machine trackers are rebuilt only when
+        ``machine_id`` changes.  Settings read on every use (durability, for
+        example) simply take effect with the next event.
+        """
+
+        previous = self.config
+        changed = [
+            field.name for field in fields(AppConfig) if getattr(previous, field.name) != getattr(config, field.name)
+        ]
+        if not changed:
+            return changed
+
+        with self._reload_lock:
+            self._apply_reload(previous, config, changed)
+        return changed
+
+    def _apply_reload(self, previous: AppConfig, config: AppConfig, changed: list[str]) -> None:
+        started = time.perf_counter()
+        with self._lock:
+            running = self._running
+        machine_changed = previous.machine_id != config.machine_id
+        target_changed = (
+            previous.primary_csv_path() != config.primary_csv_path() or previous.csv_path() != config.csv_path()
+        )
+        pin_changed = running and self._uses_gpio and previous.gpio_pin != config.gpio_pin
+
+        if pin_changed:
+            self._release_gpio(previous.gpio_pin)
+            # The falling edge would arrive on a pin that is no longer watched.
+            self._release_open_pulse()
+        if machine_changed:
+            # Queued rows belong to the previous machine's CSV.
+            self._release_open_pulse()
+            self._save_cycles()
+            self._flush_queue()
+            self._retire_machine_trackers()
+        if target_changed:
+            self._stop_replicator()
+        if machine_changed or {"event_store", "reset_hour"} & set(changed):
+            self._close_event_store()
+
+        with self._flush_lock:
+            self.config = config
+            if target_changed:
+                if self._appender is not None:
+                    self._appender.close()
+                self._csv_initialized = False
+                spool = self._spool
+                if spool is None or not spool.pending_bytes:
+                    self._pending_loaded = False
+                # Otherwise the backlog drains into the new target before the
+                # spool follows it (see ``_write_queued_rows``).
+
+        if machine_changed:
+            with self._lock:
+                self._create_machine_trackers(config)
+                self._counter_initialized = False
+            self._restore_counter_state()
+        else:
+            if previous.reset_hour != config.reset_hour:
+                with self._lock:
+                    self._counter.set_reset_hour(config.reset_hour, datetime.now(timezone.utc).astimezone())
+                self._machine_state.reset_hour = config.reset_hour
+            self._machine_state.thresholds = StateThresholds.from_config(config)
+            self._summaries.idle_threshold = float(config.idle_threshold_seconds)
+            if previous.anomaly_sensitivity != config.anomaly_sensitivity:
+                if self._anomalies is not None:
+                    self._anomalies.publish(force=True)
+                anomalies = None
+                if config.anomaly_sensitivity != "off":
+                    anomalies = AnomalyDetector.from_config(config, publishing=False)
+                    if running:
+                        anomalies.restore()
+                        anomalies.publishing = True
+                self._anomalies = anomalies
+
+        if target_changed:
+            try:
+                self._prepare_storage()
+            except Exception:
+                # ``_record_event`` retries before the next row is written.
+                LOGGER.exception("Unable to prepare the new CSV target %s", config.primary_csv_path())
+        if running:
+            if machine_changed:
+                self._publish_machine_trackers()
+            if target_changed:
+                self._start_replicator()
+            if pin_changed:
+                self._setup_gpio()
+            self._queue_event.set()
+
+        LOGGER.info(
+            "Reloaded configuration in %.1f ms; changed: %s",
+            (time.perf_counter() - started) * 1000.0,
+            ", ".join(changed),
+        )
 
     def _stop_writer_thread(self) -> None:
         thread = self._writer_thread
@@ -248,11 +611,74 @@ class CycleMonitor:
 
     def _writer_loop(self) -> None:  # pragma: no cover - background worker
         while not self._writer_stop.is_set():
-            self._queue_event.wait(timeout=5)
+            self._queue_event.wait(timeout=self._writer_wait_timeout())
             self._queue_event.clear()
             self._flush_queue()
+            if self._sync_pending and self._sync_due():
+                self._sync_csv_path()
+            with self._reload_lock:
+                self._machine_state.tick()
+                self._release_open_pulse(max_age=self.config.slow_cycle_seconds)
         # Final flush after stop requested
         self._flush_queue()
+        if self._sync_pending:
+            self._sync_csv_path()
+
+    # -----------------
+    # Replication
+
+    def _start_replicator(self) -> None:
+        if self.config.storage_mode != "local-first" or self._replicator is not None:
+            return
+        self._replicator = CsvReplicator(
+            self.config.primary_csv_path(), self.config.csv_path(), self.config.machine_id
+        )
+        self._replicator.start()
+
+    def _stop_replicator(self) -> None:
+        replicator = self._replicator
+        self._replicator = None
+        if replicator is not None:
+            replicator.stop()
+
+    # -----------------
+    # Durability
+
+    def _writer_wait_timeout(self) -> float:
+        if not self._sync_pending:
+            return 5.0
+        interval = self.config.durability_interval_ms / 1000.0
+        remaining = interval - (time.monotonic() - self._last_sync)
+        return min(5.0, max(remaining, 0.0))
+
+    def _sync_due(self) -> bool:
+        interval = self.config.durability_interval_ms / 1000.0
+        return time.monotonic() - self._last_sync >= interval
+
+    def _apply_durability(self, csv_file, force: bool = False) -> None:
+        """Sync ``csv_file`` according to the configured durability mode."""
+
+        mode = self.config.durability
+        if mode == "none":
+            return
+        if mode == "interval" and not force and not self._sync_due():
+            # Group commit: a later flush or the writer loop syncs the batch.
+            self._sync_pending = True
+            return
+        csv_file.flush()
+        started = time.perf_counter()
+        _fdatasync(csv_file.fileno())
+        _SYNC_SECONDS.observe(time.perf_counter() - started)
+        self._last_sync = time.monotonic()
+        self._sync_pending = False
+
+    def _sync_csv_path(self) -> None:
+        appender = self._csv_appender()
+        try:
+            self._apply_durability(appender, force=True)
+        except OSError:
+            LOGGER.warning("Unable to sync CSV file %s", appender.path, exc_info=True)
+            appender.close()
 
     def reset_cycle_counter(self, reference: Optional[datetime] = None) -> None:
         """Manually reset the cycle counter so the next event logs as cycle 1."""
@@ -357,6 +783,23 @@ class CycleMonitor:
                 ) from final_exc
 
     def _handle_event(self, channel: int) -> None:  # pragma: no cover - triggered by GPIO
+        # Timestamp the edge before anything else so pulse widths do not
+        # include the time spent in the callback.
+        edge_time = time.monotonic()
+        if self._capture_tuning is not None and self._tuned_thread != threading.get_ident():
+            self._tuned_thread = threading.get_ident()
+            try:
+                self._capture_tuning()
+            except Exception:  # pragma: no cover - tuning is best effort
+                LOGGER.exception("Failed to tune the GPIO callback thread")
+        started = time.perf_counter()
+        _CALLBACKS.inc()
+        try:
+            self._process_edge(edge_time)
+        finally:
+            _CALLBACK_SECONDS.observe(time.perf_counter() - started)
+
+    def _process_edge(self, edge_time: float) -> None:  # pragma: no cover - triggered by GPIO
         current_level: Optional[int] = None
         try:
             current_level = int(GPIO.input(self.config.gpio_pin))  # type: ignore[attr-defined]
@@ -366,15 +809,22 @@ class CycleMonitor:
         if current_level == 0:
             with self._lock:
                 self._signal_high = False
+                pulse = self._open_pulse
+                self._open_pulse = None
+            if pulse is None:
+                _EDGES_REJECTED_LOW.inc()
+            else:
+                self._finish_pulse(pulse, edge_time - pulse.rising_edge)
             return
 
         with self._lock:
             if self._signal_high:
+                _EDGES_REJECTED_HIGH.inc()
                 return
             self._signal_high = True
 
         timestamp = datetime.now(timezone.utc).astimezone()
-        cycle_number = self._record_event(timestamp)
+        cycle_number = self._record_event(timestamp, rising_edge=edge_time)
         if cycle_number is None:
             with self._lock:
                 self._signal_high = False
@@ -410,21 +860,48 @@ class CycleMonitor:
             self._callback(timestamp)
         return timestamp
 
+    def replay_event(self, timestamp: datetime, pulse_seconds: Optional[float] = None) -> Optional[int]:
+        """Record a cycle from history as if its edges had just been seen.
+
+        ``timestamp`` drives the counter, daily summaries and metrics exactly
+        like a live event; ``pulse_seconds`` is the recorded pulse width, if
+        any.  Returns the cycle number, or ``None`` when storage failed.
+
+        On a monitor built with ``replay=True`` the machine state follows the
+        event timestamps, and the counter state and metrics are saved every
+        ``_REPLAY_BATCH_EVENTS`` cycles or ``_REPLAY_BATCH_SECONDS`` and at
+        :meth:`stop`, so the rollups get one transaction per batch.
+        """
+
+        with self._lock:
+            if not self._counter_initialized:
+                self._restore_counter_state()
+        rising_edge = time.monotonic() if pulse_seconds is not None else None
+        cycle_number = self._record_event(timestamp, rising_edge)
+        if rising_edge is not None:
+            with self._lock:
+                pulse = self._open_pulse
+                self._open_pulse = None
+            if pulse is not None:
+                self._finish_pulse(pulse, pulse_seconds)
+        with self._lock:
+            self._stats.last_event_time = timestamp
+            self._stats.events_logged += 1
+        return cycle_number
+
     def _prepare_storage(self) -> None:
-        csv_path = self.config.csv_path()
+        csv_path = self.config.primary_csv_path()
         if self._csv_initialized:
-            if not csv_path.exists():
-                LOGGER.warning("CSV file %s missing; reinitializing storage", csv_path)
-                self._csv_initialized = False
-            else:
-                if not self._pending_loaded:
-                    self._load_pending_rows()
-                return
+            # The appender notices deleted or rotated files itself, so the hot
+            # path does not need to stat the CSV for every event.
+            if not self._pending_loaded:
+                self._load_pending_rows()
+            return
         try:
-            Path(self.config.csv_directory).mkdir(parents=True, exist_ok=True)
-            self._ensure_shared_permissions(Path(self.config.csv_directory), directory=True)
+            csv_path.parent.mkdir(parents=True, exist_ok=True)
+            self._ensure_shared_permissions(csv_path.parent, directory=True)
         except OSError:
-            LOGGER.exception("Failed to create CSV directory %s", self.config.csv_directory)
+            LOGGER.exception("Failed to create CSV directory %s", csv_path.parent)
             raise
 
         if not csv_path.exists():
@@ -449,6 +926,15 @@ class CycleMonitor:
             self._counter.configure(reference.astimezone(), last_count)
             self._counter_initialized = True
 
+        if self._counter_initialized:
+            # Restored from saved state (or a reload switched targets); the
+            # row count below would only be discarded.
+            self._ensure_shared_permissions(csv_path)
+            self._csv_initialized = True
+            self._load_pending_rows()
+            self._flush_queue()
+            return
+
         last_timestamp: Optional[datetime] = None
         last_count = 0
         try:
@@ -481,25 +967,33 @@ class CycleMonitor:
         self._flush_queue()
 
     def _ensure_migrated(self, csv_path: Path) -> Optional[tuple[datetime, int]]:
+        # Only the first row decides the format, so a current file (the usual
+        # case, and every reload that changes the target) is not read in full.
         try:
             with csv_path.open("r", newline="") as csv_file:
-                reader = csv.reader(csv_file)
-                rows = list(reader)
+                first_row = next(csv.reader(csv_file), None)
         except OSError:
             LOGGER.exception("Failed to open CSV file %s for migration", csv_path)
             raise
 
-        if not rows:
+        if first_row is None:
             reference = datetime.now(timezone.utc).astimezone()
             return (reference, 0)
 
-        # Check if we need to migrate from old format (2 or 3 columns) to new format (1 column - timestamp only)
-        first_row = rows[0]
-        if len(first_row) == 1:
-            # Already in correct format (timestamp only)
+        # Check if we need to migrate from old format (2 or 3 columns, timestamp
+        # last) to the current format (timestamp first, optionally followed by
+        # the pulse width)
+        if len(first_row) == 1 or (first_row and _is_timestamp(first_row[0])):
+            # Already in the current format
             return None
 
         if len(first_row) in (2, 3):
+            try:
+                with csv_path.open("r", newline="") as csv_file:
+                    rows = list(csv.reader(csv_file))
+            except OSError:
+                LOGGER.exception("Failed to open CSV file %s for migration", csv_path)
+                raise
             # Migrate from old format to new format (timestamp only)
             LOGGER.info("Migrating CSV file %s to timestamp-only format", csv_path)
             counter = _CycleCounter()
@@ -538,133 +1032,488 @@ class CycleMonitor:
         # Unknown format
         return None
 
-    def _record_event(self, timestamp: datetime) -> Optional[int]:
+    def _record_event(self, timestamp: datetime, rising_edge: Optional[float] = None) -> Optional[int]:
+        """Record a cycle starting at ``timestamp``.
+
+        With ``rising_edge`` (a :func:`time.monotonic` reading) the CSV row,
+        saved counter state and metrics are held until the falling edge so
+        they can carry the pulse width (see :meth:`_commit_cycle`); the
+        in-memory counter and trackers are still updated immediately.
+        """
+
+        with self._reload_lock:
+            return self._record_event_locked(timestamp, rising_edge)
+
+    def _record_event_locked(self, timestamp: datetime, rising_edge: Optional[float]) -> Optional[int]:
+        started = time.perf_counter()
+        # A rising edge while a pulse is still open means the falling edge was missed.
+        self._release_open_pulse()
         try:
             self._prepare_storage()
         except Exception:
             LOGGER.exception("Unable to prepare storage for cycle events")
+            _RECORD_FAILURES.inc()
             return None
 
         cycle_number = self._counter.record(timestamp)
-        csv_path = self.config.csv_path()
+        try:
+            self._summaries.add(timestamp, self._counter.next_reset or timestamp)
+        except Exception:  # pragma: no cover - summaries are best effort
+            LOGGER.exception("Failed to update the daily summary for %s", self.config.machine_id)
+        self._machine_state.record_event(timestamp)
+        if self._anomalies is not None:
+            try:
+                self._anomalies.observe(timestamp)
+            except Exception:  # pragma: no cover - detection is best effort
+                LOGGER.exception("Anomaly detection failed for %s", self.config.machine_id)
+        if rising_edge is not None:
+            with self._lock:
+                self._open_pulse = _OpenPulse(rising_edge, timestamp, cycle_number)
+        else:
+            self._commit_cycle(timestamp, cycle_number)
+        _RECORD_SECONDS.observe(time.perf_counter() - started)
+        _EVENTS_RECORDED.inc()
+        return cycle_number
+
+    def _commit_cycle(self, timestamp: datetime, cycle_number: int, width: Optional[float] = None) -> None:
+        """Save the counter state and metrics for a cycle and queue its CSV row.
+
+        All three are written together, once the pulse width is known, so a
+        crash mid-pulse loses the cycle from all of them rather than leaving
+        the saved counter ahead of the CSV.  The rollups and the event store
+        are written from the queues by the writer thread.  Callers hold
+        ``_reload_lock``.
+        """
+
         row = [timestamp.isoformat()]
+        if width is not None:
+            row.append(f"{width:.3f}")
+        if self.config.event_store == "sqlite":
+            with self._lock:
+                # Committed by the writer thread together with the CSV row.
+                self._store_queue.append(StoredEvent(timestamp, cycle_number))
+        self._unsaved_cycles.append((timestamp, cycle_number, width))
+        if (
+            not self._replay
+            or len(self._unsaved_cycles) >= _REPLAY_BATCH_EVENTS
+            or time.monotonic() - self._cycles_saved_at >= _REPLAY_BATCH_SECONDS
+        ):
+            self._save_cycles()
+        # Last, so the flush it triggers also takes the store and rollup entries.
         self._enqueue_row(row)
+
+    def _save_cycles(self) -> None:
+        """Save the counter state and metrics for the cycles committed so far.
+
+        Live cycles are saved one at a time; a replay saves them in batches.
+        Callers hold ``_reload_lock``.
+        """
+
+        cycles = self._unsaved_cycles
+        self._unsaved_cycles = []
+        self._cycles_saved_at = time.monotonic()
+        if not cycles:
+            return
+        machine_id = self.config.machine_id
+        timestamp, cycle_number, _ = cycles[-1]
+        state_started = time.perf_counter()
         try:
             save_cycle_state(
-                self.config.machine_id,
+                machine_id,
                 last_cycle=cycle_number,
                 last_timestamp=timestamp,
             )
         except Exception:  # pragma: no cover - best effort persistence
-            LOGGER.exception("Failed to persist cycle state for %s", self.config.machine_id)
+            LOGGER.exception("Failed to persist cycle state for %s", machine_id)
+        _SAVE_STATE_SECONDS.observe(time.perf_counter() - state_started)
         self._persist_sidecar_state(cycle_number, timestamp)
+        metrics_started = time.perf_counter()
         try:
-            record_cycle_event(self.config.machine_id, timestamp)
+            cycle_times = record_cycle_events(
+                machine_id, [(ts, (ts, width) if width is not None else None) for ts, _, width in cycles]
+            )
         except Exception:
-            LOGGER.exception("Failed to update cycle metrics for %s", self.config.machine_id)
-        return cycle_number
+            LOGGER.exception("Failed to update cycle metrics for %s", machine_id)
+        else:
+            if cycle_times:
+                with self._lock:
+                    self._rollup_queue.extend((machine_id, ts, seconds) for ts, seconds in cycle_times)
+        _RECORD_METRICS_SECONDS.observe(time.perf_counter() - metrics_started)
+
+    # -----------------
+    # Pulse width
+
+    def _finish_pulse(self, pulse: _OpenPulse, width: float) -> None:
+        """Complete ``pulse`` at its falling edge and commit its cycle with the width."""
+
+        width = max(width, 0.0)
+        _PULSE_SECONDS.observe(width)
+        with self._lock:
+            self._stats.last_pulse_seconds = width
+            self._stats.pulses_measured += 1
+        with self._reload_lock:
+            self._commit_cycle(pulse.timestamp, pulse.cycle_number, width)
+
+    def _release_open_pulse(self, max_age: Optional[float] = None) -> None:
+        """Commit the held cycle without a pulse width if its falling edge is overdue."""
+
+        with self._lock:
+            pulse = self._open_pulse
+            if pulse is None:
+                return
+            if max_age is not None and time.monotonic() - pulse.rising_edge <= max_age:
+                return
+            self._open_pulse = None
+        _PULSES_UNMEASURED.inc()
+        with self._reload_lock:
+            self._commit_cycle(pulse.timestamp, pulse.cycle_number)
 
     # -----------------
     # Pending row logic
 
     def _enqueue_row(self, row: list[str]) -> None:
+        spill: Optional[list[list[str]]] = None
         with self._lock:
             if not self._pending_loaded:
                 self._load_pending_rows()
             self._write_queue.append(row)
             running = self._running
+            if running and len(self._write_queue) >= self.config.write_queue_capacity:
+                # The writer is stuck (typically on an unreachable share);
+                # move the queue to local storage instead of growing it.
+                spill = self._write_queue
+                self._write_queue = []
+                sequence = self._next_batch_sequence()
+                # Taken before ``_lock`` is released so the writer cannot
+                # look for older segments before this one exists.
+                self._overflow_lock.acquire()
+            self._note_queue_depth(len(self._write_queue))
+
+        if spill is not None:
+            try:
+                stored = self._store_overflow(spill, _format_rows(spill), sequence, merge=False)
+            finally:
+                self._overflow_lock.release()
+            _WRITE_QUEUE_OVERFLOWS.inc()
+            if not stored:
+                self._requeue_rows(spill)
 
         if running:
             self._queue_event.set()
         else:
             if not self._flush_queue():
                 LOGGER.warning(
-                    "CSV file %s is busy; queued event at %s for retry", self.config.csv_path(), row[0]
+                    "CSV file %s is busy; queued event at %s for retry", self.config.primary_csv_path(), row[0]
                 )
+            elif self._sync_pending:
+                # Without a writer thread nothing would complete the group commit.
+                self._sync_csv_path()
+            # One-off writers (e.g. the GUI test button) should not hold the file open.
+            self._close_appender()
+            self._close_event_store()
 
     def _spool_path(self) -> Path:
-        csv_path = self.config.csv_path()
+        csv_path = self.config.primary_csv_path()
         return csv_path.with_name(csv_path.name + ".pending")
 
+    def _overflow_dir(self) -> Path:
+        # Always on the Pi's own storage, unlike the spool next to the CSV.
+        return CONFIG_DIR / "overflow" / self.config.primary_csv_path().name
+
     def _load_pending_rows(self) -> None:
         if self._pending_loaded:
             return
         spool_path = self._spool_path()
-        if spool_path.exists():
-            try:
-                with spool_path.open("r", newline="") as spool_file:
-                    reader = csv.reader(spool_file)
-                    for row in reader:
-                        if len(row) >= 1:
-                            self._pending_rows.append(row[:1])
-            except OSError:
-                LOGGER.exception("Failed to read pending events from %s", spool_path)
+        if self._spool is None or self._spool.path != spool_path:
+            self._spool = PendingSpool(spool_path)
+        self._spool.load()
+        overflow_dir = self._overflow_dir()
+        with self._overflow_lock:
+            overflow = self._overflow
+            # A backlog left for the previous target drains before switching.
+            if overflow is None or (overflow.directory != overflow_dir and not overflow.pending_bytes):
+                overflow = self._overflow = OverflowSpool(overflow_dir)
+                overflow.load()
+                self._batch_sequence = max(self._batch_sequence, overflow.last_sequence + 1)
         self._pending_loaded = True
+        self._update_spool_gauges()
+
+    def _next_batch_sequence(self) -> int:
+        # Called with ``_lock`` held.
+        sequence = self._batch_sequence
+        self._batch_sequence += 1
+        return sequence
+
+    def _note_queue_depth(self, depth: int) -> None:
+        _WRITE_QUEUE_DEPTH.set(depth)
+        if depth > self._queue_high_water:
+            self._queue_high_water = depth
+            _WRITE_QUEUE_HIGH_WATER.set(depth)
+
+    def _update_spool_gauges(self) -> None:
+        spool = self._spool
+        if spool is not None:
+            _SPOOL_ROWS.set(spool.pending_rows)
+            _SPOOL_BYTES.set(spool.pending_bytes)
+            _SPOOL_AGE.set(spool.age_seconds())
+        overflow = self._overflow
+        if overflow is not None:
+            _OVERFLOW_ROWS.set(overflow.pending_rows)
+            _OVERFLOW_BYTES.set(overflow.pending_bytes)
+
+    def machine_state(self) -> dict[str, object]:
+        """Return the current machine state and today's time-in-state counters."""
+
+        return self._machine_state.snapshot()
+
+    def spool_status(self) -> dict[str, object]:
+        """Report how many rows are waiting in the spools and the write queue."""
+
+        spool = self._spool
+        with self._overflow_lock:
+            overflow = self._overflow
+            overflow_rows = overflow.pending_rows if overflow else 0
+            overflow_bytes = overflow.pending_bytes if overflow else 0
+            overflow_oldest = overflow.oldest_timestamp if overflow else None
+        with self._lock:
+            queue_depth = len(self._write_queue)
+        status: dict[str, object] = {"rows": 0, "bytes": 0, "oldest": None, "age_seconds": 0.0}
+        if spool is not None:
+            oldest = spool.oldest_timestamp
+            status = {
+                "rows": spool.pending_rows,
+                "bytes": spool.pending_bytes,
+                "oldest": oldest.isoformat() if oldest else None,
+                "age_seconds": spool.age_seconds(),
+            }
+        status.update(
+            {
+                "overflow_rows": overflow_rows,
+                "overflow_bytes": overflow_bytes,
+                "overflow_oldest": overflow_oldest.isoformat() if overflow_oldest else None,
+                "queue_depth": queue_depth,
+                "queue_capacity": self.config.write_queue_capacity,
+                "queue_high_water": self._queue_high_water,
+                "queue_overflows": int(_WRITE_QUEUE_OVERFLOWS.value),
+                "rows_dropped": int(_ROWS_DROPPED.value),
+            }
+        )
+        return status
 
-    def _persist_pending_rows(self) -> None:
-        spool_path = self._spool_path()
-        if not self._pending_rows:
-            if spool_path.exists():
-                try:
-                    spool_path.unlink()
-                except OSError:
-                    LOGGER.debug("Unable to remove empty spool file %s", spool_path, exc_info=True)
-            return
+    def _spool_rows(self, rows: list[list[str]], payload: bytes, sequence: int) -> None:
+        """Store rows the CSV rejected in the pending spool or the overflow spool.
+
+        The pending spool drains before the overflow spool, so it is only used
+        while the overflow spool is empty; rows that reach neither go back to
+        the front of the queue.
+        """
+
+        with self._overflow_lock:
+            overflow = self._overflow
+            use_pending = overflow is None or not overflow.pending_bytes
+        spool = self._spool
+        if use_pending and spool is not None:
+            try:
+                spool.append(payload, len(rows))
+                return
+            except OSError as exc:
+                LOGGER.warning("Failed to persist pending events to %s: %s", self._spool_path(), exc)
+        with self._overflow_lock:
+            stored = self._store_overflow(rows, payload, sequence, merge=True)
+        if not stored:
+            self._requeue_rows(rows)
+
+    def _store_overflow(self, rows: list[list[str]], payload: bytes, sequence: int, *, merge: bool) -> bool:
+        # Called with ``_overflow_lock`` held.
+        overflow = self._overflow
         try:
-            with spool_path.open("w", newline="") as spool_file:
-                writer = csv.writer(spool_file)
-                writer.writerows(self._pending_rows)
-            self._ensure_shared_permissions(spool_path, file_mode=0o664)
+            if overflow is None:
+                raise OSError("overflow spool is not initialised")
+            overflow.append(payload, len(rows), sequence, merge=merge)
         except OSError:
-            LOGGER.exception("Failed to persist pending events to %s", spool_path)
+            LOGGER.exception("Failed to persist %s events to the overflow spool %s", len(rows), self._overflow_dir())
+            return False
+        self._update_spool_gauges()
+        return True
+
+    def _requeue_rows(self, rows: list[list[str]]) -> None:
+        """Put rows no spool accepted back in front of the queue, within its capacity."""
+
+        with self._lock:
+            # Keep ordering: these rows precede anything enqueued meanwhile.
+            queue = rows + self._write_queue
+            capacity = self.config.write_queue_capacity
+            if len(queue) > capacity:
+                dropped = len(queue) - capacity
+                _ROWS_DROPPED.inc(dropped)
+                LOGGER.error(
+                    "Dropped %s events after %s: the CSV and both spools are unavailable",
+                    dropped,
+                    queue[capacity][0],
+                )
+                queue = queue[:capacity]
+            self._write_queue = queue
+            self._note_queue_depth(len(queue))
+
+    def _csv_appender(self) -> CsvAppender:
+        csv_path = self.config.primary_csv_path()
+        appender = self._appender
+        if appender is None or appender.path != csv_path:
+            if appender is not None:
+                appender.close()
+            appender = self._appender = CsvAppender(csv_path)
+        return appender
+
+    def _close_appender(self) -> None:
+        with self._flush_lock:
+            if self._appender is not None:
+                self._appender.close()
 
     def _flush_queue(self) -> bool:
-        csv_path = self.config.csv_path()
+        started = time.perf_counter()
+        try:
+            with self._flush_lock:
+                written = self._write_queued_rows()
+                self._write_event_store()
+                self._write_rollups()
+                return written
+        finally:
+            _FLUSH_SECONDS.observe(time.perf_counter() - started)
+
+    def _write_queued_rows(self) -> bool:
+        appender = self._csv_appender()
+        csv_path = appender.path
         with self._lock:
             if not self._pending_loaded:
                 self._load_pending_rows()
-            if not self._pending_rows and not self._write_queue:
-                return True
-            rows_to_write = [row[:] for row in self._pending_rows]
-            rows_to_write.extend(self._write_queue)
-            latest_row: Optional[list[str]] = None
-            if self._write_queue:
-                latest_row = self._write_queue[-1]
-            elif self._pending_rows:
-                latest_row = self._pending_rows[-1]
-            had_new_rows = bool(self._write_queue)
-            self._pending_rows = []
+            rows = self._write_queue
             self._write_queue = []
+            sequence = self._next_batch_sequence()
+            _WRITE_QUEUE_DEPTH.set(0)
+
+        with self._overflow_lock:
+            # Spills numbered after this batch hold newer rows; they wait for
+            # the next flush.
+            overflow = self._overflow
+            segments = overflow.segments_before(sequence) if overflow else []
+        spool = self._spool
+        backlog_rows = (spool.pending_rows if spool else 0) + sum(segment.pending_rows for segment in segments)
+        if not rows and not (spool and spool.pending_bytes) and not segments:
+            return True
 
+        payload = _format_rows(rows)
+        drained_offset: Optional[int] = None
+        drained_overflow: list[tuple[PendingSpool, int]] = []
         try:
-            with csv_path.open("a", newline="") as csv_file:
-                writer = csv.writer(csv_file)
-                writer.writerows(rows_to_write)
-            self._ensure_shared_permissions(csv_path)
-            self._persist_pending_rows()
-            if latest_row and had_new_rows:
-                LOGGER.debug(
-                    "Logged event at %s to %s", latest_row[0], csv_path
-                )
-            elif rows_to_write:
-                LOGGER.debug("Flushed %s pending rows to %s", len(rows_to_write), csv_path)
-            return True
+            appender.ensure_current()
+            if spool and spool.pending_bytes:
+                drained_offset = spool.drain_into(appender)
+            for segment in segments:
+                drained_overflow.append((segment, segment.drain_into(appender)))
+            if payload:
+                appender.write(payload)
+            self._apply_durability(appender)
         except OSError:
             LOGGER.warning(
                 "CSV file %s is busy while flushing pending rows", csv_path,
                 exc_info=True,
             )
-            with self._lock:
-                self._pending_rows = rows_to_write
-                self._write_queue = []
-            self._persist_pending_rows()
+            # Reopen on the next attempt in case the share was remounted.
+            appender.close()
+            _FLUSH_FAILURES.inc()
+            if rows:
+                self._spool_rows(rows, payload, sequence)
+            self._update_spool_gauges()
             return False
 
+        if spool and drained_offset is not None:
+            spool.mark_drained(drained_offset)
+            if not spool.pending_bytes and spool.path != self._spool_path():
+                # A reload moved the CSV; the old backlog is drained, so
+                # follow with the spool next to the new target.
+                with self._lock:
+                    self._pending_loaded = False
+        if overflow is not None and drained_overflow:
+            with self._overflow_lock:
+                overflow.mark_drained(drained_overflow)
+            if not overflow.pending_bytes and overflow.directory != self._overflow_dir():
+                with self._lock:
+                    self._pending_loaded = False
+        _FLUSHES.inc()
+        self._update_spool_gauges()
+        if self._replicator is not None:
+            self._replicator.notify()
+        if rows:
+            LOGGER.debug("Logged event at %s to %s", rows[-1][0], csv_path)
+        if backlog_rows:
+            LOGGER.debug("Flushed %s pending rows to %s", backlog_rows, csv_path)
+        return True
+
+    def _write_event_store(self) -> None:
+        with self._lock:
+            events = self._store_queue
+            self._store_queue = []
+        if not events:
+            return
+        store = self._event_store
+        if store is None:
+            store = self._event_store = EventStore(reset_hour=self.config.reset_hour)
+        started = time.perf_counter()
+        try:
+            store.write_batch(self.config.machine_id, events)
+        except sqlite3.Error:
+            LOGGER.warning("Unable to write %s events to %s; will retry", len(events), store.path, exc_info=True)
+            store.close()
+            with self._lock:
+                self._store_queue[:0] = events
+                overflow = len(self._store_queue) - _STORE_RETRY_LIMIT
+                if overflow > 0:
+                    # The CSV still has these rows; only the database copy is dropped.
+                    LOGGER.error("Dropping %s events queued for the event store", overflow)
+                    del self._store_queue[:overflow]
+            return
+        _STORE_SECONDS.observe(time.perf_counter() - started)
+
+    def _write_rollups(self) -> None:
+        with self._lock:
+            queued = self._rollup_queue
+            self._rollup_queue = []
+        if not queued:
+            return
+        batches: dict[str, list[tuple[datetime, float]]] = {}
+        for machine_id, timestamp, cycle_seconds in queued:
+            batches.setdefault(machine_id, []).append((timestamp, cycle_seconds))
+        started = time.perf_counter()
+        remaining = queued
+        try:
+            for machine_id, cycles in batches.items():
+                record_cycles(machine_id, cycles, self.config.reset_hour)
+                # Only the batches that were not committed are retried.
+                remaining = [entry for entry in remaining if entry[0] != machine_id]
+        except (sqlite3.Error, OSError):
+            LOGGER.warning("Unable to add %s cycle times to the rollups; will retry", len(remaining), exc_info=True)
+            with self._lock:
+                self._rollup_queue[:0] = remaining
+                overflow = len(self._rollup_queue) - _STORE_RETRY_LIMIT
+                if overflow > 0:
+                    LOGGER.error("Dropping %s cycle times queued for the rollups", overflow)
+                    del self._rollup_queue[:overflow]
+            return
+        _ROLLUP_SECONDS.observe(time.perf_counter() - started)
+
+    def _close_event_store(self) -> None:
+        with self._flush_lock:
+            if self._event_store is not None:
+                self._event_store.close()
+                self._event_store = None
+
     # -----------------
     # Sidecar state persistence
 
     def _state_sidecar_path(self) -> Path:
-        csv_path = self.config.csv_path()
+        # Kept beside the primary log so local-first mode never touches the
+        # share from the capture path.
+        csv_path = self.config.primary_csv_path()
         return csv_path.with_name(csv_path.name + ".state.json")
 
     def _load_sidecar_state(self) -> Optional[MachineState]:
@@ -710,8 +1559,12 @@ class CycleMonitor:
         )
         try:
             tmp_path.write_text(json.dumps(payload))
+            try:
+                # The temp file is always new, so chmod it without a stat first.
+                os.chmod(tmp_path, 0o660)
+            except OSError:
+                LOGGER.debug("Unable to adjust permissions for %s", tmp_path, exc_info=True)
             tmp_path.replace(sidecar)
-            self._ensure_shared_permissions(sidecar, file_mode=0o660)
         except OSError:
             LOGGER.exception("Failed to persist sidecar state to %s", sidecar)
             try:
@@ -9,15 +9,15 @@ import sys
 import tkinter as tk
 import urllib.request
 import urllib.error
+from dataclasses import replace
 from pathlib import Path
 from tkinter import filedialog, messagebox, ttk
 from typing import Optional, Dict, Any
 
+from . import startup_profile
 from .config import AppConfig, load_config, save_config
-from .gpio_monitor import CycleMonitor
 from .metrics import AVERAGE_WINDOWS, calculate_cycle_statistics
 from .state import load_cycle_state
-from .remote_supervisor.settings import get_settings, refresh_settings
 
 LOGGER = logging.getLogger(__name__)
 
@@ -231,6 +231,8 @@ class Application(tk.Tk):
         save_config(config)
         self._config = config
 
+        from .gpio_monitor import CycleMonitor
+
         monitor = CycleMonitor(config)
         try:
             timestamp = monitor.simulate_event()
@@ -251,6 +253,9 @@ class Application(tk.Tk):
 
         save_config(config)
         self._config = config
+        if self._query_service_state() == "active":
+            # The service applies the new settings in place on SIGHUP.
+            self._control_service("reload")
         self._machine_var.set(config.machine_id)
         self._directory_var.set(str(config.csv_directory))
         self._reset_hour_var.set(str(config.reset_hour))
@@ -402,7 +407,10 @@ class Application(tk.Tk):
         if not 0 <= reset_hour <= 23:
             raise ValueError("Reset hour must be between 0 and 23")
 
-        return AppConfig(
+        # Start from the loaded configuration so settings that are not shown
+        # in the GUI (such as the durability mode) survive an Apply.
+        return replace(
+            self._config,
             machine_id=machine_id,
             gpio_pin=gpio_pin,
             csv_directory=csv_directory,
@@ -420,6 +428,8 @@ class Application(tk.Tk):
     def _initialize_stacklight_api(self) -> None:
         """Initialize connection to stack light API."""
         try:
+            from .remote_supervisor.settings import get_settings
+
             settings = get_settings()
             if not settings.stacklight.enabled:
                 self._stacklight_status_var.set("Disabled in configuration")
@@ -582,6 +592,8 @@ class Application(tk.Tk):
             messagebox.showerror("Error", f"Test sequence failed: {exc}", parent=self)
         finally:
             # Restore status
+            from .remote_supervisor.settings import get_settings
+
             settings = get_settings()
             mode = "MOCK MODE" if settings.stacklight.mock_mode else "Hardware Mode"
             self._stacklight_status_var.set(f"Ready (API mode - {mode})")
@@ -617,6 +629,8 @@ class Application(tk.Tk):
         """Reload stack light configuration and reinitialize API connection."""
         try:
             # Force refresh of cached settings
+            from .remote_supervisor.settings import refresh_settings
+
             LOGGER.info("Refreshing settings cache...")
             refresh_settings()
 
@@ -731,13 +745,15 @@ def main() -> int:
         format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
     )
     try:
-        app = Application()
+        with startup_profile.phase("build GUI"):
+            app = Application()
     except tk.TclError as exc:
         LOGGER.error("Unable to start the GUI: %s", exc)
         LOGGER.error(
             "A graphical environment is required. Launch the application from the Raspberry Pi desktop or an X11 session."
         )
         return 1
+    startup_profile.report()
     try:
         app.mainloop()
     except KeyboardInterrupt:  # pragma: no cover - allow ctrl+c
@@ -0,0 +1,398 @@
+"""In-process counters and histograms for the monitor hot path.
+
+Instruments are plain Python objects updated under a tiny lock so the GPIO
+callback only pays for a couple of attribute updates.  The service process
+publishes a JSON snapshot of the registry to ``instrumentation.json`` in the
+configuration directory every few seconds; the remote supervisor reads that
+file and renders it in the OpenMetrics text format on ``/metrics``.  Sharing a
+small file keeps the two processes decoupled, in the same way ``state.json``
+and ``metrics.json`` already are.
+
+Run ``python scripts/bench_instrumentation.py`` to measure the per-event cost
+of the instrumentation relative to the cost of logging an event.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .config import CONFIG_DIR, ensure_config_dir
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "InstrumentationPublisher",
+    "REGISTRY",
+    "Registry",
+    "load_snapshot",
+    "render_openmetrics",
+]
+
+SNAPSHOT_PATH = CONFIG_DIR / "instrumentation.json"
+PUBLISH_INTERVAL_SECONDS = 5.0
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+#: Latency buckets in seconds, from sub-millisecond callbacks to stalled shares.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelSet:
+    if not labels:
+        return ()
+    return tuple(sorted((str(key), str(value)) for key, value in labels.items()))
+
+
+class Counter:
+    """Monotonically increasing counter."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: LabelSet = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"value": self._value}
+
+
+class Gauge:
+    """Value that can go up and down, such as a queue depth."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: LabelSet = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._value = 0.0
+
+    def set(self, value: float) -> None:
+        self._value = float(value)
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"value": self._value}
+
+
+class Histogram:
+    """Fixed-bucket histogram of observed durations in seconds."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: LabelSet = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        self._counts: List[int] = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the ``q`` quantile by interpolating within its bucket."""
+
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+        if not total:
+            return None
+        target = q * total
+        running = 0
+        lower = 0.0
+        for index, value in enumerate(counts):
+            upper = self.buckets[index] if index < len(self.buckets) else lower
+            if value and running + value >= target:
+                if index >= len(self.buckets):
+                    return lower
+                fraction = (target - running) / value
+                return lower + (upper - lower) * fraction
+            running += value
+            lower = upper
+        return lower
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+            count = self._count
+        cumulative: List[int] = []
+        running = 0
+        for value in counts:
+            running += value
+            cumulative.append(running)
+        return {
+            "buckets": list(self.buckets),
+            "cumulative_counts": cumulative,
+            "sum": total,
+            "count": count,
+        }
+
+
+class Registry:
+    """Collection of instruments keyed by name and label set."""
+
+    def __init__(self) -> None:
+        self._instruments: Dict[Tuple[str, LabelSet], Any] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, documentation: str, labels: Optional[Dict[str, str]], **kwargs):
+        key = (name, _label_key(labels))
+        with self._lock:
+            existing = self._instruments.get(key)
+            if existing is not None:
+                if not isinstance(existing, cls):
+                    raise ValueError(f"Instrument {name} already registered as {existing.kind}")
+                return existing
+            instrument = cls(name, documentation, key[1], **kwargs)
+            self._instruments[key] = instrument
+            return instrument
+
+    def counter(self, name: str, documentation: str, labels: Optional[Dict[str, str]] = None) -> Counter:
+        return self._register(Counter, name, documentation, labels)
+
+    def gauge(self, name: str, documentation: str, labels: Optional[Dict[str, str]] = None) -> Gauge:
+        return self._register(Gauge, name, documentation, labels)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Optional[Dict[str, str]] = None,
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram, name, documentation, labels, buckets=buckets)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Return a JSON-serialisable view of every instrument."""
+
+        with self._lock:
+            instruments = list(self._instruments.values())
+        return [
+            {
+                "name": instrument.name,
+                "type": instrument.kind,
+                "help": instrument.documentation,
+                "labels": dict(instrument.labels),
+                **instrument.snapshot(),
+            }
+            for instrument in instruments
+        ]
+
+
+REGISTRY = Registry()
+
+
+# -----------------
+# Cross-process publishing
+
+
+def write_snapshot(machine_id: str, registry: Registry = REGISTRY) -> None:
+    """Atomically write the registry snapshot for the supervisor to read."""
+
+    payload = {
+        "machine_id": machine_id,
+        "pid": os.getpid(),
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+        "metrics": registry.snapshot(),
+    }
+    ensure_config_dir()
+    tmp_path = SNAPSHOT_PATH.with_suffix(SNAPSHOT_PATH.suffix + ".tmp")
+    try:
+        tmp_path.write_text(json.dumps(payload))
+        tmp_path.replace(SNAPSHOT_PATH)
+    except OSError:
+        LOGGER.debug("Unable to publish instrumentation snapshot to %s", SNAPSHOT_PATH, exc_info=True)
+        try:
+            tmp_path.unlink(missing_ok=True)  # type: ignore[arg-type]
+        except OSError:
+            LOGGER.debug("Failed to remove temporary snapshot %s", tmp_path, exc_info=True)
+
+
+def load_snapshot() -> Optional[Dict[str, Any]]:
+    """Return the most recent snapshot published by the service, if any."""
+
+    if not SNAPSHOT_PATH.exists():
+        return None
+    try:
+        data = json.loads(SNAPSHOT_PATH.read_text())
+    except (json.JSONDecodeError, OSError):
+        LOGGER.debug("Unable to read instrumentation snapshot %s", SNAPSHOT_PATH, exc_info=True)
+        return None
+    return data if isinstance(data, dict) else None
+
+
+class InstrumentationPublisher:
+    """Background thread that periodically publishes the registry snapshot."""
+
+    def __init__(
+        self,
+        machine_id: str,
+        registry: Registry = REGISTRY,
+        interval: float = PUBLISH_INTERVAL_SECONDS,
+    ) -> None:
+        self.machine_id = machine_id
+        self._registry = registry
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="instrumentation-publisher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join(timeout=5)
+        self._thread = None
+        write_snapshot(self.machine_id, self._registry)
+
+    def _run(self) -> None:  # pragma: no cover - background worker
+        while True:
+            write_snapshot(self.machine_id, self._registry)
+            if self._stop.wait(self._interval):
+                return
+
+
+# -----------------
+# OpenMetrics rendering
+
+
+def _format_labels(labels: Dict[str, str], extra: Optional[Dict[str, str]] = None) -> str:
+    merged = dict(labels)
+    if extra:
+        merged.update(extra)
+    if not merged:
+        return ""
+    parts = []
+    for key in sorted(merged):
+        value = str(merged[key]).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render_openmetrics(snapshot: Optional[Dict[str, Any]], now: Optional[float] = None) -> str:
+    """Render a published snapshot in the OpenMetrics text exposition format."""
+
+    lines: List[str] = []
+    machine_labels: Dict[str, str] = {}
+    age: Optional[float] = None
+    if snapshot:
+        machine_id = snapshot.get("machine_id")
+        if machine_id:
+            machine_labels["machine"] = str(machine_id)
+        try:
+            updated = datetime.fromisoformat(str(snapshot.get("updated_at")))
+            current = now if now is not None else time.time()
+            age = max(0.0, current - updated.timestamp())
+        except (TypeError, ValueError):
+            age = None
+
+    lines.append("# TYPE fw_cycle_monitor_snapshot_age_seconds gauge")
+    lines.append("# HELP fw_cycle_monitor_snapshot_age_seconds Seconds since the service published instrumentation.")
+    if age is not None:
+        lines.append(f"fw_cycle_monitor_snapshot_age_seconds{_format_labels(machine_labels)} {age:.3f}")
+
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for entry in (snapshot or {}).get("metrics", []) or []:
+        if isinstance(entry, dict) and entry.get("name"):
+            grouped.setdefault(str(entry["name"]), []).append(entry)
+
+    for name in sorted(grouped):
+        entries = grouped[name]
+        kind = entries[0].get("type", "gauge")
+        lines.append(f"# TYPE {name} {kind}")
+        if entries[0].get("help"):
+            lines.append(f"# HELP {name} {entries[0]['help']}")
+        for entry in entries:
+            labels = {**machine_labels, **(entry.get("labels") or {})}
+            if kind == "counter":
+                lines.append(f"{name}_total{_format_labels(labels)} {_format_value(entry.get('value', 0))}")
+            elif kind == "histogram":
+                buckets = list(entry.get("buckets") or []) + [float("inf")]
+                cumulative = entry.get("cumulative_counts") or [0] * len(buckets)
+                for bound, count in zip(buckets, cumulative):
+                    bucket_labels = _format_labels(labels, {"le": _format_value(bound)})
+                    lines.append(f"{name}_bucket{bucket_labels} {int(count)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {int(entry.get('count', 0))}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(entry.get('sum', 0.0))}")
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(entry.get('value', 0))}")
+
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
@@ -7,7 +7,7 @@ import os
 import sys
 from pathlib import Path
 
-from . import gui
+from . import startup_profile
 from .updater import relaunch_if_updated
 
 LOGGER = logging.getLogger(__name__)
@@ -40,12 +40,16 @@ def main() -> int:
         repo_path = _detect_repo_root()
 
     LOGGER.info("Checking for updates in %s", repo_path)
-    relaunch_code = relaunch_if_updated(repo_path, "fw_cycle_monitor")
+    with startup_profile.phase("update check"):
+        relaunch_code = relaunch_if_updated(repo_path, "fw_cycle_monitor")
     if relaunch_code is not None:
         LOGGER.info("Relaunch returned %s", relaunch_code)
         return relaunch_code
 
     LOGGER.info("Launching FW Cycle Time Monitor GUI")
+    with startup_profile.phase("import gui"):
+        from . import gui
+
     return gui.main()
 
 
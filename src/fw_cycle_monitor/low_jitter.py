@@ -0,0 +1,236 @@
+"""Opt-in low-jitter runtime mode for the capture process.
+
+On a busy Pi the thread that runs the GPIO edge callback competes for the CPU
+with the GUI, the supervisor and Python's garbage collector, and any delay
+before the callback runs shows up as cycle-time noise.  Setting
+``FW_CYCLE_MONITOR_LOW_JITTER=1`` in the service environment makes
+:mod:`fw_cycle_monitor.service_runner`:
+
+* run the callback thread under ``SCHED_FIFO`` (priority
+  ``FW_CYCLE_MONITOR_CAPTURE_PRIORITY``, default ``10``), falling back to a
+  negative nice value when real-time scheduling is not permitted;
+* pin that thread to one CPU (``FW_CYCLE_MONITOR_CAPTURE_CPU``, default the
+  last one) and keep the service's other threads off it;
+* freeze the objects created during start-up out of the garbage collector
+  and raise the young-generation threshold, so collections are rare and only
+  scan objects created since.
+
+:class:`JitterProbe` runs in every mode.  It wakes up on a fixed schedule
+with the same priority and CPU as the capture thread and records how late
+each wake-up was, which is the scheduling delay an edge callback would see.
+The numbers are published as ``fw_cycle_monitor_capture_wakeup_lateness_seconds``
+and summarised in the log when the service stops, so the effect of the mode
+can be compared on the same Pi.
+"""
+
+from __future__ import annotations
+
+import gc
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from .instrumentation import REGISTRY
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["CaptureTuning", "JitterProbe", "low_jitter_enabled", "tune_garbage_collector"]
+
+DEFAULT_CAPTURE_PRIORITY = 10
+DEFAULT_CAPTURE_NICE = -10
+PROBE_INTERVAL_SECONDS = 0.02
+#: Young-generation threshold for the hot path (CPython's default is 700).
+GC_GEN0_THRESHOLD = 50_000
+
+_LATENESS_BUCKETS = (
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+)
+_WAKEUP_LATENESS = REGISTRY.histogram(
+    "fw_cycle_monitor_capture_wakeup_lateness_seconds",
+    "Delay between a scheduled wake-up at capture priority and the thread running.",
+    buckets=_LATENESS_BUCKETS,
+)
+_WAKEUP_LATENESS_MAX = REGISTRY.gauge(
+    "fw_cycle_monitor_capture_wakeup_lateness_max_seconds", "Largest capture wake-up delay since start-up."
+)
+
+
+def low_jitter_enabled() -> bool:
+    """Return ``True`` when ``FW_CYCLE_MONITOR_LOW_JITTER`` enables the mode."""
+
+    value = os.environ.get("FW_CYCLE_MONITOR_LOW_JITTER", "")
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _env_int(name: str) -> Optional[int]:
+    raw = os.environ.get(name)
+    if raw is None or not raw.strip():
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        LOGGER.warning("Ignoring invalid %s value: %s", name, raw)
+        return None
+
+
+@dataclass(frozen=True)
+class CaptureTuning:
+    """Scheduling settings for the thread that receives GPIO edges."""
+
+    cpu: Optional[int]
+    priority: int = DEFAULT_CAPTURE_PRIORITY
+
+    @classmethod
+    def from_environment(cls) -> Optional["CaptureTuning"]:
+        """Return the configured tuning, or ``None`` when the mode is off."""
+
+        if not low_jitter_enabled():
+            return None
+        cpu = _env_int("FW_CYCLE_MONITOR_CAPTURE_CPU")
+        available = _available_cpus()
+        if cpu is None and len(available) > 1:
+            cpu = max(available)
+        elif cpu is not None and cpu not in available:
+            LOGGER.warning("CPU %s is not available to the service; not pinning the capture thread", cpu)
+            cpu = None
+        priority = _env_int("FW_CYCLE_MONITOR_CAPTURE_PRIORITY") or DEFAULT_CAPTURE_PRIORITY
+        return cls(cpu=cpu, priority=priority)
+
+    def isolate_process(self) -> None:
+        """Keep threads started from now on off the capture CPU.
+
+        Linux threads inherit the affinity of the thread that creates them,
+        so this is called on the main thread before the monitor starts.
+        """
+
+        if self.cpu is None:
+            return
+        others = _available_cpus() - {self.cpu}
+        if not others:
+            return
+        try:
+            os.sched_setaffinity(0, others)
+        except OSError:
+            LOGGER.warning("Unable to restrict service threads to CPUs %s", sorted(others), exc_info=True)
+
+    def tune_current_thread(self) -> str:
+        """Apply the tuning to the calling thread and describe what took effect."""
+
+        applied = []
+        if self.cpu is not None:
+            try:
+                os.sched_setaffinity(0, {self.cpu})
+                applied.append(f"CPU {self.cpu}")
+            except OSError:
+                LOGGER.warning("Unable to pin thread to CPU %s", self.cpu, exc_info=True)
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.priority))
+            applied.append(f"SCHED_FIFO {self.priority}")
+        except (AttributeError, OSError):
+            # Needs CAP_SYS_NICE or LimitRTPRIO= in the unit; a nice value
+            # needs less and still beats the GUI and supervisor.
+            try:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), DEFAULT_CAPTURE_NICE)
+                applied.append(f"nice {DEFAULT_CAPTURE_NICE}")
+            except (AttributeError, OSError):
+                LOGGER.warning(
+                    "Unable to raise the scheduling priority of %s; grant CAP_SYS_NICE or set LimitRTPRIO=",
+                    threading.current_thread().name,
+                )
+        description = ", ".join(applied) or "default scheduling"
+        LOGGER.info("Capture thread %s running with %s", threading.current_thread().name, description)
+        return description
+
+
+def _available_cpus() -> set[int]:
+    try:
+        return set(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return set()
+
+
+def tune_garbage_collector() -> None:
+    """Freeze start-up objects and make young-generation collections rare.
+
+    Call once start-up is complete: everything allocated so far is moved to
+    a permanent generation that collections no longer traverse.
+    """
+
+    gc.collect()
+    gc.freeze()
+    _, gen1, gen2 = gc.get_threshold()
+    gc.set_threshold(GC_GEN0_THRESHOLD, gen1, gen2)
+    LOGGER.info(
+        "Froze %s objects out of garbage collection; gen0 threshold %s", gc.get_freeze_count(), GC_GEN0_THRESHOLD
+    )
+
+
+class JitterProbe:
+    """Measure how late a thread at capture priority wakes up."""
+
+    def __init__(self, tuning: Optional[CaptureTuning] = None, interval: float = PROBE_INTERVAL_SECONDS) -> None:
+        self.tuning = tuning
+        self.interval = max(interval, 0.001)
+        self.max_lateness = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="capture-jitter-probe", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join(timeout=5)
+        self._thread = None
+        self.log_summary()
+
+    def log_summary(self) -> None:
+        if not _WAKEUP_LATENESS.count:
+            return
+        LOGGER.info(
+            "Capture wake-up lateness over %s samples (%s mode): p50 %.0f us, p99 %.0f us, max %.0f us",
+            _WAKEUP_LATENESS.count,
+            "low-jitter" if self.tuning is not None else "default",
+            (_WAKEUP_LATENESS.quantile(0.5) or 0.0) * 1e6,
+            (_WAKEUP_LATENESS.quantile(0.99) or 0.0) * 1e6,
+            self.max_lateness * 1e6,
+        )
+
+    def _run(self) -> None:  # pragma: no cover - background worker
+        if self.tuning is not None:
+            self.tuning.tune_current_thread()
+        deadline = time.monotonic() + self.interval
+        while not self._stop.is_set():
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            lateness = max(time.monotonic() - deadline, 0.0)
+            _WAKEUP_LATENESS.observe(lateness)
+            if lateness > self.max_lateness:
+                self.max_lateness = lateness
+                _WAKEUP_LATENESS_MAX.set(lateness)
+            deadline += self.interval
+            if lateness > self.interval:
+                # Skip the wake-ups that were missed rather than bursting through them.
+                deadline = time.monotonic() + self.interval
@@ -0,0 +1,390 @@
+"""Running / slow / idle / down state machine for the monitored press.
+
+:class:`MachineStateTracker` is fed every cycle event and ticked by the
+monitor's writer thread.  It keeps the current state, when it was entered,
+and the time spent in each state during the current production day, so
+availability can be read directly instead of being inferred from polled
+averages:
+
+* ``running`` – the last cycle took at most ``slow_cycle_seconds``;
+* ``slow`` – the last cycle, or the time since it, exceeded ``slow_cycle_seconds``;
+* ``idle`` – no cycle for more than ``idle_threshold_seconds``;
+* ``down`` – no cycle for more than ``down_threshold_seconds``, or the
+  monitor is not running.
+
+Durations use the monotonic clock so NTP corrections at boot do not distort
+the counters.  A tracker built with ``event_clock=True`` (for replays of
+recorded history) takes its time from the event timestamps instead.  The
+tracker publishes a snapshot to ``machine_state.json`` in the configuration
+directory on every transition and at least once a minute; the remote
+supervisor serves it on ``/machine/state``.  The same snapshot is kept per
+machine under ``machine_state/`` so a restart, an update or a switch back to
+the machine resumes the production day's counters
+(:meth:`MachineStateTracker.restore`).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from .config import CONFIG_DIR, AppConfig, ensure_config_dir
+from .instrumentation import REGISTRY
+from .shards import read_shard, shard_path, write_shard
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["MachineStateTracker", "StateThresholds", "STATES", "load_machine_state"]
+
+STATES = ("running", "slow", "idle", "down")
+SNAPSHOT_PATH = CONFIG_DIR / "machine_state.json"
+COUNTERS_DIR = CONFIG_DIR / "machine_state"
+PUBLISH_INTERVAL_SECONDS = 60.0
+#: A snapshot older than this means the monitor service is not publishing.
+STALE_AFTER_SECONDS = 3 * PUBLISH_INTERVAL_SECONDS
+
+_STATE_GAUGES = {
+    state: REGISTRY.gauge("fw_cycle_monitor_machine_state", "1 for the current machine state.", {"state": state})
+    for state in STATES
+}
+_TRANSITIONS = REGISTRY.counter("fw_cycle_monitor_machine_state_transitions", "Machine state transitions.")
+
+
+@dataclass(frozen=True)
+class StateThresholds:
+    """Seconds after which the machine counts as slow, idle and down."""
+
+    slow_cycle_seconds: float = 60.0
+    idle_seconds: float = 300.0
+    down_seconds: float = 1800.0
+
+    @classmethod
+    def from_config(cls, config: AppConfig) -> "StateThresholds":
+        return cls(
+            slow_cycle_seconds=float(config.slow_cycle_seconds),
+            idle_seconds=float(config.idle_threshold_seconds),
+            down_seconds=float(config.down_threshold_seconds),
+        )
+
+
+def _next_boundary(reference: datetime, reset_hour: int) -> datetime:
+    boundary = reference.replace(hour=reset_hour, minute=0, second=0, microsecond=0)
+    return boundary if reference < boundary else boundary + timedelta(days=1)
+
+
+def availability(totals: Dict[str, float]) -> Optional[float]:
+    """Return the share of tracked time spent running or slow."""
+
+    tracked = sum(totals.get(state, 0.0) for state in STATES)
+    if tracked <= 0:
+        return None
+    return (totals.get("running", 0.0) + totals.get("slow", 0.0)) / tracked
+
+
+class MachineStateTracker:
+    """Incrementally maintained machine state and time-in-state counters."""
+
+    def __init__(
+        self,
+        machine_id: str,
+        thresholds: StateThresholds,
+        reset_hour: int = 3,
+        *,
+        publishing: bool = True,
+        event_clock: bool = False,
+    ) -> None:
+        self.machine_id = machine_id
+        self.thresholds = thresholds
+        self.reset_hour = reset_hour
+        #: Only the process watching the pin should publish the snapshot.
+        self.publishing = publishing
+        #: Time stands still between events, at the last event's timestamp.
+        self.event_clock = event_clock
+        self._lock = threading.Lock()
+        now = time.monotonic()
+        wall = datetime.now(timezone.utc).astimezone()
+        self._state = "down"
+        self._entered = now
+        self._entered_wall = wall
+        self._mark = now
+        self._last_event: Optional[float] = None
+        self._last_event_wall: Optional[datetime] = None
+        self._last_cycle_seconds: Optional[float] = None
+        self._day_end = _next_boundary(wall, reset_hour)
+        self._today: Dict[str, float] = {state: 0.0 for state in STATES}
+        self._previous_day: Optional[Dict[str, Any]] = None
+        self._last_publish = 0.0
+        _STATE_GAUGES[self._state].set(1)
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    # -----------------
+    # Bookkeeping (callers hold ``_lock``)
+
+    def _clock(self, timestamp: Optional[datetime] = None) -> Tuple[float, datetime]:
+        """Return the clock reading in seconds and the wall time it stands for."""
+
+        if not self.event_clock:
+            return time.monotonic(), datetime.now(timezone.utc).astimezone()
+        wall = timestamp or self._last_event_wall or self._entered_wall
+        return wall.timestamp(), wall
+
+    def _start_event_clock(self, now: float, wall: datetime) -> None:
+        # History starts at its first event, not when the tracker was built.
+        self._entered = self._mark = now
+        self._entered_wall = wall
+        self._day_end = _next_boundary(wall, self.reset_hour)
+
+    def _accumulate(self, now: float) -> None:
+        self._today[self._state] += max(now - self._mark, 0.0)
+        self._mark = now
+
+    def _roll_day(self, now: float, wall: datetime) -> None:
+        while wall >= self._day_end:
+            boundary = now - (wall - self._day_end).total_seconds()
+            self._accumulate(max(boundary, self._mark))
+            self._previous_day = {
+                "day": (self._day_end - timedelta(days=1)).date().isoformat(),
+                "seconds": {state: round(value, 3) for state, value in self._today.items()},
+                "availability": availability(self._today),
+            }
+            self._today = {state: 0.0 for state in STATES}
+            self._day_end += timedelta(days=1)
+
+    def _transition(self, new_state: str, now: float, wall: datetime) -> bool:
+        if new_state == self._state:
+            return False
+        self._accumulate(now)
+        LOGGER.info(
+            "Machine %s state %s -> %s after %.0f s",
+            self.machine_id,
+            self._state,
+            new_state,
+            now - self._entered,
+        )
+        _STATE_GAUGES[self._state].set(0)
+        _STATE_GAUGES[new_state].set(1)
+        _TRANSITIONS.inc()
+        self._state = new_state
+        self._entered = now
+        self._entered_wall = wall
+        return True
+
+    # -----------------
+    # Inputs
+
+    def record_event(self, timestamp: Optional[datetime] = None) -> str:
+        """Update the state for a cycle event happening now.
+
+        On the event clock the event happens at ``timestamp`` instead, and the
+        escalations since the previous event are applied first.
+        """
+
+        with self._lock:
+            if self.event_clock:
+                if timestamp is None:
+                    timestamp = datetime.now(timezone.utc).astimezone()
+                if self._last_event_wall is None:
+                    self._start_event_clock(timestamp.timestamp(), timestamp)
+                now, wall = self._clock(timestamp)
+                self._escalate(now, wall)
+            else:
+                now = time.monotonic()
+                wall = timestamp or datetime.now(timezone.utc).astimezone()
+            self._roll_day(now, wall)
+            cycle_seconds = now - self._last_event if self._last_event is not None else None
+            self._last_event = now
+            self._last_event_wall = wall
+            self._last_cycle_seconds = cycle_seconds
+            if cycle_seconds is None or cycle_seconds > self.thresholds.idle_seconds:
+                # First cycle after a stop: production has resumed.
+                new_state = "running"
+            elif cycle_seconds > self.thresholds.slow_cycle_seconds:
+                new_state = "slow"
+            else:
+                new_state = "running"
+            changed = self._transition(new_state, now, wall)
+        self.publish(force=changed)
+        return new_state
+
+    def tick(self) -> str:
+        """Escalate the state as time passes without cycles.
+
+        Transitions are dated to the moment the threshold was crossed, so the
+        counters do not depend on how often the timer runs.
+        """
+
+        with self._lock:
+            now, wall = self._clock()
+            changed = self._escalate(now, wall)
+            new_state = self._state
+        self.publish(force=changed)
+        return new_state
+
+    def _escalate(self, now: float, wall: datetime) -> bool:
+        changed = False
+        self._roll_day(now, wall)
+        if self._last_event is not None:
+            escalations = (
+                ("slow", self.thresholds.slow_cycle_seconds),
+                ("idle", self.thresholds.idle_seconds),
+                ("down", self.thresholds.down_seconds),
+            )
+            for state, threshold in escalations:
+                crossed = self._last_event + threshold
+                # Only cycle events bring the machine back towards running.
+                if now > crossed and STATES.index(state) > STATES.index(self._state):
+                    when = max(crossed, self._mark)
+                    changed |= self._transition(state, when, wall - timedelta(seconds=now - when))
+        return changed
+
+    def mark_down(self) -> None:
+        """Record that the monitor stopped watching the machine."""
+
+        with self._lock:
+            now, wall = self._clock()
+            self._roll_day(now, wall)
+            self._last_event = None
+            self._transition("down", now, wall)
+        self.publish(force=True)
+
+    def restore(self) -> None:
+        """Resume the production day's counters saved by an earlier run.
+
+        Only applies before the first event and when the saved counters use
+        the same reset hour.  The time the monitor was not watching counts as
+        down; counters saved on the previous production day become
+        ``previous_day``.
+        """
+
+        if self.event_clock:
+            return
+        path = shard_path(COUNTERS_DIR, self.machine_id)
+        data = read_shard(path)
+        if not data:
+            return
+        try:
+            reset_hour = int(data["reset_hour"])
+            day_start = datetime.fromisoformat(data["day_start"])
+            saved_at = datetime.fromisoformat(data["updated_at"])
+            entered_at = datetime.fromisoformat(data["entered_at"])
+            state = str(data["state"])
+            saved = {state_name: float(data["today_seconds"].get(state_name, 0.0)) for state_name in STATES}
+            previous_day = data.get("previous_day")
+        except (KeyError, TypeError, ValueError, AttributeError):
+            LOGGER.warning("Ignoring invalid machine state counters in %s", path)
+            return
+        if reset_hour != self.reset_hour or state not in STATES:
+            return
+
+        with self._lock:
+            if self._last_event is not None:
+                return
+            now, wall = self._clock()
+            current_start = self._day_end - timedelta(days=1)
+            if day_start == current_start:
+                saved["down"] += max((wall - saved_at).total_seconds(), 0.0)
+                self._today = saved
+                self._mark = now
+                if isinstance(previous_day, dict):
+                    self._previous_day = previous_day
+                # Down since the saved state, or since the monitor stopped watching.
+                down_since = entered_at if state == "down" else saved_at
+                self._entered_wall = down_since
+                self._entered = now - max((wall - down_since).total_seconds(), 0.0)
+            elif day_start + timedelta(days=1) == current_start:
+                saved["down"] += max((current_start - saved_at).total_seconds(), 0.0)
+                self._previous_day = {
+                    "day": day_start.date().isoformat(),
+                    "seconds": {state_name: round(value, 3) for state_name, value in saved.items()},
+                    "availability": availability(saved),
+                }
+                self._today = {state_name: 0.0 for state_name in STATES}
+                self._today["down"] = max((wall - current_start).total_seconds(), 0.0)
+                self._mark = now
+
+    # -----------------
+    # Outputs
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            now, wall = self._clock()
+            self._roll_day(now, wall)
+            today = dict(self._today)
+            today[self._state] += max(now - self._mark, 0.0)
+            return {
+                "machine_id": self.machine_id,
+                "state": self._state,
+                "entered_at": self._entered_wall.isoformat(),
+                "state_seconds": round(now - self._entered, 3),
+                "last_event": self._last_event_wall.isoformat() if self._last_event_wall else None,
+                "last_cycle_seconds": self._last_cycle_seconds,
+                "thresholds": {
+                    "slow_cycle_seconds": self.thresholds.slow_cycle_seconds,
+                    "idle_seconds": self.thresholds.idle_seconds,
+                    "down_seconds": self.thresholds.down_seconds,
+                },
+                "day_start": (self._day_end - timedelta(days=1)).isoformat(),
+                "today_seconds": {state: round(value, 3) for state, value in today.items()},
+                "availability": availability(today),
+                "previous_day": self._previous_day,
+                "updated_at": wall.isoformat(),
+            }
+
+    def publish(self, force: bool = False) -> None:
+        if not self.publishing:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_publish < PUBLISH_INTERVAL_SECONDS:
+            return
+        self._last_publish = now
+        payload = self.snapshot()
+        ensure_config_dir()
+        tmp_path = SNAPSHOT_PATH.with_suffix(SNAPSHOT_PATH.suffix + ".tmp")
+        try:
+            tmp_path.write_text(json.dumps(payload))
+            tmp_path.replace(SNAPSHOT_PATH)
+        except OSError:
+            LOGGER.debug("Unable to publish machine state to %s", SNAPSHOT_PATH, exc_info=True)
+        counters_path = shard_path(COUNTERS_DIR, self.machine_id)
+        try:
+            write_shard(counters_path, {**payload, "reset_hour": self.reset_hour})
+        except OSError:
+            LOGGER.debug("Unable to save machine state counters to %s", counters_path, exc_info=True)
+
+
+def load_machine_state(now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """Return the published state, brought up to date to ``now``.
+
+    Time since the snapshot was written is credited to the current state, and
+    the snapshot is flagged ``stale`` when the service stopped publishing.
+    """
+
+    if not SNAPSHOT_PATH.exists():
+        return None
+    try:
+        data = json.loads(SNAPSHOT_PATH.read_text())
+        updated_at = datetime.fromisoformat(data["updated_at"])
+    except (OSError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+        LOGGER.debug("Unable to read machine state %s", SNAPSHOT_PATH, exc_info=True)
+        return None
+
+    current = now or datetime.now(timezone.utc)
+    age = max((current - updated_at).total_seconds(), 0.0)
+    data["snapshot_age_seconds"] = round(age, 3)
+    data["stale"] = age > STALE_AFTER_SECONDS
+    if not data["stale"]:
+        state = data.get("state")
+        today = data.get("today_seconds")
+        if isinstance(today, dict) and state in today:
+            today[state] = round(float(today[state]) + age, 3)
+            data["availability"] = availability(today)
+        data["state_seconds"] = round(float(data.get("state_seconds", 0.0)) + age, 3)
+    return data
@@ -1,17 +1,27 @@
-"""Cycle metrics persistence and calculations."""
+"""Cycle metrics persistence and calculations.
+
+Recent timestamps and pulse widths are stored per machine under ``metrics/``
+in the configuration directory (see :mod:`fw_cycle_monitor.shards`); the
+single ``metrics.json`` used by earlier versions is still read for machines
+that have no file of their own yet.
+"""
 
 from __future__ import annotations
 
 import json
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from .config import CONFIG_DIR, ensure_config_dir
+from .shards import read_shard, remove_shard, shard_path, update_shard, write_shard
 
 LOGGER = logging.getLogger(__name__)
 
+METRICS_DIR = CONFIG_DIR / "metrics"
+#: Legacy single-file metrics shared by all machines.
 METRICS_PATH = CONFIG_DIR / "metrics.json"
 RETENTION_PERIOD = timedelta(hours=2)
 AVERAGE_WINDOWS: tuple[int, ...] = (5, 15, 30, 60)
@@ -23,6 +33,8 @@ class CycleMetrics:
 
     machine_id: str
     timestamps: List[datetime]
+    #: ``(cycle timestamp, seconds the signal stayed high)`` for recent cycles.
+    pulses: List[Tuple[datetime, float]] = field(default_factory=list)
 
 
 @dataclass
@@ -31,6 +43,10 @@ class CycleStatistics:
 
     last_cycle_seconds: Optional[float]
     window_averages: Dict[int, Optional[float]]
+    last_pulse_seconds: Optional[float] = None
+    pulse_window_averages: Dict[int, Optional[float]] = field(default_factory=dict)
+    #: Share of each window's cycle time during which the signal was high.
+    duty_cycles: Dict[int, Optional[float]] = field(default_factory=dict)
 
 
 def _load_metrics_blob() -> Dict[str, Any]:
@@ -61,15 +77,24 @@ def _canonical_machine_id(machine_id: str) -> str:
     return machine_id.strip().upper()
 
 
-def load_cycle_metrics(machine_id: str) -> CycleMetrics:
-    """Load stored timestamps for ``machine_id``."""
+def metrics_path(machine_id: str) -> Path:
+    """Return the file holding ``machine_id``'s recent cycle history."""
 
-    canonical_id = _canonical_machine_id(machine_id)
+    return shard_path(METRICS_DIR, _canonical_machine_id(machine_id))
+
+
+def _load_legacy_record(canonical_id: str) -> Dict[str, Any]:
     data = _load_metrics_blob()
     machines = data.get("machines")
-    if not isinstance(machines, dict):
-        machines = {}
-    raw_timestamps = machines.get(canonical_id, [])
+    pulses = data.get("pulses")
+    return {
+        "timestamps": machines.get(canonical_id, []) if isinstance(machines, dict) else [],
+        "pulses": pulses.get(canonical_id, []) if isinstance(pulses, dict) else [],
+    }
+
+
+def _parse_record(canonical_id: str, record: Dict[str, Any]) -> CycleMetrics:
+    raw_timestamps = record.get("timestamps", [])
     timestamps: List[datetime] = []
     if isinstance(raw_timestamps, list):
         for value in raw_timestamps:
@@ -83,50 +108,144 @@ def load_cycle_metrics(machine_id: str) -> CycleMetrics:
                 timestamp = timestamp.replace(tzinfo=timezone.utc)
             timestamps.append(timestamp)
     timestamps.sort()
-    return CycleMetrics(machine_id=canonical_id, timestamps=timestamps)
 
+    pulses: List[Tuple[datetime, float]] = []
+    raw_pulses = record.get("pulses", [])
+    if isinstance(raw_pulses, list):
+        for entry in raw_pulses:
+            try:
+                timestamp = datetime.fromisoformat(entry[0])
+                seconds = float(entry[1])
+            except (TypeError, ValueError, IndexError):
+                continue
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=timezone.utc)
+            pulses.append((timestamp, seconds))
+    pulses.sort()
+    return CycleMetrics(machine_id=canonical_id, timestamps=timestamps, pulses=pulses)
 
-def save_cycle_metrics(metrics: CycleMetrics) -> None:
-    """Persist ``metrics`` to disk."""
 
-    canonical_id = _canonical_machine_id(metrics.machine_id)
-    data = _load_metrics_blob()
-    machines = data.setdefault("machines", {})
-    if not isinstance(machines, dict):
-        machines = {}
-        data["machines"] = machines
-    machines[canonical_id] = [ts.isoformat() for ts in sorted(metrics.timestamps)]
-    _save_metrics_blob(data)
+def _record(metrics: CycleMetrics) -> Dict[str, Any]:
+    return {
+        "timestamps": [ts.isoformat() for ts in sorted(metrics.timestamps)],
+        "pulses": [[ts.isoformat(), round(seconds, 6)] for ts, seconds in sorted(metrics.pulses)],
+    }
 
 
-def record_cycle_event(machine_id: str, timestamp: datetime) -> None:
-    """Record a cycle event for ``machine_id`` at ``timestamp``."""
+def _read_metrics(canonical_id: str, record: Optional[Dict[str, Any]]) -> CycleMetrics:
+    if record is None:
+        record = _load_legacy_record(canonical_id)
+    return _parse_record(canonical_id, record)
 
-    if timestamp.tzinfo is None:
-        timestamp = timestamp.replace(tzinfo=timezone.utc)
 
-    metrics = load_cycle_metrics(machine_id)
-    metrics.timestamps.append(timestamp)
-    metrics.timestamps.sort()
+def load_cycle_metrics(machine_id: str) -> CycleMetrics:
+    """Load stored timestamps for ``machine_id``."""
 
-    cutoff = timestamp - RETENTION_PERIOD
-    filtered = [ts for ts in metrics.timestamps if ts >= cutoff]
-    if len(filtered) < 2 and metrics.timestamps:
-        filtered = metrics.timestamps[-2:]
-    metrics.timestamps = filtered
+    canonical_id = _canonical_machine_id(machine_id)
+    return _read_metrics(canonical_id, read_shard(metrics_path(canonical_id)))
 
-    save_cycle_metrics(metrics)
+
+def save_cycle_metrics(metrics: CycleMetrics) -> None:
+    """Persist ``metrics`` to disk."""
+
+    path = metrics_path(metrics.machine_id)
+    try:
+        write_shard(path, _record(metrics))
+    except OSError:
+        LOGGER.exception("Unable to persist metrics to %s", path)
+
+
+def record_cycle_event(
+    machine_id: str,
+    timestamp: datetime,
+    pulse: Optional[Tuple[datetime, float]] = None,
+) -> Optional[float]:
+    """Record a cycle event for ``machine_id`` at ``timestamp``.
+
+    ``pulse`` is the cycle's measured ``(timestamp, seconds)`` pulse width, if
+    any; the monitor records a cycle once its falling edge has been seen.  The
+    update holds the machine's file lock so concurrent writers do not lose
+    events.
+
+    Returns the seconds since the machine's previous recorded event, if any,
+    for the caller to add to the long-term rollups (see
+    :func:`fw_cycle_monitor.rollups.record_cycles`).
+    """
+
+    cycles = record_cycle_events(machine_id, [(timestamp, pulse)])
+    return cycles[0][1] if cycles else None
+
+
+def record_cycle_events(
+    machine_id: str,
+    events: Iterable[Tuple[datetime, Optional[Tuple[datetime, float]]]],
+) -> List[Tuple[datetime, float]]:
+    """Record several ``(timestamp, pulse)`` events in one update of the file.
+
+    Returns ``(timestamp, cycle seconds)`` for every event that followed an
+    earlier one, as :func:`record_cycle_event` does for a single event.
+    """
+
+    batch = []
+    for timestamp, pulse in events:
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        if pulse is not None and pulse[0].tzinfo is None:
+            pulse = (pulse[0].replace(tzinfo=timezone.utc), pulse[1])
+        batch.append((timestamp, pulse))
+    if not batch:
+        return []
+    canonical_id = _canonical_machine_id(machine_id)
+    cycles: List[Tuple[datetime, float]] = []
+
+    def apply(record: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        cycles.clear()
+        metrics = _read_metrics(canonical_id, record)
+        latest = max(metrics.timestamps) if metrics.timestamps else None
+        known_pulses = {existing for existing, _ in metrics.pulses}
+        for timestamp, pulse in batch:
+            if latest is not None and timestamp > latest:
+                cycles.append((timestamp, (timestamp - latest).total_seconds()))
+            if latest is None or timestamp > latest:
+                latest = timestamp
+            metrics.timestamps.append(timestamp)
+            if pulse is not None and pulse[0] not in known_pulses:
+                known_pulses.add(pulse[0])
+                metrics.pulses.append(pulse)
+        metrics.timestamps.sort()
+
+        cutoff = latest - RETENTION_PERIOD
+        filtered = [ts for ts in metrics.timestamps if ts >= cutoff]
+        if len(filtered) < 2 and metrics.timestamps:
+            filtered = metrics.timestamps[-2:]
+        metrics.timestamps = filtered
+        metrics.pulses = [entry for entry in metrics.pulses if entry[0] >= cutoff]
+        return _record(metrics)
+
+    path = metrics_path(canonical_id)
+    try:
+        update_shard(path, apply)
+    except OSError:
+        LOGGER.exception("Unable to persist metrics to %s", path)
+        return []
+    return cycles
 
 
 def clear_cycle_metrics(machine_id: str) -> None:
     """Remove stored metrics for ``machine_id``."""
 
     canonical_id = _canonical_machine_id(machine_id)
+    remove_shard(metrics_path(canonical_id))
+    if not METRICS_PATH.exists():
+        return
     data = _load_metrics_blob()
     machines = data.get("machines")
     if not isinstance(machines, dict) or canonical_id not in machines:
         return
     machines.pop(canonical_id, None)
+    pulses = data.get("pulses")
+    if isinstance(pulses, dict):
+        pulses.pop(canonical_id, None)
     _save_metrics_blob(data)
 
 
@@ -142,7 +261,12 @@ def calculate_cycle_statistics(machine_id: str, now: Optional[datetime] = None)
     if len(timestamps) >= 2:
         last_cycle = (timestamps[-1] - timestamps[-2]).total_seconds()
 
+    pulses = metrics.pulses
+    last_pulse = pulses[-1][1] if pulses else None
+
     averages: Dict[int, Optional[float]] = {}
+    pulse_averages: Dict[int, Optional[float]] = {}
+    duty_cycles: Dict[int, Optional[float]] = {}
     for window in AVERAGE_WINDOWS:
         cutoff = now - timedelta(minutes=window)
         durations = [
@@ -154,6 +278,18 @@ def calculate_cycle_statistics(machine_id: str, now: Optional[datetime] = None)
             averages[window] = sum(durations) / len(durations)
         else:
             averages[window] = None
-
-    return CycleStatistics(last_cycle_seconds=last_cycle, window_averages=averages)
+        widths = [seconds for start, seconds in pulses if start >= cutoff]
+        pulse_averages[window] = sum(widths) / len(widths) if widths else None
+        if pulse_averages[window] is not None and averages[window]:
+            duty_cycles[window] = min(pulse_averages[window] / averages[window], 1.0)
+        else:
+            duty_cycles[window] = None
+
+    return CycleStatistics(
+        last_cycle_seconds=last_cycle,
+        window_averages=averages,
+        last_pulse_seconds=last_pulse,
+        pulse_window_averages=pulse_averages,
+        duty_cycles=duty_cycles,
+    )
 
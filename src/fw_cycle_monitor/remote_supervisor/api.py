@@ -3,13 +3,27 @@
 from __future__ import annotations
 
 import logging
+import os
+import time
+from datetime import date, datetime
 from typing import Any, Dict, Optional
 
-from fastapi import Depends, FastAPI, HTTPException, status
-
-from ..config import load_config
-from ..metrics import calculate_cycle_statistics
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, status
+
+from ..anomaly import load_anomalies
+from ..config import CONFIG_PATH, load_config
+from ..daily_summary import load_daily_summaries
+from ..event_feed import complete_size, locate_time_range, read_events_after
+from ..event_store import query_daily_rollups, query_events
+from ..instrumentation import OPENMETRICS_CONTENT_TYPE, load_snapshot, render_openmetrics
+from ..machine_state import load_machine_state
+from ..metrics import calculate_cycle_statistics, metrics_path
+from ..replication import load_replication_status
+from ..rollups import RESOLUTIONS, query_rollups
 from .auth import require_api_key
+from .conditional import MAX_WAIT_SECONDS, evaluate, file_version
+from .encoding import encode_response
+from .export import build_export_response
 from .models import (
     ConfigSnapshot,
     MetricsResponse,
@@ -20,16 +34,26 @@ from .models import (
     StackLightState,
     SystemActionResponse,
 )
-from .service_control import ServiceCommandError, restart_service, start_service, status_summary, stop_service
+from .service_control import (
+    ServiceCommandError,
+    reload_service,
+    restart_service,
+    start_service,
+    status_summary,
+    stop_service,
+)
 from .settings import get_settings, refresh_settings
 from .stacklight_controller import StackLightController
+from .timing import LoopLagProbe, RequestTimingMiddleware, configure_slow_request_threshold, timings_snapshot
 
 LOGGER = logging.getLogger(__name__)
 
 app = FastAPI(title="FW Cycle Monitor Remote Supervisor", version="1.0.0")
+app.add_middleware(RequestTimingMiddleware)
 
 # Global stack light controller instance
 _stacklight_controller: Optional[StackLightController] = None
+_loop_lag_probe: Optional[LoopLagProbe] = None
 
 
 @app.get("/service/status", response_model=ServiceStatusResponse)
@@ -88,6 +112,21 @@ async def restart(_: str | None = Depends(require_api_key)) -> Dict[str, Any]:
         ) from exc
 
 
+@app.post("/service/reload", response_model=ServiceActionResponse)
+async def reload(_: str | None = Depends(require_api_key)) -> Dict[str, Any]:
+    """Apply ``config.json`` to the running monitor without restarting it."""
+
+    try:
+        reload_service()
+        return {"action": "reload", **status_summary()}
+    except ServiceCommandError as exc:
+        LOGGER.error("Failed to reload service: %s", exc, exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to reload service: {exc}",
+        ) from exc
+
+
 @app.post("/system/reboot", response_model=SystemActionResponse)
 async def reboot_system(_: str | None = Depends(require_api_key)) -> Dict[str, Any]:
     """Reboot the Raspberry Pi system."""
@@ -112,10 +151,28 @@ async def reboot_system(_: str | None = Depends(require_api_key)) -> Dict[str, A
         ) from exc
 
 
+_WAIT_QUERY = Query(0.0, ge=0, le=MAX_WAIT_SECONDS, description="Hold a request with a current ETag until it changes")
+
+
+def _metrics_version() -> str:
+    # The rolling windows also move with time, so the version rolls over every minute.
+    metrics_version = file_version(metrics_path(load_config().machine_id))
+    return f"{file_version(CONFIG_PATH)}-{metrics_version}-{int(time.time() // 60):x}"
+
+
 @app.get("/config", response_model=ConfigSnapshot)
-async def config(_: str | None = Depends(require_api_key)) -> Dict[str, Any]:
+async def config(
+    request: Request,
+    response: Response,
+    wait: float = _WAIT_QUERY,
+    _: str | None = Depends(require_api_key),
+) -> Any:
     """Return the currently active monitor configuration."""
 
+    etag, not_modified = await evaluate(request, lambda: file_version(CONFIG_PATH), wait)
+    if not_modified is not None:
+        return not_modified
+    response.headers["ETag"] = etag
     config = load_config()
     return {
         "machine_id": config.machine_id,
@@ -126,7 +183,12 @@ async def config(_: str | None = Depends(require_api_key)) -> Dict[str, Any]:
 
 
 @app.get("/metrics/summary", response_model=MetricsResponse)
-async def metrics(_: str | None = Depends(require_api_key)) -> Dict[str, Any]:
+async def metrics(
+    request: Request,
+    response: Response,
+    wait: float = _WAIT_QUERY,
+    _: str | None = Depends(require_api_key),
+) -> Any:
     """Return live cycle statistics for dashboards."""
 
     settings = get_settings()
@@ -136,15 +198,226 @@ async def metrics(_: str | None = Depends(require_api_key)) -> Dict[str, Any]:
             detail="Metrics collection disabled",
         )
 
+    etag, not_modified = await evaluate(request, _metrics_version, wait)
+    if not_modified is not None:
+        return not_modified
+    response.headers["ETag"] = etag
     config = load_config()
     statistics = calculate_cycle_statistics(config.machine_id)
     return {
         "machine_id": config.machine_id,
         "last_cycle_seconds": statistics.last_cycle_seconds,
         "window_averages": statistics.window_averages,
+        "last_pulse_seconds": statistics.last_pulse_seconds,
+        "pulse_window_averages": statistics.pulse_window_averages,
+        "duty_cycles": statistics.duty_cycles,
     }
 
 
+@app.get("/metrics")
+async def openmetrics(_: str | None = Depends(require_api_key)) -> Response:
+    """Expose the monitor service's hot-path instrumentation in OpenMetrics format."""
+
+    settings = get_settings()
+    if not settings.metrics_enabled:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Metrics collection disabled",
+        )
+
+    return Response(content=render_openmetrics(load_snapshot()), media_type=OPENMETRICS_CONTENT_TYPE)
+
+
+@app.get("/replication/status")
+async def replication_status(_: str | None = Depends(require_api_key)) -> Dict[str, Any]:
+    """Report how far the shared CSV lags behind the local primary log."""
+
+    config = load_config()
+    if config.storage_mode != "local-first":
+        return {"storage_mode": config.storage_mode, "machine_id": config.machine_id}
+    status_payload = load_replication_status() or {"machine_id": config.machine_id}
+    return {"storage_mode": config.storage_mode, **status_payload}
+
+
+@app.get("/events")
+def events_after(
+    request: Request,
+    after: Optional[str] = Query(None, description="Cursor returned by the previous call; omit to start from the beginning"),
+    limit: int = Query(500, ge=1, le=5000),
+    _: str | None = Depends(require_api_key),
+) -> Response:
+    """Return events appended to the CSV since ``after`` and the cursor to resume from."""
+
+    config = load_config()
+    try:
+        page = read_events_after(config.primary_csv_path(), after, limit=limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except OSError as exc:
+        LOGGER.warning("Unable to read events from %s: %s", config.primary_csv_path(), exc)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="CSV is not readable") from exc
+    return encode_response(request, {"machine_id": config.machine_id, **page})
+
+
+@app.get("/events/export")
+def export_events(
+    request: Request,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    _: str | None = Depends(require_api_key),
+) -> Response:
+    """Download the CSV rows with ``from <= timestamp < to`` exactly as stored."""
+
+    config = load_config()
+    csv_path = config.primary_csv_path()
+    try:
+        handle = csv_path.open("rb")
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No events recorded yet") from exc
+    except OSError as exc:
+        LOGGER.warning("Unable to open %s for export: %s", csv_path, exc)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="CSV is not readable") from exc
+
+    try:
+        info = os.fstat(handle.fileno())
+        first, last = locate_time_range(handle, complete_size(handle, info.st_size), start, end)
+    except OSError as exc:
+        handle.close()
+        LOGGER.warning("Unable to locate export range in %s: %s", csv_path, exc)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="CSV is not readable") from exc
+    except BaseException:
+        handle.close()
+        raise
+
+    name = f"CM_{config.machine_id}"
+    for bound in (start, end):
+        name += f"_{bound:%Y%m%dT%H%M%S}" if bound is not None else "_"
+    # The CSV is append-only, so a byte range of the same file never changes.
+    etag = f'"{info.st_ino:x}-{first:x}-{last:x}"'
+    return build_export_response(
+        handle,
+        first,
+        last,
+        etag=etag,
+        filename=name.rstrip("_") + ".csv",
+        range_header=request.headers.get("range"),
+        if_range=request.headers.get("if-range"),
+        accept_encoding=request.headers.get("accept-encoding"),
+    )
+
+
+def _require_event_store() -> str:
+    config = load_config()
+    if config.event_store != "sqlite":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="SQLite event store disabled",
+        )
+    return config.machine_id
+
+
+# Plain ``def`` handlers run in the thread pool, so SQLite reads never block the event loop.
+@app.get("/history/events")
+def history_events(
+    request: Request,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    _: str | None = Depends(require_api_key),
+) -> Response:
+    """Return stored events with ``start <= timestamp < end`` from the SQLite store."""
+
+    machine_id = _require_event_store()
+    events = query_events(machine_id, start=start, end=end, limit=limit)
+    return encode_response(request, {"machine_id": machine_id, "count": len(events), "events": events})
+
+
+@app.get("/history/daily")
+def history_daily(
+    request: Request,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    _: str | None = Depends(require_api_key),
+) -> Response:
+    """Return per-production-day rollups from the SQLite store."""
+
+    machine_id = _require_event_store()
+    return encode_response(
+        request, {"machine_id": machine_id, "days": query_daily_rollups(machine_id, start=start, end=end)}
+    )
+
+
+@app.get("/machine/state")
+async def machine_state(_: str | None = Depends(require_api_key)) -> Dict[str, Any]:
+    """Return the running/slow/idle/down state and today's time in each state."""
+
+    snapshot = load_machine_state()
+    if snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Machine state has not been published yet",
+        )
+    return snapshot
+
+
+@app.get("/anomalies")
+async def anomalies(
+    request: Request,
+    since: Optional[datetime] = None,
+    _: str | None = Depends(require_api_key),
+) -> Response:
+    """Return cycle-time outlier and drift alerts with the detector's current baseline."""
+
+    snapshot = load_anomalies(since=since)
+    if snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Anomaly detection has not published any state yet",
+        )
+    return encode_response(request, snapshot)
+
+
+@app.get("/summaries/daily")
+def daily_summaries(
+    request: Request,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    _: str | None = Depends(require_api_key),
+) -> Response:
+    """Return the production-day summaries written at each reset-hour rollover."""
+
+    config = load_config()
+    return encode_response(
+        request,
+        {"machine_id": config.machine_id, "days": load_daily_summaries(config.machine_id, start=start, end=end)},
+    )
+
+
+@app.get("/rollups")
+def rollups(
+    request: Request,
+    resolution: str = Query("15m", description="Bucket width: " + ", ".join(RESOLUTIONS)),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    _: str | None = Depends(require_api_key),
+) -> Response:
+    """Return cycle-time rollup buckets and their combined summary."""
+
+    config = load_config()
+    try:
+        payload = query_rollups(config.machine_id, resolution=resolution, start=start, end=end)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return encode_response(request, payload)
+
+
+@app.get("/debug/timings")
+async def debug_timings(_: str | None = Depends(require_api_key)) -> Dict[str, Any]:
+    """Return per-route latency, in-flight counts, event-loop lag and slow requests."""
+
+    return timings_snapshot(_loop_lag_probe)
+
+
 def _get_stacklight_controller() -> StackLightController:
     """Get or initialize the stack light controller."""
     global _stacklight_controller
@@ -211,11 +484,20 @@ async def set_stacklight(
 
 
 @app.get("/stacklight/status", response_model=StackLightState)
-async def get_stacklight_status(_: str | None = Depends(require_api_key)) -> Dict[str, Any]:
+async def get_stacklight_status(
+    request: Request,
+    response: Response,
+    wait: float = _WAIT_QUERY,
+    _: str | None = Depends(require_api_key),
+) -> Any:
     """Get the current state of stack lights."""
 
     try:
         controller = _get_stacklight_controller()
+        etag, not_modified = await evaluate(request, controller.version, wait)
+        if not_modified is not None:
+            return not_modified
+        response.headers["ETag"] = etag
         return controller.get_light_state()
     except HTTPException:
         raise
@@ -278,11 +560,17 @@ async def turn_off_stacklight(_: str | None = Depends(require_api_key)) -> Dict[
 @app.on_event("startup")
 async def startup_event():
     """Refresh settings cache and run startup self-test on startup."""
+    global _loop_lag_probe
+
     LOGGER.info("Refreshing settings cache on startup")
     refresh_settings()
 
-    # Run startup self-test if stack lights are enabled
     settings = get_settings()
+    configure_slow_request_threshold(settings.slow_request_threshold_ms)
+    _loop_lag_probe = LoopLagProbe(settings.loop_lag_probe_interval)
+    _loop_lag_probe.start()
+
+    # Run startup self-test if stack lights are enabled
     if settings.stacklight.enabled and settings.stacklight.startup_self_test:
         try:
             LOGGER.info("Initializing stack light controller for startup self-test")
@@ -300,7 +588,11 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up resources on shutdown."""
-    global _stacklight_controller
+    global _stacklight_controller, _loop_lag_probe
+
+    if _loop_lag_probe is not None:
+        await _loop_lag_probe.stop()
+        _loop_lag_probe = None
 
     if _stacklight_controller is not None:
         LOGGER.info("Cleaning up stack light controller on shutdown")
@@ -7,9 +7,10 @@ import json
 import sys
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Union
+from typing import TYPE_CHECKING, Optional, Union
 
-import httpx
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    import httpx
 
 DEFAULT_BASE_URL = "https://localhost:8443"
 
@@ -64,6 +65,8 @@ def parse_cli(argv: Optional[list[str]] = None) -> tuple[CLISettings, argparse.N
 
 
 def _make_client(settings: CLISettings) -> httpx.Client:
+    import httpx
+
     headers = {}
     if settings.api_key:
         headers["X-API-Key"] = settings.api_key
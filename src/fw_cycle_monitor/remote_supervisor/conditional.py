@@ -0,0 +1,83 @@
+"""ETag, ``If-None-Match`` and long-polling for frequently polled endpoints.
+
+Each resource exposes a cheap version token – a ``stat`` of the file it is
+built from, or an in-memory change counter – so a dashboard that already has
+the current representation is answered ``304 Not Modified`` before anything
+is loaded or computed.  With ``?wait=<seconds>`` the request is held until
+the version changes or the wait expires, which replaces tight polling loops
+with one request per change.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .timing import mark_long_poll
+
+__all__ = ["MAX_WAIT_SECONDS", "evaluate", "file_version"]
+
+#: Upper bound for ``?wait=``; proxies commonly drop idle requests after 60 s.
+MAX_WAIT_SECONDS = 55.0
+#: How often a held request re-reads the version token.
+POLL_INTERVAL_SECONDS = 0.5
+
+
+def file_version(path: Path) -> str:
+    """Return a token that changes whenever ``path`` is rewritten."""
+
+    try:
+        info = os.stat(path)
+    except OSError:
+        return "missing"
+    return f"{info.st_ino:x}.{info.st_mtime_ns:x}.{info.st_size:x}"
+
+
+def _etag(version: str) -> str:
+    # Weak: the token identifies a version of the resource, not its bytes.
+    return f'W/"{version}"'
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    opaque = etag[2:]
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+async def evaluate(
+    request: Request,
+    version: Callable[[], str],
+    wait: float = 0.0,
+) -> Tuple[str, Optional[Response]]:
+    """Return the current ETag and, if the client is up to date, the 304 response.
+
+    When ``wait`` is positive and the client's ETag is current, the request is
+    held until ``version()`` changes, the client disconnects, or ``wait``
+    seconds (at most :data:`MAX_WAIT_SECONDS`) pass.  Held requests are left
+    out of the slow-request log and latency histograms.
+    """
+
+    if_none_match = request.headers.get("if-none-match")
+    etag = _etag(version())
+    if _matches(if_none_match, etag) and wait > 0:
+        mark_long_poll(request.scope)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + min(wait, MAX_WAIT_SECONDS)
+        while loop.time() < deadline:
+            await asyncio.sleep(min(POLL_INTERVAL_SECONDS, max(deadline - loop.time(), 0.0)))
+            etag = _etag(version())
+            if not _matches(if_none_match, etag) or await request.is_disconnected():
+                break
+    if _matches(if_none_match, etag):
+        return etag, Response(status_code=304, headers={"etag": etag})
+    return etag, None
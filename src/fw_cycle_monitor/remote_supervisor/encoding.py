@@ -0,0 +1,169 @@
+"""Content negotiation for large supervisor payloads.
+
+History, event and rollup endpoints can return thousands of items.  Passing
+them through FastAPI's default path costs a ``jsonable_encoder`` walk over
+every value (and a pydantic model per item when a ``response_model`` is
+declared) before ``json.dumps`` even starts, which dominates request time on
+a Pi.  :func:`encode_response` serialises the payload once, directly:
+
+* JSON by default, with ``orjson`` when installed and compact stdlib
+  ``json`` otherwise;
+* MessagePack when the client sends ``Accept: application/msgpack`` and
+  ``msgpack`` is installed;
+* brotli or gzip when the body exceeds :data:`COMPRESS_MIN_BYTES` and the
+  client's ``Accept-Encoding`` allows it (brotli only when installed).
+
+The optional libraries are listed in the ``supervisor-encodings`` extra;
+``scripts/bench_supervisor_encoding.py`` measures the difference.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+from datetime import date, datetime
+from typing import Any, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["encode_response", "negotiate_encoding", "serialise"]
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+COMPRESS_MIN_BYTES = 4096
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+_UNSET = object()
+_orjson: Any = _UNSET
+_msgpack: Any = _UNSET
+_brotli: Any = _UNSET
+
+
+def _optional(name: str) -> Any:
+    try:
+        return __import__(name)
+    except ImportError:
+        return None
+
+
+def _get_orjson() -> Any:
+    global _orjson
+    if _orjson is _UNSET:
+        _orjson = _optional("orjson")
+    return _orjson
+
+
+def _get_msgpack() -> Any:
+    global _msgpack
+    if _msgpack is _UNSET:
+        _msgpack = _optional("msgpack")
+    return _msgpack
+
+
+def _get_brotli() -> Any:
+    global _brotli
+    if _brotli is _UNSET:
+        _brotli = _optional("brotli")
+    return _brotli
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not serialisable")
+
+
+def _dumps_json(payload: Any) -> bytes:
+    orjson = _get_orjson()
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _dumps_msgpack(payload: Any) -> bytes:
+    return _get_msgpack().packb(payload, default=_default, use_bin_type=True)
+
+
+def _accepted(header: Optional[str]) -> dict[str, float]:
+    """Return the media types or codings in an ``Accept``-style header with their quality."""
+
+    accepted: dict[str, float] = {}
+    for part in (header or "").split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def negotiate_encoding(accept: Optional[str], accept_encoding: Optional[str]) -> Tuple[str, Optional[str]]:
+    """Return the media type and content coding (or ``None``) to answer with."""
+
+    media_types = _accepted(accept)
+    media_type = JSON_MEDIA_TYPE
+    if _get_msgpack() is not None:
+        msgpack_quality = max((media_types.get(name, 0.0) for name in MSGPACK_MEDIA_TYPES), default=0.0)
+        json_quality = max(media_types.get(JSON_MEDIA_TYPE, 0.0), media_types.get("*/*", 0.0))
+        if not media_types:
+            json_quality = 1.0
+        if msgpack_quality > json_quality:
+            media_type = MSGPACK_MEDIA_TYPES[0]
+
+    codings = _accepted(accept_encoding)
+    wildcard = codings.get("*", 0.0)
+    coding: Optional[str] = None
+    if _get_brotli() is not None and codings.get("br", wildcard) > 0:
+        coding = "br"
+    elif codings.get("gzip", wildcard) > 0:
+        coding = "gzip"
+    return media_type, coding
+
+
+def serialise(payload: Any, media_type: str = JSON_MEDIA_TYPE) -> bytes:
+    """Encode ``payload`` as ``media_type`` without building any models."""
+
+    if media_type in MSGPACK_MEDIA_TYPES:
+        return _dumps_msgpack(payload)
+    return _dumps_json(payload)
+
+
+def _compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return _get_brotli().compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def encode_response(
+    request: Request,
+    payload: Any,
+    *,
+    status_code: int = 200,
+    headers: Optional[dict[str, str]] = None,
+) -> Response:
+    """Serialise ``payload`` in the representation ``request`` prefers."""
+
+    media_type, coding = negotiate_encoding(request.headers.get("accept"), request.headers.get("accept-encoding"))
+    body = serialise(payload, media_type)
+    response_headers = {"vary": "Accept, Accept-Encoding", **(headers or {})}
+    if coding is not None and len(body) >= COMPRESS_MIN_BYTES:
+        body = _compress(body, coding)
+        response_headers["content-encoding"] = coding
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=response_headers)
@@ -0,0 +1,187 @@
+"""Byte-range responses for bulk CSV exports.
+
+``/events/export`` sends a slice of the cycle CSV exactly as it is stored, so
+no row is parsed or re-encoded in Python.  The slice is located by binary
+search (:func:`fw_cycle_monitor.event_feed.locate_time_range`) and then sent
+with the ASGI zero-copy extension (``sendfile``) when the server offers it, or
+in large ``pread`` chunks otherwise.  Single ``Range`` requests, ``If-Range``
+and ``HEAD`` are honoured so interrupted downloads can resume.  Clients that
+accept gzip and do not ask for a range get a compressed stream instead.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import zlib
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+import anyio
+from starlette.responses import Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+__all__ = ["FileRangeResponse", "build_export_response"]
+
+CHUNK_BYTES = 256 * 1024
+GZIP_LEVEL = 6
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class FileRangeResponse(Response):
+    """Send ``length`` bytes of an open file starting at ``offset``.
+
+    The response takes ownership of ``handle`` and closes it once sent.
+    """
+
+    def __init__(
+        self,
+        handle: BinaryIO,
+        offset: int,
+        length: int,
+        *,
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+        media_type: str = "text/csv",
+    ) -> None:
+        self.handle = handle
+        self.offset = offset
+        self.length = length
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.body = b""
+        self.init_headers({**(headers or {}), "content-length": str(length)})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if scope.get("method") == "HEAD" or not self.length:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+                return
+            fd = self.handle.fileno()
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send(
+                    {
+                        "type": "http.response.zerocopysend",
+                        "file": fd,
+                        "offset": self.offset,
+                        "count": self.length,
+                        "more_body": False,
+                    }
+                )
+                return
+            position, end = self.offset, self.offset + self.length
+            while position < end:
+                chunk = await anyio.to_thread.run_sync(os.pread, fd, min(CHUNK_BYTES, end - position), position)
+                if not chunk:
+                    break
+                position += len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": position < end})
+            if position < end:
+                # The file shrank underneath us; end the body rather than hang.
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            self.handle.close()
+
+
+def _gzip_chunks(handle: BinaryIO, offset: int, length: int) -> Iterator[bytes]:
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    try:
+        fd = handle.fileno()
+        position, end = offset, offset + length
+        while position < end:
+            chunk = os.pread(fd, min(CHUNK_BYTES, end - position), position)
+            if not chunk:
+                break
+            position += len(chunk)
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+    finally:
+        handle.close()
+
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.partition(";")
+        if coding.strip().lower() not in ("gzip", "x-gzip", "*"):
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        return quality > 0
+    return False
+
+
+def _parse_range(header: str, length: int) -> Optional[Tuple[int, int]]:
+    """Return the ``(start, end)`` bytes of a single-range header; ``end`` is exclusive.
+
+    Returns ``None`` for ranges this module does not serve (multiple ranges or
+    bad syntax), which are answered with the whole body.  Raises
+    ``ValueError`` when the range cannot be satisfied.
+    """
+
+    match = _RANGE_PATTERN.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError("empty suffix range")
+        return max(length - suffix, 0), length
+    start = int(first)
+    end = min(int(last) + 1, length) if last else length
+    if start >= length or end <= start:
+        raise ValueError("range not satisfiable")
+    return start, end
+
+
+def build_export_response(
+    handle: BinaryIO,
+    start: int,
+    end: int,
+    *,
+    etag: str,
+    filename: str,
+    range_header: Optional[str] = None,
+    if_range: Optional[str] = None,
+    accept_encoding: Optional[str] = None,
+) -> Response:
+    """Return the response for bytes ``start``-``end`` of ``handle``, honouring the request headers."""
+
+    length = end - start
+    headers = {
+        "accept-ranges": "bytes",
+        "etag": etag,
+        "content-disposition": f'attachment; filename="{filename}"',
+        "vary": "Accept-Encoding",
+    }
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            requested = _parse_range(range_header, length)
+        except ValueError:
+            handle.close()
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{length}"})
+        if requested is not None:
+            first, last = requested
+            headers["content-range"] = f"bytes {first}-{last - 1}/{length}"
+            return FileRangeResponse(handle, start + first, last - first, status_code=206, headers=headers)
+
+    if length and _accepts_gzip(accept_encoding):
+        # Byte ranges refer to the uncompressed file, so the compressed
+        # variant is only offered for complete downloads.
+        headers.pop("accept-ranges")
+        headers["content-encoding"] = "gzip"
+        headers["etag"] = etag[:-1] + '-gzip"'
+        return StreamingResponse(_gzip_chunks(handle, start, length), media_type="text/csv", headers=headers)
+    return FileRangeResponse(handle, start, length, headers=headers)
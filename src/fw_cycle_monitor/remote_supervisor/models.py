@@ -33,6 +33,9 @@ class MetricsResponse(BaseModel):
     machine_id: str
     last_cycle_seconds: Optional[float]
     window_averages: Dict[int, Optional[float]]
+    last_pulse_seconds: Optional[float] = None
+    pulse_window_averages: Dict[int, Optional[float]] = {}
+    duty_cycles: Dict[int, Optional[float]] = {}
 
 
 class ConfigSnapshot(BaseModel):
@@ -5,14 +5,13 @@ from __future__ import annotations
 import argparse
 import logging
 import os
+import signal
 from pathlib import Path
 from typing import Optional
 
-import uvicorn
-
 from . import settings
-from .api import app
-from ..updater import determine_repo_path, sync_environment, update_repository
+from .. import startup_profile
+from ..updater import UPDATE_RESTART_EXIT_CODE, SourceWatcher, auto_update_enabled, determine_repo_path
 
 LOGGER = logging.getLogger(__name__)
 
@@ -34,22 +33,35 @@ def build_argument_parser() -> argparse.ArgumentParser:
     return parser
 
 
+def _request_update_restart() -> None:
+    LOGGER.info("Update installed; stopping remote supervisor so it restarts on the new code")
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+def _start_source_watcher() -> Optional[SourceWatcher]:
+    """Restart onto the code the monitor service pulled.
+
+    The supervisor never pulls itself: only the monitor knows when the press
+    is idle, and two processes pulling the same checkout would leave the one
+    that found it current running stale code.
+    """
+
+    if not auto_update_enabled():
+        LOGGER.info("Automatic updates disabled")
+        return None
+
+    repo_path = determine_repo_path(Path(__file__).resolve().parents[3])
+    watcher = SourceWatcher(repo_path, on_changed=_request_update_restart)
+    watcher.start()
+    return watcher
+
+
 def main(argv: Optional[list[str]] = None) -> None:
     parser = build_argument_parser()
     args = parser.parse_args(argv)
 
     _configure_logging(args.verbose)
 
-    repo_path = determine_repo_path(Path(__file__).resolve().parents[3])
-    extras = os.environ.get("FW_CYCLE_MONITOR_INSTALL_EXTRAS")
-    LOGGER.info("Ensuring repository at %s is up to date", repo_path)
-    if update_repository(repo_path):
-        LOGGER.info("Repository updated; refreshing Python package")
-        if not sync_environment(repo_path, extras):
-            LOGGER.warning(
-                "Failed to refresh installed package; the remote supervisor may run with stale dependencies"
-            )
-
     if args.reload_settings:
         LOGGER.info("Reloading supervisor settings before launch")
         settings.refresh_settings()
@@ -61,7 +73,15 @@ def main(argv: Optional[list[str]] = None) -> None:
     certfile = args.certfile or supervisor_settings.certfile
     keyfile = args.keyfile or supervisor_settings.keyfile
 
+    with startup_profile.phase("import uvicorn"):
+        import uvicorn
+    with startup_profile.phase("import API application"):
+        from .api import app
+
     LOGGER.info("Starting remote supervisor on %s:%s targeting unit %s", host, port, supervisor_settings.unit_name)
+    startup_profile.report()
+
+    watcher = _start_source_watcher()
 
     uvicorn.run(
         app,
@@ -72,6 +92,11 @@ def main(argv: Optional[list[str]] = None) -> None:
         log_level="debug" if args.verbose else "info",
     )
 
+    if watcher is not None:
+        watcher.stop()
+        if watcher.restart_requested:
+            raise SystemExit(UPDATE_RESTART_EXIT_CODE)
+
 
 if __name__ == "__main__":  # pragma: no cover
     main()
@@ -106,6 +106,12 @@ def restart_service(unit_name: str | None = None) -> ServiceStatus:
     return _mutate_service("restart", unit_name)
 
 
+def reload_service(unit_name: str | None = None) -> ServiceStatus:
+    """Ask the monitor to re-read ``config.json`` in place (SIGHUP via ``ExecReload``)."""
+
+    return _mutate_service("reload", unit_name)
+
+
 def status_summary(unit_name: str | None = None) -> Dict[str, object]:
     status = get_service_status(unit_name)
     response: Dict[str, object] = {
@@ -49,6 +49,8 @@ class RemoteSupervisorSettings:
     keyfile: Optional[Path] = None
     ca_bundle: Optional[Path] = None
     metrics_enabled: bool = True
+    slow_request_threshold_ms: float = 500.0
+    loop_lag_probe_interval: float = 1.0
     stacklight: StackLightSettings = field(default_factory=StackLightSettings)
 
     def __post_init__(self) -> None:
@@ -66,6 +68,14 @@ class RemoteSupervisorSettings:
         if self.port <= 0 or self.port > 65535:
             self.port = 8443
         self.unit_name = self.unit_name or "fw-cycle-monitor.service"
+        try:
+            self.slow_request_threshold_ms = float(self.slow_request_threshold_ms)
+        except (TypeError, ValueError):
+            self.slow_request_threshold_ms = 500.0
+        try:
+            self.loop_lag_probe_interval = float(self.loop_lag_probe_interval)
+        except (TypeError, ValueError):
+            self.loop_lag_probe_interval = 1.0
         if isinstance(self.api_keys, (str, bytes)):
             self.api_keys = [str(self.api_keys)]
         else:
@@ -27,6 +27,10 @@ class StackLightController:
         self.active_low = active_low
         self.state = {"green": False, "amber": False, "red": False}
         self.last_updated = None
+        # Incremented on every state change; combined with the start time it
+        # versions ``/stacklight/status`` for conditional requests.
+        self.sequence = 0
+        self._started = time.time_ns()
         self.gpio = None
 
         if not mock_mode:
@@ -95,6 +99,7 @@ class StackLightController:
         try:
             self.state = {"green": green, "amber": amber, "red": red}
             self.last_updated = datetime.now(timezone.utc)
+            self.sequence += 1
 
             if self.mock_mode:
                 LOGGER.info(f"MOCK: Set lights - Green={green}, Amber={amber}, Red={red}")
@@ -137,6 +142,10 @@ class StackLightController:
                 "state": self.state.copy()
             }
 
+    def version(self) -> str:
+        """Return a token that changes whenever the light state is set."""
+        return f"{self._started:x}.{self.sequence:x}"
+
     def get_light_state(self) -> Dict[str, Any]:
         """
         Get the current state of all lights.
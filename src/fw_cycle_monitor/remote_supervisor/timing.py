@@ -0,0 +1,302 @@
+"""Request latency tracking and event-loop lag probing for the supervisor."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Optional
+
+from ..instrumentation import Histogram, Registry
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = [
+    "RequestTimingMiddleware",
+    "LoopLagProbe",
+    "configure_slow_request_threshold",
+    "mark_long_poll",
+    "timings_snapshot",
+]
+
+TIMINGS_REGISTRY = Registry()
+SLOW_REQUEST_HISTORY = 20
+_QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _RequestTracker:
+    """Shared bookkeeping for in-flight and slow requests."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.in_flight: Dict[int, Dict[str, Any]] = {}
+        self.in_flight_by_route: Dict[str, int] = {}
+        self.slow_requests: Deque[Dict[str, Any]] = deque(maxlen=SLOW_REQUEST_HISTORY)
+        self.threshold = 0.5
+        self.loop_thread_id: Optional[int] = None
+        self._next_id = 0
+        self._sampler: Optional[threading.Thread] = None
+
+    def begin(self, route: str, method: str) -> int:
+        with self.lock:
+            self._next_id += 1
+            request_id = self._next_id
+            self.in_flight[request_id] = {
+                "route": route,
+                "method": method,
+                "started": time.perf_counter(),
+                "stack": None,
+                "long_poll": False,
+            }
+            self.in_flight_by_route[route] = self.in_flight_by_route.get(route, 0) + 1
+            if self.loop_thread_id is None:
+                self.loop_thread_id = threading.get_ident()
+        self._ensure_sampler()
+        return request_id
+
+    def finish(self, request_id: int, status_code: Optional[int]) -> None:
+        finished = time.perf_counter()
+        with self.lock:
+            entry = self.in_flight.pop(request_id, None)
+            if entry is None:
+                return
+            route = entry["route"]
+            remaining = self.in_flight_by_route.get(route, 1) - 1
+            if remaining > 0:
+                self.in_flight_by_route[route] = remaining
+            else:
+                self.in_flight_by_route.pop(route, None)
+
+        if entry["long_poll"]:
+            # Held on purpose; its duration says nothing about server latency.
+            return
+        duration = finished - entry["started"]
+        _route_histogram(route).observe(duration)
+        if duration < self.threshold:
+            return
+
+        record = {
+            "route": route,
+            "method": entry["method"],
+            "status_code": status_code,
+            "duration_ms": round(duration * 1000.0, 3),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "stack": entry["stack"],
+        }
+        with self.lock:
+            self.slow_requests.append(record)
+        if entry["stack"]:
+            LOGGER.warning(
+                "Slow request %s %s took %.1f ms (status %s); event loop stack while slow:\n%s",
+                entry["method"],
+                route,
+                duration * 1000.0,
+                status_code,
+                "".join(entry["stack"]),
+            )
+        else:
+            LOGGER.warning(
+                "Slow request %s %s took %.1f ms (status %s)",
+                entry["method"],
+                route,
+                duration * 1000.0,
+                status_code,
+            )
+
+    def _ensure_sampler(self) -> None:
+        if self._sampler is not None:
+            return
+        with self.lock:
+            if self._sampler is not None:
+                return
+            self._sampler = threading.Thread(target=self._sample_loop, name="slow-request-sampler", daemon=True)
+            self._sampler.start()
+
+    def _sample_loop(self) -> None:  # pragma: no cover - background worker
+        """Capture the event loop's stack while a request is over the threshold."""
+
+        while True:
+            time.sleep(max(self.threshold / 2.0, 0.05))
+            now = time.perf_counter()
+            with self.lock:
+                overdue = [
+                    entry
+                    for entry in self.in_flight.values()
+                    if entry["stack"] is None
+                    and not entry["long_poll"]
+                    and now - entry["started"] >= self.threshold
+                ]
+                thread_id = self.loop_thread_id
+            if not overdue or thread_id is None:
+                continue
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            stack = traceback.format_stack(frame)
+            with self.lock:
+                for entry in overdue:
+                    entry["stack"] = stack
+
+
+_TRACKER = _RequestTracker()
+_SCOPE_KEY = "fw_request_id"
+
+
+def mark_long_poll(scope: Dict[str, Any]) -> None:
+    """Exclude the request in ``scope`` from latency tracking while it is held open."""
+
+    request_id = scope.get(_SCOPE_KEY)
+    if request_id is None:
+        return
+    with _TRACKER.lock:
+        entry = _TRACKER.in_flight.get(request_id)
+        if entry is not None:
+            entry["long_poll"] = True
+
+
+def configure_slow_request_threshold(threshold_ms: float) -> None:
+    """Set the latency above which requests are logged with a stack sample."""
+
+    _TRACKER.threshold = max(float(threshold_ms), 1.0) / 1000.0
+
+
+def _route_histogram(route: str) -> Histogram:
+    return TIMINGS_REGISTRY.histogram(
+        "fw_supervisor_request_duration_seconds",
+        "Supervisor request latency by route.",
+        {"route": route},
+    )
+
+
+def _resolve_route(scope: Dict[str, Any]) -> str:
+    """Return the route template (``/stacklight/set``) matching ``scope``."""
+
+    app = scope.get("app")
+    router = getattr(app, "router", None)
+    for route in getattr(router, "routes", ()):
+        try:
+            match, _ = route.matches(scope)
+        except Exception:  # pragma: no cover - defensive against custom routes
+            continue
+        if getattr(match, "name", "") == "FULL":
+            return getattr(route, "path", scope.get("path", ""))
+    return "<unmatched>"
+
+
+class RequestTimingMiddleware:
+    """ASGI middleware recording per-route latency and in-flight counts."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope.get("type") != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _TRACKER.begin(_resolve_route(scope), scope.get("method", ""))
+        scope[_SCOPE_KEY] = request_id
+        status_code: Optional[int] = None
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code
+            if message.get("type") == "http.response.start":
+                status_code = message.get("status")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _TRACKER.finish(request_id, status_code)
+
+
+class LoopLagProbe:
+    """Periodically measure how late the event loop wakes up a sleeping task."""
+
+    def __init__(self, interval: float = 1.0) -> None:
+        self.interval = max(interval, 0.05)
+        self.last_lag: Optional[float] = None
+        self.max_lag = 0.0
+        self.histogram = TIMINGS_REGISTRY.histogram(
+            "fw_supervisor_event_loop_lag_seconds", "Delay between a scheduled and actual event loop wake-up."
+        )
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            _TRACKER.loop_thread_id = threading.get_ident()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        task = self._task
+        self._task = None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self) -> None:  # pragma: no cover - background task
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - scheduled - self.interval)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.histogram.observe(lag)
+
+
+def _histogram_summary(histogram: Histogram) -> Dict[str, Any]:
+    count = histogram.count
+    summary: Dict[str, Any] = {
+        "count": count,
+        "mean_ms": round(histogram.sum / count * 1000.0, 3) if count else None,
+    }
+    for quantile in _QUANTILES:
+        value = histogram.quantile(quantile)
+        summary[f"p{int(quantile * 100)}_ms"] = round(value * 1000.0, 3) if value is not None else None
+    return summary
+
+
+def timings_snapshot(probe: Optional[LoopLagProbe] = None) -> Dict[str, Any]:
+    """Return route latency, in-flight counts, loop lag and recent slow requests."""
+
+    routes: Dict[str, Any] = {}
+    for entry in TIMINGS_REGISTRY.snapshot():
+        if entry["name"] != "fw_supervisor_request_duration_seconds":
+            continue
+        route = entry["labels"].get("route", "")
+        routes[route] = _histogram_summary(_route_histogram(route))
+
+    with _TRACKER.lock:
+        in_flight = dict(_TRACKER.in_flight_by_route)
+        slow_requests = list(_TRACKER.slow_requests)
+
+    for route, count in in_flight.items():
+        routes.setdefault(route, {"count": 0, "mean_ms": None})["in_flight"] = count
+    for summary in routes.values():
+        summary.setdefault("in_flight", 0)
+
+    loop_lag: Dict[str, Any] = {}
+    if probe is not None:
+        loop_lag = {
+            "interval_seconds": probe.interval,
+            "last_ms": round(probe.last_lag * 1000.0, 3) if probe.last_lag is not None else None,
+            "max_ms": round(probe.max_lag * 1000.0, 3),
+            **_histogram_summary(probe.histogram),
+        }
+
+    return {
+        "slow_request_threshold_ms": round(_TRACKER.threshold * 1000.0, 3),
+        "routes": routes,
+        "event_loop_lag": loop_lag,
+        "slow_requests": slow_requests,
+    }
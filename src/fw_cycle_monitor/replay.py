@@ -0,0 +1,282 @@
+"""Replay a recorded cycle CSV through the live recording pipeline.
+
+``fw-cycle-monitor replay CM_M201.csv`` feeds every row of an existing CSV to
+a :class:`~fw_cycle_monitor.gpio_monitor.CycleMonitor` started without GPIO,
+so the cycle counter and its daily resets, the daily summaries, the rolling
+metrics and rollups, anomaly detection and the CSV writer all run the code
+the service runs.  Everything is written to a scratch configuration
+directory (a new temporary directory unless ``--scratch-dir`` is given); the
+real configuration is only read for its settings.
+
+``--speed`` paces the replay: ``1`` reproduces the recorded gaps in wall-clock
+time, ``N`` runs N times faster and ``max`` (the default) does not wait at
+all.  At the end the command prints the throughput, how far a paced replay
+fell behind schedule, the daily resets and summaries, and the rolling
+statistics as of the last event.
+
+The monitor is built for replaying: the machine state tracker takes its time
+from the event timestamps, so ``machine_state.json`` describes the history
+as of its last event, and the counter state and rolling metrics are saved in
+batches (see :meth:`~fw_cycle_monitor.gpio_monitor.CycleMonitor.replay_event`).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime
+from itertools import chain
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .spool import parse_row_timestamp
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["ReplayReport", "iter_csv_events", "main", "replay"]
+
+_CONFIG_DIR_ENV = "FW_CYCLE_MONITOR_CONFIG_DIR"
+_CSV_NAME = re.compile(r"CM_(.+)\.csv", re.IGNORECASE)
+
+
+@dataclass
+class ReplayReport:
+    """Outcome of a replay."""
+
+    csv_path: Path
+    scratch_dir: Path
+    speed: Optional[float]
+    events: int = 0
+    elapsed_seconds: float = 0.0
+    first_event: Optional[datetime] = None
+    last_event: Optional[datetime] = None
+    daily_resets: int = 0
+    final_cycle: Optional[int] = None
+    failures: int = 0
+    daily_summaries: int = 0
+    max_lag_seconds: float = 0.0
+    interrupted: bool = False
+    statistics: Optional[Any] = None
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    @property
+    def history_seconds(self) -> float:
+        if self.first_event is None or self.last_event is None:
+            return 0.0
+        return (self.last_event - self.first_event).total_seconds()
+
+
+def iter_csv_events(csv_path: Path) -> Iterator[Tuple[datetime, Optional[float]]]:
+    """Yield ``(timestamp, pulse seconds)`` for every cycle row in ``csv_path``."""
+
+    with csv_path.open("rb") as csv_file:
+        for line in csv_file:
+            timestamp = parse_row_timestamp(line)
+            if timestamp is None:
+                continue
+            pulse: Optional[float] = None
+            columns = line.split(b",", 2)
+            if len(columns) > 1 and columns[1].strip():
+                try:
+                    pulse = float(columns[1])
+                except ValueError:
+                    pulse = None
+            yield timestamp.astimezone(), pulse
+
+
+def _source_settings() -> Dict[str, Any]:
+    # Mirrors ``config._determine_config_dir``; that module fixes its paths on
+    # import, so it must not be imported before the scratch directory is set.
+    override = os.environ.get(_CONFIG_DIR_ENV)
+    config_dir = Path(override).expanduser() if override else Path.home() / ".config" / "fw_cycle_monitor"
+    try:
+        data = json.loads((config_dir / "config.json").read_text())
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as exc:
+        LOGGER.warning("Ignoring unreadable configuration in %s: %s", config_dir, exc)
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def replay(
+    csv_path: Path,
+    settings: Dict[str, Any],
+    speed: Optional[float] = None,
+) -> ReplayReport:
+    """Replay ``csv_path`` into the configuration directory currently in effect.
+
+    ``settings`` are ``config.json`` values (reset hour, thresholds, anomaly
+    sensitivity, ...); the CSV target is always redirected into the
+    configuration directory.  ``speed`` of ``None`` replays as fast as
+    possible.
+    """
+
+    from .config import CONFIG_DIR, AppConfig
+    from .daily_summary import SUMMARY_PATH
+    from .gpio_monitor import CycleMonitor
+    from .metrics import calculate_cycle_statistics
+
+    config = replace(
+        AppConfig.from_dict(settings),
+        csv_directory=CONFIG_DIR / "csv",
+        storage_mode="direct",
+    )
+    report = ReplayReport(csv_path=csv_path, scratch_dir=CONFIG_DIR, speed=speed)
+    events = iter_csv_events(csv_path)
+    first = next(events, None)
+    if first is None:
+        return report
+
+    monitor = CycleMonitor(config, replay=True)
+    # Count from the start of the history rather than from today.
+    monitor.reset_cycle_counter(first[0])
+    monitor.start(gpio=False)
+    origin = first[0]
+    started = time.perf_counter()
+    try:
+        for timestamp, pulse in chain([first], events):
+            if speed is not None:
+                due = started + (timestamp - origin).total_seconds() / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                elif -delay > report.max_lag_seconds:
+                    report.max_lag_seconds = -delay
+            cycle_number = monitor.replay_event(timestamp, pulse)
+            report.events += 1
+            report.last_event = timestamp
+            if cycle_number is None:
+                report.failures += 1
+                continue
+            if report.final_cycle is not None and cycle_number <= report.final_cycle:
+                report.daily_resets += 1
+            report.final_cycle = cycle_number
+    except KeyboardInterrupt:
+        report.interrupted = True
+    finally:
+        monitor.stop()
+        report.elapsed_seconds = time.perf_counter() - started
+
+    report.first_event = origin
+    try:
+        with SUMMARY_PATH.open("r", encoding="utf-8") as summary_file:
+            report.daily_summaries = sum(1 for line in summary_file if line.strip())
+    except FileNotFoundError:
+        pass
+    if report.last_event is not None:
+        report.statistics = calculate_cycle_statistics(config.machine_id, now=report.last_event)
+    return report
+
+
+def _parse_speed(value: str) -> Optional[float]:
+    if value.strip().lower() in {"max", "0"}:
+        return None
+    try:
+        speed = float(value.rstrip("xX"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid speed {value!r}; use a multiplier such as 1, 60 or max")
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive")
+    return speed
+
+
+def _format_seconds(value: Optional[float]) -> str:
+    return f"{value:.1f} s" if value is not None else "-"
+
+
+def _print_report(report: ReplayReport) -> None:
+    mode = "max speed" if report.speed is None else f"{report.speed:g}x"
+    suffix = " (interrupted)" if report.interrupted else ""
+    print(f"Replayed {report.events} events from {report.csv_path} at {mode}{suffix}")
+    if not report.events:
+        return
+    print(f"  History:      {report.first_event.isoformat()} to {report.last_event.isoformat()}")  # type: ignore[union-attr]
+    rate = f"{report.events_per_second:.0f} events/s"
+    if report.elapsed_seconds > 0:
+        rate += f", {report.history_seconds / report.elapsed_seconds:.0f}x real time"
+    print(f"  Elapsed:      {report.elapsed_seconds:.2f} s ({rate})")
+    if report.speed is not None:
+        print(f"  Max lag:      {report.max_lag_seconds * 1000:.1f} ms behind schedule")
+    print(f"  Daily resets: {report.daily_resets}; final cycle number {report.final_cycle}")
+    print(f"  Summaries:    {report.daily_summaries} production days")
+    if report.failures:
+        print(f"  Failures:     {report.failures} events could not be stored")
+    statistics = report.statistics
+    if statistics is not None:
+        averages: List[str] = [
+            f"{window} min: {_format_seconds(value)}" for window, value in statistics.window_averages.items()
+        ]
+        print(f"  Last cycle:   {_format_seconds(statistics.last_cycle_seconds)}; averages: {', '.join(averages)}")
+    print(f"  Outputs in:   {report.scratch_dir}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="fw-cycle-monitor replay",
+        description="Stream a recorded cycle CSV through the counter, metrics and statistics pipeline.",
+    )
+    parser.add_argument("csv", type=Path, help="CSV to replay, e.g. CM_M201.csv")
+    parser.add_argument(
+        "--speed",
+        type=_parse_speed,
+        default=None,
+        help="1 for wall-clock time, N for N times faster, max (default) for no pacing",
+    )
+    parser.add_argument("--machine-id", default=None, help="Machine ID (defaults to the one in the CSV name)")
+    parser.add_argument("--reset-hour", type=int, default=None, help="Daily reset hour (defaults to the configured one)")
+    parser.add_argument(
+        "--scratch-dir",
+        type=Path,
+        default=None,
+        help="Empty directory for the replay's outputs (defaults to a new temporary directory)",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Log the pipeline's INFO messages")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+    if not args.csv.is_file():
+        print(f"CSV file {args.csv} does not exist", file=sys.stderr)
+        return 1
+    if "fw_cycle_monitor.config" in sys.modules:
+        print("replay must start before the configuration module is loaded", file=sys.stderr)
+        return 1
+
+    settings = _source_settings()
+    match = _CSV_NAME.fullmatch(args.csv.name)
+    if args.machine_id:
+        settings["machine_id"] = args.machine_id
+    elif match:
+        settings["machine_id"] = match.group(1)
+    if args.reset_hour is not None:
+        settings["reset_hour"] = args.reset_hour
+
+    scratch = args.scratch_dir
+    if scratch is None:
+        scratch = Path(tempfile.mkdtemp(prefix="fw-cycle-replay-"))
+    elif scratch.exists() and any(scratch.iterdir()):
+        print(f"Scratch directory {scratch} is not empty", file=sys.stderr)
+        return 1
+    scratch.mkdir(parents=True, exist_ok=True)
+    os.environ[_CONFIG_DIR_ENV] = str(scratch.resolve())
+
+    report = replay(args.csv.resolve(), settings, args.speed)
+    _print_report(report)
+    return 130 if report.interrupted else 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
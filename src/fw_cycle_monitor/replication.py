@@ -0,0 +1,289 @@
+"""Replicate the local primary log to the shared CSV in the background.
+
+In ``local-first`` storage mode the monitor commits every event to a log on
+the Pi's own storage, so a stalled network share can no longer hold up the
+capture path.  :class:`CsvReplicator` ships the bytes appended to that log to
+``CM_<machine>.csv`` in ``csv_directory`` in batches.  The offset replicated so
+far is stored next to the local log (``<log>.replicated``) so replication
+resumes where it stopped after a restart or an outage; a crash between the
+append and the offset update can repeat the last batch, so delivery is
+at-least-once.  Failures back off exponentially up to :data:`MAX_BACKOFF_SECONDS`.
+
+The replicator publishes its progress to ``replication.json`` in the
+configuration directory, which the remote supervisor serves on
+``/replication/status``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .config import CONFIG_DIR, ensure_config_dir
+from .csv_appender import CsvAppender
+from .instrumentation import REGISTRY
+from .spool import parse_row_timestamp
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["CsvReplicator", "load_replication_status"]
+
+STATUS_PATH = CONFIG_DIR / "replication.json"
+DEFAULT_INTERVAL_SECONDS = 2.0
+MAX_BACKOFF_SECONDS = 300.0
+BATCH_BYTES = 256 * 1024
+
+_BATCHES = REGISTRY.counter("fw_replication_batches", "Batches copied from the local log to the shared CSV.")
+_FAILURES = REGISTRY.counter("fw_replication_failures", "Failed attempts to append to the shared CSV.")
+_PENDING_BYTES = REGISTRY.gauge("fw_replication_pending_bytes", "Bytes in the local log not yet replicated.")
+_LAG_SECONDS = REGISTRY.gauge("fw_replication_lag_seconds", "Age of the oldest event not yet replicated.")
+_BATCH_SECONDS = REGISTRY.histogram("fw_replication_batch_seconds", "Time spent appending a batch to the shared CSV.")
+
+
+class CsvReplicator:
+    """Background thread copying ``source`` to ``target`` from a durable offset."""
+
+    def __init__(
+        self,
+        source: Path,
+        target: Path,
+        machine_id: str,
+        *,
+        interval: float = DEFAULT_INTERVAL_SECONDS,
+        max_backoff: float = MAX_BACKOFF_SECONDS,
+        batch_bytes: int = BATCH_BYTES,
+    ) -> None:
+        self.source = source
+        self.target = target
+        self.machine_id = machine_id
+        self.offset_path = source.with_name(source.name + ".replicated")
+        self._interval = max(interval, 0.1)
+        self._max_backoff = max(max_backoff, self._interval)
+        self._batch_bytes = max(batch_bytes, 4096)
+        self._appender = CsvAppender(target)
+        self._offset = 0
+        self._identity: Optional[tuple[int, int]] = None
+        self._source_size = 0
+        self._oldest_pending: Optional[datetime] = None
+        self._last_success: Optional[datetime] = None
+        self._last_error: Optional[str] = None
+        self._failures = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._published: Optional[Dict[str, Any]] = None
+        self._load_offset()
+
+    # -----------------
+    # Offset persistence
+
+    def _load_offset(self) -> None:
+        try:
+            payload = json.loads(self.offset_path.read_text())
+            self._offset = max(int(payload.get("offset", 0)), 0)
+            identity = payload.get("identity")
+            if isinstance(identity, list) and len(identity) == 2:
+                self._identity = (int(identity[0]), int(identity[1]))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, TypeError, AttributeError):
+            LOGGER.warning("Invalid replication offset in %s; replicating %s from the start", self.offset_path, self.source)
+            self._offset = 0
+            self._identity = None
+
+    def _store_offset(self) -> None:
+        payload = {"offset": self._offset, "identity": list(self._identity) if self._identity else None}
+        tmp_path = self.offset_path.with_name(self.offset_path.name + ".tmp")
+        try:
+            tmp_path.write_text(json.dumps(payload))
+            tmp_path.replace(self.offset_path)
+        except OSError:
+            LOGGER.warning("Unable to record replication offset in %s", self.offset_path, exc_info=True)
+
+    # -----------------
+    # Replication
+
+    def replicate_once(self) -> bool:
+        """Copy one batch to the target; return ``True`` once caught up.
+
+        Raises ``OSError`` when the shared CSV cannot be written.
+        """
+
+        try:
+            info = os.stat(self.source)
+        except FileNotFoundError:
+            self._source_size = self._offset = 0
+            self._oldest_pending = None
+            return True
+
+        identity = (info.st_dev, info.st_ino)
+        if self._identity is not None and (identity != self._identity or info.st_size < self._offset):
+            LOGGER.warning("Local log %s was replaced; replicating it from the start", self.source)
+            self._offset = 0
+        if identity != self._identity:
+            self._identity = identity
+            self._store_offset()
+        self._source_size = info.st_size
+
+        if self._source_size <= self._offset:
+            self._oldest_pending = None
+            return True
+
+        with self.source.open("rb") as source_file:
+            source_file.seek(self._offset)
+            chunk = source_file.read(self._batch_bytes)
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            # Only a partial row so far; the writer always finishes its rows.
+            return True
+        chunk = chunk[: end + 1]
+        self._oldest_pending = parse_row_timestamp(chunk.split(b"\n", 1)[0])
+
+        started = time.perf_counter()
+        if not self._appender.is_open:
+            self.target.parent.mkdir(parents=True, exist_ok=True)
+        self._appender.ensure_current()
+        try:
+            self._appender.write(chunk)
+        except OSError:
+            # Reopen on the next attempt in case the share was remounted.
+            self._appender.close()
+            raise
+        _BATCH_SECONDS.observe(time.perf_counter() - started)
+        _BATCHES.inc()
+
+        self._offset += len(chunk)
+        self._store_offset()
+        if self._offset >= self._source_size:
+            self._oldest_pending = None
+            return True
+        return False
+
+    def _attempt(self) -> Optional[bool]:
+        try:
+            caught_up = self.replicate_once()
+        except OSError as exc:
+            _FAILURES.inc()
+            self._failures += 1
+            self._last_error = f"{type(exc).__name__}: {exc}"
+            if self._failures == 1:
+                LOGGER.warning("Unable to replicate %s to %s; will retry", self.source, self.target, exc_info=True)
+            else:
+                LOGGER.debug("Replication attempt %s failed: %s", self._failures, exc)
+            return None
+        if self._failures:
+            LOGGER.info("Replication to %s resumed after %s failed attempts", self.target, self._failures)
+        self._failures = 0
+        self._last_error = None
+        self._last_success = datetime.now(timezone.utc)
+        return caught_up
+
+    def _backoff_delay(self) -> float:
+        return min(self._interval * (2 ** min(self._failures - 1, 16)), self._max_backoff)
+
+    # -----------------
+    # Status
+
+    def status(self) -> Dict[str, Any]:
+        oldest = self._oldest_pending
+        return {
+            "machine_id": self.machine_id,
+            "source": str(self.source),
+            "target": str(self.target),
+            "replicated_offset": self._offset,
+            "source_bytes": self._source_size,
+            "pending_bytes": max(self._source_size - self._offset, 0),
+            "oldest_pending": oldest.isoformat() if oldest else None,
+            "last_success": self._last_success.isoformat() if self._last_success else None,
+            "last_error": self._last_error,
+            "consecutive_failures": self._failures,
+        }
+
+    def _publish(self) -> None:
+        status = self.status()
+        _PENDING_BYTES.set(status["pending_bytes"])
+        _LAG_SECONDS.set(_lag_seconds(status))
+        if status == self._published:
+            return
+        self._published = status
+        payload = {**status, "pid": os.getpid(), "updated_at": datetime.now(timezone.utc).isoformat()}
+        ensure_config_dir()
+        tmp_path = STATUS_PATH.with_suffix(STATUS_PATH.suffix + ".tmp")
+        try:
+            tmp_path.write_text(json.dumps(payload))
+            tmp_path.replace(STATUS_PATH)
+        except OSError:
+            LOGGER.debug("Unable to publish replication status to %s", STATUS_PATH, exc_info=True)
+
+    # -----------------
+    # Thread lifecycle
+
+    def notify(self) -> None:
+        """Wake the replicator after the writer appended to the local log."""
+
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        LOGGER.info("Replicating %s to %s", self.source, self.target)
+        self._thread = threading.Thread(target=self._run, name="csv-replicator", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        thread.join(timeout=10)
+        self._thread = None
+        self._appender.close()
+
+    def _run(self) -> None:  # pragma: no cover - background worker
+        while not self._stop.is_set():
+            caught_up = self._attempt()
+            self._publish()
+            if caught_up is None:
+                # Do not let new events cut the backoff short.
+                self._stop.wait(self._backoff_delay())
+            elif caught_up:
+                self._wake.wait(self._interval)
+                self._wake.clear()
+
+
+def _lag_seconds(status: Dict[str, Any], now: Optional[datetime] = None) -> float:
+    oldest = status.get("oldest_pending")
+    if not oldest:
+        return 0.0
+    try:
+        timestamp = datetime.fromisoformat(oldest)
+    except (TypeError, ValueError):
+        return 0.0
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    current = now or datetime.now(timezone.utc)
+    return max(0.0, (current - timestamp).total_seconds())
+
+
+def load_replication_status() -> Optional[Dict[str, Any]]:
+    """Return the replicator's last published status with the current lag."""
+
+    if not STATUS_PATH.exists():
+        return None
+    try:
+        data = json.loads(STATUS_PATH.read_text())
+    except (json.JSONDecodeError, OSError):
+        LOGGER.debug("Unable to read replication status %s", STATUS_PATH, exc_info=True)
+        return None
+    if not isinstance(data, dict):
+        return None
+    data["lag_seconds"] = round(_lag_seconds(data), 3)
+    return data
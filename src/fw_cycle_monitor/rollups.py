@@ -0,0 +1,317 @@
+"""Multi-resolution cycle-time rollups for long-term trends.
+
+``metrics.json`` only keeps two hours of timestamps.  This module keeps
+aggregated buckets instead, so weeks and months can be compared without
+re-reading the CSV:
+
+* 1-minute buckets for 7 days,
+* 15-minute buckets for 90 days,
+* daily buckets indefinitely, one per production day (starting at the
+  counter's reset hour, like the event store's daily rollups and the daily
+  summaries).
+
+Each bucket stores the count, sum, minimum and maximum cycle time plus a
+:class:`QuantileSketch`.  :func:`record_cycles` updates one row per resolution
+and bucket for a batch of events in one transaction, so the cost per event is
+constant no matter how much history is kept; the monitor calls it from its
+writer thread, never from the GPIO callback.  Buckets live in
+``rollups.sqlite3`` in the configuration directory; the database runs in WAL
+mode so the remote supervisor can query it while the monitor service writes.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .config import CONFIG_DIR, ensure_config_dir
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["QuantileSketch", "RESOLUTIONS", "query_rollups", "record_cycle", "record_cycles"]
+
+ROLLUPS_PATH = CONFIG_DIR / "rollups.sqlite3"
+PRUNE_INTERVAL_SECONDS = 3600.0
+SUMMARY_QUANTILES = (0.5, 0.9, 0.99)
+
+
+@dataclass(frozen=True)
+class Resolution:
+    """Bucket width and retention for one rollup level."""
+
+    name: str
+    width: Optional[timedelta]  # ``None`` means one bucket per production day
+    retention: Optional[timedelta]  # ``None`` keeps buckets indefinitely
+
+    def bucket_start(self, timestamp: datetime, reset_hour: int = 0) -> float:
+        if self.width is None:
+            # Naive local time, so the reset hour is found on the wall clock
+            # even on the days daylight saving time changes.
+            local = timestamp.astimezone().replace(tzinfo=None)
+            day = (local - timedelta(hours=reset_hour)).replace(hour=0, minute=0, second=0, microsecond=0)
+            return (day + timedelta(hours=reset_hour)).astimezone().timestamp()
+        width = self.width.total_seconds()
+        return math.floor(timestamp.timestamp() / width) * width
+
+
+RESOLUTIONS: Dict[str, Resolution] = {
+    "1m": Resolution("1m", timedelta(minutes=1), timedelta(days=7)),
+    "15m": Resolution("15m", timedelta(minutes=15), timedelta(days=90)),
+    "1d": Resolution("1d", None, None),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    machine_id TEXT NOT NULL,
+    resolution TEXT NOT NULL,
+    start_ts REAL NOT NULL,
+    count INTEGER NOT NULL,
+    sum REAL NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    sketch TEXT NOT NULL,
+    PRIMARY KEY (machine_id, resolution, start_ts)
+) WITHOUT ROWID;
+"""
+
+
+class QuantileSketch:
+    """Mergeable log-bucket sketch with bounded relative error.
+
+    Values are counted in buckets whose bounds grow by ``gamma`` so a
+    quantile is accurate to within ``relative_accuracy`` of the true value,
+    whatever the spread of cycle times.  Sketches from different buckets can
+    be merged by adding their counts.
+    """
+
+    relative_accuracy = 0.02
+    gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+    _log_gamma = math.log(gamma)
+    min_value = 1e-3
+
+    def __init__(self, counts: Optional[Dict[int, int]] = None) -> None:
+        self.counts: Dict[int, int] = dict(counts or {})
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(max(value, self.min_value)) / self._log_gamma)
+
+    def add(self, value: float) -> None:
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+
+    def merge(self, other: "QuantileSketch") -> None:
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+
+    def quantile(self, q: float) -> Optional[float]:
+        total = sum(self.counts.values())
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen > rank:
+                # Midpoint of the bucket in the sense of relative error.
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return None  # pragma: no cover - unreachable with consistent counts
+
+    def to_json(self) -> str:
+        return json.dumps({str(index): count for index, count in self.counts.items()}, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, payload: str) -> "QuantileSketch":
+        try:
+            raw = json.loads(payload)
+            return cls({int(index): int(count) for index, count in raw.items()})
+        except (TypeError, ValueError, AttributeError):
+            return cls()
+
+
+# -----------------
+# Writer
+
+
+_CONNECTION: Optional[sqlite3.Connection] = None
+_CONNECTION_PATH: Optional[Path] = None
+_LOCK = threading.Lock()
+_LAST_PRUNE = 0.0
+
+
+def _writer_connection() -> sqlite3.Connection:
+    global _CONNECTION, _CONNECTION_PATH
+    if _CONNECTION is not None and _CONNECTION_PATH == ROLLUPS_PATH:
+        return _CONNECTION
+    if _CONNECTION is not None:
+        _CONNECTION.close()
+    ensure_config_dir()
+    connection = sqlite3.connect(str(ROLLUPS_PATH), timeout=5.0, isolation_level=None, check_same_thread=False)
+    try:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(_SCHEMA)
+    except sqlite3.Error:
+        connection.close()
+        raise
+    _CONNECTION, _CONNECTION_PATH = connection, ROLLUPS_PATH
+    return connection
+
+
+def _prune(connection: sqlite3.Connection, now: float) -> None:
+    for resolution in RESOLUTIONS.values():
+        if resolution.retention is None:
+            continue
+        connection.execute(
+            "DELETE FROM rollups WHERE resolution = ? AND start_ts < ?",
+            (resolution.name, now - resolution.retention.total_seconds()),
+        )
+
+
+def record_cycle(machine_id: str, timestamp: datetime, cycle_seconds: float, reset_hour: int = 0) -> None:
+    """Add one cycle time to the bucket of every resolution containing ``timestamp``."""
+
+    record_cycles(machine_id, [(timestamp, cycle_seconds)], reset_hour)
+
+
+def record_cycles(machine_id: str, cycles: Iterable[Tuple[datetime, float]], reset_hour: int = 0) -> None:
+    """Add ``(timestamp, cycle seconds)`` pairs to their buckets in one transaction.
+
+    ``reset_hour`` is the hour the daily buckets start at.
+    """
+
+    global _LAST_PRUNE
+    pending: Dict[Tuple[str, float], List[float]] = {}
+    for timestamp, cycle_seconds in cycles:
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        for resolution in RESOLUTIONS.values():
+            start_ts = resolution.bucket_start(timestamp, reset_hour)
+            pending.setdefault((resolution.name, start_ts), []).append(cycle_seconds)
+    if not pending:
+        return
+    with _LOCK:
+        connection = _writer_connection()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            for (resolution_name, start_ts), values in pending.items():
+                key = (machine_id, resolution_name, start_ts)
+                row = connection.execute(
+                    "SELECT count, sum, min, max, sketch FROM rollups "
+                    "WHERE machine_id = ? AND resolution = ? AND start_ts = ?",
+                    key,
+                ).fetchone()
+                if row is None:
+                    sketch = QuantileSketch()
+                    count, total, minimum, maximum = 0, 0.0, math.inf, -math.inf
+                else:
+                    count, total, minimum, maximum, payload = row
+                    sketch = QuantileSketch.from_json(payload)
+                for value in values:
+                    sketch.add(value)
+                connection.execute(
+                    "INSERT OR REPLACE INTO rollups (machine_id, resolution, start_ts, count, sum, min, max, sketch) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        *key,
+                        count + len(values),
+                        total + sum(values),
+                        min(minimum, *values),
+                        max(maximum, *values),
+                        sketch.to_json(),
+                    ),
+                )
+            now = time.time()
+            if now - _LAST_PRUNE >= PRUNE_INTERVAL_SECONDS:
+                _prune(connection, now)
+                _LAST_PRUNE = now
+            connection.execute("COMMIT")
+        except sqlite3.Error:
+            try:
+                connection.execute("ROLLBACK")
+            except sqlite3.Error:
+                LOGGER.debug("Rollback of rollup update failed", exc_info=True)
+            raise
+
+
+# -----------------
+# Queries
+
+
+def _bucket_summary(
+    count: int, total: float, minimum: Optional[float], maximum: Optional[float], sketch: QuantileSketch
+) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {
+        "count": count,
+        "sum_seconds": total,
+        "mean_seconds": total / count if count else None,
+        "min_seconds": minimum,
+        "max_seconds": maximum,
+    }
+    for q in SUMMARY_QUANTILES:
+        summary[f"p{int(q * 100)}_seconds"] = sketch.quantile(q)
+    return summary
+
+
+def query_rollups(
+    machine_id: str,
+    resolution: str = "15m",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    path: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """Return the buckets of ``resolution`` between ``start`` and ``end`` plus their combined summary."""
+
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown rollup resolution {resolution!r}; expected one of {', '.join(RESOLUTIONS)}")
+    database = path or ROLLUPS_PATH
+    clauses = ["machine_id = ?", "resolution = ?"]
+    params: List[Any] = [machine_id, resolution]
+    for bound, operator in ((start, ">="), (end, "<")):
+        if bound is not None:
+            if bound.tzinfo is None:
+                bound = bound.replace(tzinfo=timezone.utc)
+            clauses.append(f"start_ts {operator} ?")
+            params.append(bound.timestamp())
+
+    rows: List[Any] = []
+    if database.exists():
+        connection = sqlite3.connect(f"file:{database}?mode=ro", uri=True, timeout=5.0)
+        try:
+            rows = connection.execute(
+                f"SELECT start_ts, count, sum, min, max, sketch FROM rollups WHERE {' AND '.join(clauses)} "
+                "ORDER BY start_ts",
+                params,
+            ).fetchall()
+        finally:
+            connection.close()
+
+    buckets = []
+    combined = QuantileSketch()
+    count_total, sum_total = 0, 0.0
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    for start_ts, count, total, low, high, payload in rows:
+        sketch = QuantileSketch.from_json(payload)
+        combined.merge(sketch)
+        count_total += count
+        sum_total += total
+        minimum = low if minimum is None else min(minimum, low)
+        maximum = high if maximum is None else max(maximum, high)
+        bucket = _bucket_summary(count, total, low, high, sketch)
+        bucket["start"] = datetime.fromtimestamp(start_ts, timezone.utc).isoformat()
+        buckets.append(bucket)
+
+    return {
+        "machine_id": machine_id,
+        "resolution": resolution,
+        "buckets": buckets,
+        "summary": _bucket_summary(count_total, sum_total, minimum, maximum, combined),
+    }
@@ -3,25 +3,39 @@
 from __future__ import annotations
 
 import logging
-import os
 import signal
 import sys
 import threading
-from datetime import datetime
+import time
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
+from . import startup_profile
 from .config import AppConfig, load_config
-from .gpio_monitor import CycleMonitor, GPIOUnavailableError
-from .updater import determine_repo_path, sync_environment, update_repository
+from .instrumentation import InstrumentationPublisher
+from .log_pipeline import configure_logging
+from .low_jitter import CaptureTuning, JitterProbe, tune_garbage_collector
+from .updater import UPDATE_RESTART_EXIT_CODE, BackgroundUpdater, auto_update_enabled, determine_repo_path
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    from .gpio_monitor import CycleMonitor
 
 LOGGER = logging.getLogger(__name__)
 _STOP_EVENT = threading.Event()
+_RELOAD_EVENT = threading.Event()
+_EXIT_CODE = 0
 
 
 def _handle_signal(signum: int, _frame: Optional[object]) -> None:
     LOGGER.info("Received signal %s; stopping monitor", signum)
     _STOP_EVENT.set()
+    _RELOAD_EVENT.set()  # wakes the main loop
+
+
+def _handle_reload_signal(signum: int, _frame: Optional[object]) -> None:
+    LOGGER.info("Received signal %s; reloading configuration", signum)
+    _RELOAD_EVENT.set()
 
 
 def _log_cycle_event(timestamp: datetime) -> None:
@@ -29,9 +43,14 @@ def _log_cycle_event(timestamp: datetime) -> None:
 
 
 def _install_signal_handlers() -> None:
-    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+    handlers = (
+        (signal.SIGTERM, _handle_signal),
+        (signal.SIGINT, _handle_signal),
+        (signal.SIGHUP, _handle_reload_signal),
+    )
+    for sig, handler in handlers:
         try:
-            signal.signal(sig, _handle_signal)
+            signal.signal(sig, handler)
         except ValueError:
             # Signal handling is only permitted in the main thread; if this is
             # not the main thread we simply skip installing handlers.
@@ -45,33 +64,99 @@ def _summarize_config(config: AppConfig) -> str:
     )
 
 
-def _refresh_code() -> None:
-    repo_path = determine_repo_path(Path(__file__).resolve().parents[2])
-    extras = os.environ.get("FW_CYCLE_MONITOR_INSTALL_EXTRAS")
+def _reload_config(monitor: CycleMonitor, publisher: InstrumentationPublisher) -> InstrumentationPublisher:
+    """Apply ``config.json`` to the running monitor without restarting the process."""
 
-    LOGGER.info("Ensuring repository at %s is up to date", repo_path)
-    if update_repository(repo_path):
-        LOGGER.info("Repository updated; refreshing Python package")
-        if not sync_environment(repo_path, extras):
-            LOGGER.warning(
-                "Failed to refresh installed package; the service may run with stale dependencies"
-            )
+    global _EXIT_CODE
+    config = load_config()
+    previous_machine = monitor.config.machine_id
+    try:
+        changed = monitor.reload(config)
+    except Exception:
+        # The monitor may be left without edge detection; let systemd restart it.
+        LOGGER.exception("Failed to apply the reloaded configuration; stopping")
+        _EXIT_CODE = 1
+        _STOP_EVENT.set()
+        return publisher
+    if not changed:
+        LOGGER.info("Configuration unchanged; nothing to reload")
+        return publisher
+    LOGGER.info("Reloaded configuration: %s", _summarize_config(config))
+    if config.machine_id != previous_machine:
+        publisher.stop()
+        publisher = InstrumentationPublisher(config.machine_id)
+        publisher.start()
+    return publisher
+
+
+def _request_update_restart() -> None:
+    global _EXIT_CODE
+    LOGGER.info("Update installed; restarting service to load the new code")
+    _EXIT_CODE = UPDATE_RESTART_EXIT_CODE
+    _STOP_EVENT.set()
+    _RELOAD_EVENT.set()
 
 
-def main() -> int:
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+def _start_updater(monitor: CycleMonitor) -> Optional[BackgroundUpdater]:
+    """Schedule update checks in the background once monitoring is live."""
+
+    if not auto_update_enabled():
+        LOGGER.info("Automatic updates disabled")
+        return None
+
+    started = time.monotonic()
+
+    def idle_seconds() -> float:
+        last_event = monitor.stats.last_event_time
+        if last_event is None:
+            return time.monotonic() - started
+        return (datetime.now(timezone.utc) - last_event).total_seconds()
+
+    repo_path = determine_repo_path(Path(__file__).resolve().parents[2])
+    updater = BackgroundUpdater.from_environment(
+        repo_path,
+        idle_seconds=idle_seconds,
+        on_updated=_request_update_restart,
     )
+    updater.start()
+    LOGGER.info(
+        "Background updater scheduled for %s (first check in %ss, idle period %ss)",
+        repo_path,
+        int(updater.initial_delay),
+        int(updater.idle_period),
+    )
+    return updater
 
-    _refresh_code()
 
-    config = load_config()
+def main() -> int:
+    # Logging runs on its own thread so the capture path only pays an enqueue.
+    listener = configure_logging(logging.INFO)
+    try:
+        return _run()
+    finally:
+        listener.stop()
+
+
+def _run() -> int:
+    with startup_profile.phase("load configuration"):
+        config = load_config()
     LOGGER.info("Loaded configuration: %s", _summarize_config(config))
 
-    monitor = CycleMonitor(config, callback=_log_cycle_event)
+    with startup_profile.phase("import gpio_monitor"):
+        from .gpio_monitor import CycleMonitor, GPIOUnavailableError
+
+    tuning = CaptureTuning.from_environment()
+    if tuning is not None:
+        LOGGER.info("Low-jitter mode enabled (capture CPU %s, priority %s)", tuning.cpu, tuning.priority)
+        tuning.isolate_process()
+    monitor = CycleMonitor(
+        config,
+        callback=_log_cycle_event,
+        capture_tuning=tuning.tune_current_thread if tuning is not None else None,
+    )
     try:
-        monitor.start()
+        with startup_profile.phase("start monitor"):
+            monitor.start()
     except GPIOUnavailableError as exc:
         LOGGER.error("GPIO is unavailable: %s", exc)
         return 1
@@ -81,22 +166,37 @@ def main() -> int:
 
     _install_signal_handlers()
     LOGGER.info("Cycle monitor started; waiting for events")
+    startup_profile.report()
+    publisher = InstrumentationPublisher(config.machine_id)
+    publisher.start()
+    updater = _start_updater(monitor)
+    probe = JitterProbe(tuning)
+    probe.start()
+    if tuning is not None:
+        tune_garbage_collector()
 
     try:
-        while not _STOP_EVENT.wait(timeout=1):
-            continue
+        while not _STOP_EVENT.is_set():
+            if not _RELOAD_EVENT.wait(timeout=1) or _STOP_EVENT.is_set():
+                continue
+            _RELOAD_EVENT.clear()
+            publisher = _reload_config(monitor, publisher)
     except KeyboardInterrupt:
         LOGGER.info("Keyboard interrupt received; stopping monitor")
     finally:
+        if updater is not None:
+            updater.stop()
+        probe.stop()
         LOGGER.info("Stopping cycle monitor")
         try:
             monitor.stop()
         except Exception:  # pragma: no cover - best effort cleanup
             LOGGER.exception("Error while stopping cycle monitor")
+        publisher.stop()
 
     pending = monitor.stats.events_logged
     LOGGER.info("Monitor stopped. Total events logged this session: %s", pending)
-    return 0
+    return _EXIT_CODE
 
 
 if __name__ == "__main__":  # pragma: no cover
@@ -0,0 +1,124 @@
+"""Per-machine JSON files ("shards") for runtime state and metrics.
+
+Each machine's record lives in its own small file, so an update reads and
+rewrites only that machine's data no matter how many machines share the
+configuration directory.  Files are replaced atomically (write a temporary
+sibling, then rename), which lets readers open them without any locking: they
+see either the previous or the new version, never a partial one.
+
+Writers that read, modify and write back a shard (:func:`update_shard`) take
+an exclusive ``fcntl`` lock on a ``.lock`` sibling for the duration, so the
+service and the GUI can update the same machine without losing each other's
+changes.  On platforms without ``fcntl`` the lock is skipped.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:  # pragma: no cover - platform dependent
+    import fcntl
+except ImportError:  # pragma: no cover - Windows development machines
+    fcntl = None  # type: ignore[assignment]
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["locked_file", "read_shard", "remove_shard", "shard_path", "update_shard", "write_shard"]
+
+_UNSAFE_CHARACTERS = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def shard_path(directory: Path, machine_id: str) -> Path:
+    """Return the shard file for ``machine_id`` inside ``directory``."""
+
+    name = _UNSAFE_CHARACTERS.sub("_", machine_id.strip().upper()) or "_"
+    return directory / f"{name}.json"
+
+
+def read_shard(path: Path) -> Optional[Dict[str, Any]]:
+    """Return the shard at ``path``, or ``None`` when it is missing or unreadable."""
+
+    try:
+        raw = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    except OSError as exc:
+        LOGGER.warning("Failed to read %s: %s", path, exc)
+        return None
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError as exc:
+        LOGGER.warning("Failed to parse %s: %s", path, exc)
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def write_shard(path: Path, data: Dict[str, Any]) -> None:
+    """Atomically replace the shard at ``path`` with ``data``.
+
+    Raises ``OSError`` when the file cannot be written.
+    """
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per writer so concurrent writers never share a temporary file.
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp_path.write_text(json.dumps(data, separators=(",", ":")))
+        tmp_path.replace(path)
+    except OSError:
+        try:
+            tmp_path.unlink(missing_ok=True)  # type: ignore[arg-type]
+        except OSError:
+            LOGGER.debug("Failed to remove temporary file %s", tmp_path, exc_info=True)
+        raise
+
+
+@contextmanager
+def locked_file(path: Path) -> Iterator[None]:
+    """Hold an exclusive ``fcntl`` lock on the ``.lock`` sibling of ``path``."""
+
+    if fcntl is None:
+        yield
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(path.name + ".lock"), "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def update_shard(
+    path: Path,
+    mutate: Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]],
+) -> None:
+    """Read, modify and write back the shard at ``path`` under an exclusive lock.
+
+    ``mutate`` receives the current content (``None`` if there is none) and
+    returns the new content, or ``None`` to remove the shard.
+    """
+
+    with locked_file(path):
+        data = mutate(read_shard(path))
+        if data is None:
+            path.unlink(missing_ok=True)  # type: ignore[arg-type]
+        else:
+            write_shard(path, data)
+
+
+def remove_shard(path: Path) -> None:
+    """Delete the shard at ``path`` and its lock file, if present."""
+
+    for target in (path, path.with_name(path.name + ".lock")):
+        try:
+            target.unlink(missing_ok=True)  # type: ignore[arg-type]
+        except OSError:
+            LOGGER.warning("Failed to remove %s", target, exc_info=True)
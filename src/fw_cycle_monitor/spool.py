@@ -0,0 +1,293 @@
+"""Append-only journal for cycle rows that could not reach the CSV yet."""
+
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["OverflowSpool", "PendingSpool", "parse_row_timestamp"]
+
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class PendingSpool:
+    """Journal of preformatted CSV rows plus a committed-offset marker.
+
+    Rows are only ever appended to ``<csv>.pending``.  When the CSV becomes
+    writable again the undrained byte range is copied into it in one pass and
+    ``<csv>.pending.offset`` records how far the journal has been drained.
+    Once everything has been drained the journal and marker are removed, so
+    compaction never rewrites rows that are still pending.  A crash between
+    the copy and the marker update can replay the last drained batch, so the
+    journal offers at-least-once delivery.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.offset_path = path.with_name(path.name + ".offset")
+        self._offset = 0
+        self._size = 0
+        self._rows = 0
+        self._oldest: Optional[datetime] = None
+
+    # -----------------
+    # Inspection
+
+    @property
+    def pending_bytes(self) -> int:
+        return max(0, self._size - self._offset)
+
+    @property
+    def pending_rows(self) -> int:
+        return self._rows
+
+    @property
+    def oldest_timestamp(self) -> Optional[datetime]:
+        return self._oldest
+
+    def age_seconds(self, now: Optional[datetime] = None) -> float:
+        """Return how long the oldest pending row has been waiting."""
+
+        if self._oldest is None:
+            return 0.0
+        current = now or datetime.now(timezone.utc)
+        return max(0.0, (current - self._oldest).total_seconds())
+
+    # -----------------
+    # Lifecycle
+
+    def load(self) -> None:
+        """Recover the committed offset and pending statistics from disk."""
+
+        self._offset = 0
+        self._size = 0
+        self._rows = 0
+        self._oldest = None
+        try:
+            self._size = self.path.stat().st_size
+        except FileNotFoundError:
+            self._remove_offset_marker()
+            return
+        except OSError:
+            LOGGER.exception("Failed to inspect pending spool %s", self.path)
+            return
+
+        if self.offset_path.exists():
+            try:
+                self._offset = int(self.offset_path.read_text().strip() or 0)
+            except (OSError, ValueError):
+                LOGGER.warning("Invalid spool offset in %s; replaying %s", self.offset_path, self.path)
+                self._offset = 0
+        self._offset = min(max(self._offset, 0), self._size)
+
+        try:
+            with self.path.open("rb") as spool_file:
+                spool_file.seek(self._offset)
+                first_line = spool_file.readline()
+                self._oldest = parse_row_timestamp(first_line)
+                rows = 1 if first_line.strip() else 0
+                for chunk in iter(lambda: spool_file.read(_COPY_CHUNK_SIZE), b""):
+                    rows += chunk.count(b"\n")
+                self._rows = rows
+        except OSError:
+            LOGGER.exception("Failed to read pending events from %s", self.path)
+
+    def append(self, payload: bytes, rows: int) -> None:
+        """Append ``rows`` preformatted rows; raises ``OSError`` on failure."""
+
+        if not payload:
+            return
+        created = not self.path.exists()
+        with self.path.open("ab") as spool_file:
+            spool_file.write(payload)
+        if created:
+            _ensure_mode(self.path, 0o664)
+        if self._rows == 0:
+            self._oldest = parse_row_timestamp(payload.split(b"\n", 1)[0])
+        self._size += len(payload)
+        self._rows += rows
+
+    def drain_into(self, target: BinaryIO) -> int:
+        """Copy every pending byte into ``target`` and return the end offset.
+
+        The caller must invoke :meth:`mark_drained` with the returned offset
+        once the target write is known to have succeeded.
+        """
+
+        with self.path.open("rb") as spool_file:
+            spool_file.seek(self._offset)
+            shutil.copyfileobj(spool_file, target, _COPY_CHUNK_SIZE)
+            return spool_file.tell()
+
+    def mark_drained(self, offset: int) -> None:
+        """Record that bytes up to ``offset`` reached the CSV and compact."""
+
+        self._offset = offset
+        if self._offset >= self._size:
+            self.compact()
+            return
+        tmp_path = self.offset_path.with_name(self.offset_path.name + ".tmp")
+        try:
+            tmp_path.write_text(str(self._offset))
+            tmp_path.replace(self.offset_path)
+        except OSError:
+            LOGGER.warning("Unable to record spool offset in %s", self.offset_path, exc_info=True)
+
+    def compact(self) -> None:
+        """Remove the fully drained journal and its offset marker."""
+
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError:
+            LOGGER.debug("Unable to remove drained spool file %s", self.path, exc_info=True)
+            return
+        self._remove_offset_marker()
+        self._offset = 0
+        self._size = 0
+        self._rows = 0
+        self._oldest = None
+
+    def _remove_offset_marker(self) -> None:
+        try:
+            self.offset_path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError:
+            LOGGER.debug("Unable to remove spool offset %s", self.offset_path, exc_info=True)
+
+
+class _Segment:
+    __slots__ = ("first", "last", "spool")
+
+    def __init__(self, first: int, spool: PendingSpool) -> None:
+        self.first = first
+        self.last = first
+        self.spool = spool
+
+
+class OverflowSpool:
+    """Local spool for rows that did not fit in the writer's queue.
+
+    Rows are stored in segments, one :class:`PendingSpool` each, named after
+    the sequence number of the first batch they hold.  The writer numbers
+    every batch it takes from the queue and every spill of a full queue, and
+    only drains segments numbered below its current batch, so rows reach the
+    CSV in the order they were recorded even when a spill happens while an
+    older batch is still being written.
+
+    The class does no locking of its own; the monitor serialises changes.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._segments: List[_Segment] = []
+
+    @property
+    def pending_rows(self) -> int:
+        return sum(segment.spool.pending_rows for segment in self._segments)
+
+    @property
+    def pending_bytes(self) -> int:
+        return sum(segment.spool.pending_bytes for segment in self._segments)
+
+    @property
+    def oldest_timestamp(self) -> Optional[datetime]:
+        return self._segments[0].spool.oldest_timestamp if self._segments else None
+
+    @property
+    def last_sequence(self) -> int:
+        """Return the highest batch number stored, or ``-1`` when empty."""
+
+        return max((segment.last for segment in self._segments), default=-1)
+
+    def age_seconds(self, now: Optional[datetime] = None) -> float:
+        return self._segments[0].spool.age_seconds(now) if self._segments else 0.0
+
+    def load(self) -> None:
+        """Recover the undrained segments left by a previous run."""
+
+        self._segments = []
+        try:
+            paths = sorted(self.directory.glob("*.pending"))
+        except OSError:
+            LOGGER.exception("Failed to list overflow spool %s", self.directory)
+            return
+        for path in paths:
+            try:
+                first = int(path.name.split(".", 1)[0])
+            except ValueError:
+                continue
+            spool = PendingSpool(path)
+            spool.load()
+            if spool.pending_bytes:
+                self._segments.append(_Segment(first, spool))
+            else:
+                spool.compact()
+        self._segments.sort(key=lambda segment: segment.first)
+        for segment in self._segments:
+            segment.last = segment.first
+
+    def append(self, payload: bytes, rows: int, sequence: int, *, merge: bool = True) -> None:
+        """Store batch ``sequence``; raises ``OSError`` on failure.
+
+        With ``merge`` the rows extend the newest segment when every batch in
+        it is older, which keeps a long outage in one file.  Spills that may
+        overtake a batch still being written pass ``merge=False`` so that
+        batch can still be placed before them.
+        """
+
+        if not payload:
+            return
+        newest = self._segments[-1] if self._segments else None
+        if merge and newest is not None and newest.last < sequence:
+            newest.spool.append(payload, rows)
+            newest.last = sequence
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        segment = _Segment(sequence, PendingSpool(self.directory / f"{sequence:012d}.csv.pending"))
+        segment.spool.append(payload, rows)
+        self._segments.append(segment)
+        self._segments.sort(key=lambda item: item.first)
+
+    def segments_before(self, sequence: int) -> List[PendingSpool]:
+        """Return, oldest first, the segments holding batches older than ``sequence``."""
+
+        return [segment.spool for segment in self._segments if segment.first < sequence]
+
+    def mark_drained(self, drained: List[Tuple[PendingSpool, int]]) -> None:
+        """Record drain offsets returned by ``PendingSpool.drain_into``."""
+
+        for spool, offset in drained:
+            spool.mark_drained(offset)
+        self._segments = [segment for segment in self._segments if segment.spool.pending_bytes]
+
+
+def parse_row_timestamp(line: bytes) -> Optional[datetime]:
+    """Return the timestamp in the first column of a CSV row, if any."""
+
+    text = line.decode("utf-8", "replace").strip().split(",", 1)[0]
+    if not text:
+        return None
+    try:
+        timestamp = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp
+
+
+def _ensure_mode(path: Path, mode: int) -> None:
+    try:
+        if path.stat().st_mode & 0o777 != mode:
+            os.chmod(path, mode)
+    except OSError:
+        LOGGER.debug("Unable to adjust permissions for %s", path, exc_info=True)
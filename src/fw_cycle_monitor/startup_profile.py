@@ -0,0 +1,122 @@
+"""Lightweight start-up timeline used to keep cold starts within budget.
+
+Set ``FW_CYCLE_MONITOR_PROFILE_STARTUP=1`` to have each entry point print the
+time spent importing modules and initialising hardware once it is ready.  When
+profiling is disabled :func:`mark` and :func:`phase` cost a single attribute
+lookup so they can stay in the start-up path permanently.
+
+Running the module directly measures the cold-start time of an entry point in
+a fresh interpreter and fails when it exceeds a budget::
+
+    python -m fw_cycle_monitor.startup_profile fw_cycle_monitor.service_runner --budget-ms 400
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+__all__ = ["enabled", "mark", "phase", "report"]
+
+_START = time.perf_counter()
+_ENABLED = os.environ.get("FW_CYCLE_MONITOR_PROFILE_STARTUP", "").strip().lower() in {"1", "true", "yes", "on"}
+_EVENTS: List[Tuple[float, float, str]] = []
+
+#: Entry points that can be measured with ``python -m fw_cycle_monitor.startup_profile``.
+ENTRY_POINTS: Tuple[str, ...] = (
+    "fw_cycle_monitor.gui",
+    "fw_cycle_monitor.launcher",
+    "fw_cycle_monitor.service_runner",
+    "fw_cycle_monitor.remote_supervisor.server",
+    "fw_cycle_monitor.remote_supervisor.cli",
+)
+DEFAULT_BUDGET_MS = 500.0
+
+
+def enabled() -> bool:
+    """Return ``True`` when the start-up timeline is being recorded."""
+
+    return _ENABLED
+
+
+def mark(label: str) -> None:
+    """Record that ``label`` was reached."""
+
+    if _ENABLED:
+        now = time.perf_counter()
+        _EVENTS.append((now, 0.0, label))
+
+
+@contextmanager
+def phase(label: str) -> Iterator[None]:
+    """Record how long the wrapped block took."""
+
+    if not _ENABLED:
+        yield
+        return
+    began = time.perf_counter()
+    try:
+        yield
+    finally:
+        finished = time.perf_counter()
+        _EVENTS.append((finished, finished - began, label))
+
+
+def report(stream=None) -> None:
+    """Write the recorded timeline to ``stream`` (``stderr`` by default)."""
+
+    if not _ENABLED:
+        return
+    stream = stream or sys.stderr
+    stream.write("Start-up timeline (ms since fw_cycle_monitor import):\n")
+    for timestamp, duration, label in _EVENTS:
+        offset = (timestamp - _START) * 1000.0
+        if duration:
+            stream.write(f"  {offset:9.1f}  {label} ({duration * 1000.0:.1f} ms)\n")
+        else:
+            stream.write(f"  {offset:9.1f}  {label}\n")
+    stream.flush()
+
+
+def measure_import(module: str, python: Optional[str] = None) -> float:
+    """Return the wall-clock milliseconds a fresh interpreter needs to import ``module``."""
+
+    began = time.perf_counter()
+    subprocess.run([python or sys.executable, "-c", f"import {module}"], check=True)
+    return (time.perf_counter() - began) * 1000.0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check entry point cold-start time against a budget")
+    parser.add_argument("modules", nargs="*", default=list(ENTRY_POINTS), help="Modules to import")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=DEFAULT_BUDGET_MS,
+        help="Maximum import time per module in milliseconds",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per module; the fastest run is used")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for module in args.modules:
+        try:
+            elapsed = min(measure_import(module) for _ in range(max(1, args.repeat)))
+        except subprocess.CalledProcessError:
+            print(f"FAIL {module}: import raised an error")
+            failures += 1
+            continue
+        verdict = "ok  " if elapsed <= args.budget_ms else "FAIL"
+        if elapsed > args.budget_ms:
+            failures += 1
+        print(f"{verdict} {module}: {elapsed:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -1,4 +1,10 @@
-"""Persistence helpers for cycle monitor runtime state."""
+"""Persistence helpers for cycle monitor runtime state.
+
+Each machine's state is stored in its own file under ``state/`` in the
+configuration directory (see :mod:`fw_cycle_monitor.shards`).  The single
+``state.json`` used by earlier versions is still read for machines that have
+no file of their own yet.
+"""
 
 from __future__ import annotations
 
@@ -9,9 +15,12 @@ from datetime import datetime
 from typing import Any, Dict, Optional
 
 from .config import CONFIG_DIR, ensure_config_dir
+from .shards import read_shard, remove_shard, shard_path, write_shard
 
 LOGGER = logging.getLogger(__name__)
 
+STATE_DIR = CONFIG_DIR / "state"
+#: Legacy single-file state shared by all machines.
 STATE_PATH = CONFIG_DIR / "state.json"
 _STATE_TMP_SUFFIX = ".tmp"
 
@@ -51,16 +60,21 @@ def _save_state_blob(data: Dict[str, Any]) -> None:
             LOGGER.debug("Failed to remove temporary state file %s", tmp_path, exc_info=True)
 
 
-def load_cycle_state(machine_id: str) -> Optional[MachineState]:
-    """Load the stored state for ``machine_id`` if it exists."""
-
+def _load_legacy_state(machine_id: str) -> Optional[Dict[str, Any]]:
     data = _load_state_blob()
     machines = data.get("machines")
     if not isinstance(machines, dict):
         LOGGER.debug("State file %s does not contain machine mapping", STATE_PATH)
         return None
+    return machines.get(machine_id)
+
 
-    raw_state = machines.get(machine_id)
+def load_cycle_state(machine_id: str) -> Optional[MachineState]:
+    """Load the stored state for ``machine_id`` if it exists."""
+
+    raw_state = read_shard(shard_path(STATE_DIR, machine_id))
+    if raw_state is None:
+        raw_state = _load_legacy_state(machine_id)
     if not isinstance(raw_state, dict):
         LOGGER.debug("No stored state found for machine %s", machine_id)
         return None
@@ -83,24 +97,26 @@ def load_cycle_state(machine_id: str) -> Optional[MachineState]:
 
 
 def save_cycle_state(machine_id: str, *, last_cycle: int, last_timestamp: datetime) -> None:
-    """Persist the latest cycle details for ``machine_id``."""
+    """Persist the latest cycle details for ``machine_id``.
 
-    data = _load_state_blob()
-    machines = data.setdefault("machines", {})
-    if not isinstance(machines, dict):
-        machines = {}
-        data["machines"] = machines
+    Only this machine's file is rewritten; the record is replaced whole, so no
+    lock is needed.
+    """
 
-    machines[machine_id] = {
+    path = shard_path(STATE_DIR, machine_id)
+    record = {
         "last_cycle": int(last_cycle),
         "last_timestamp": last_timestamp.isoformat(),
     }
-
-    _save_state_blob(data)
+    try:
+        write_shard(path, record)
+    except OSError:
+        LOGGER.exception("Unable to persist cycle state to %s", path)
+        return
     LOGGER.debug(
         "Persisted cycle state for %s to %s (cycle=%s, timestamp=%s)",
         machine_id,
-        STATE_PATH,
+        path,
         last_cycle,
         last_timestamp.isoformat(),
     )
@@ -109,6 +125,9 @@ def save_cycle_state(machine_id: str, *, last_cycle: int, last_timestamp: dateti
 def clear_cycle_state(machine_id: str) -> None:
     """Remove stored state for ``machine_id``."""
 
+    remove_shard(shard_path(STATE_DIR, machine_id))
+    if not STATE_PATH.exists():
+        return
     data = _load_state_blob()
     machines = data.get("machines")
     if not isinstance(machines, dict) or machine_id not in machines:
@@ -2,15 +2,35 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
 import os
 import subprocess
 import sys
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
+
+from .config import CONFIG_DIR, ensure_config_dir
 
 LOGGER = logging.getLogger(__name__)
 
+#: Exit status used when a process stops so systemd restarts it on new code.
+UPDATE_RESTART_EXIT_CODE = 75
+
+FINGERPRINT_PATH = CONFIG_DIR / "update_fingerprint.json"
+GIT_TIMEOUT_SECONDS = 120.0
+
+DEFAULT_UPDATE_DELAY = 60.0
+DEFAULT_UPDATE_INTERVAL = 3600.0
+DEFAULT_UPDATE_IDLE_SECONDS = 300.0
+DEFAULT_SOURCE_CHECK_INTERVAL = 60.0
+#: How long changed sources must stay unchanged before a watcher restarts
+#: without seeing the matching environment refresh recorded.
+DEFAULT_SOURCE_SETTLE_SECONDS = 900.0
+
 
 def _run_git_command(args: list[str], repo_path: Path) -> subprocess.CompletedProcess[str]:
     return subprocess.run(
@@ -19,7 +39,8 @@ def _run_git_command(args: list[str], repo_path: Path) -> subprocess.CompletedPr
         check=True,
         capture_output=True,
         text=True,
-        env={**os.environ, "LC_ALL": "C"},
+        timeout=GIT_TIMEOUT_SECONDS,
+        env={**os.environ, "LC_ALL": "C", "GIT_TERMINAL_PROMPT": "0"},
     )
 
 
@@ -45,48 +66,64 @@ def determine_repo_path(default: Optional[Path] = None) -> Path:
     return Path(__file__).resolve().parents[2]
 
 
-def update_repository(repo_path: Path, remote: str = "origin", branch: str = "main") -> bool:
-    """Fetch updates from the remote and fast-forward if needed.
+def check_for_update(repo_path: Path, remote: str = "origin", branch: str = "main") -> Optional[str]:
+    """Fetch ``remote`` and return its revision when it differs from ``HEAD``.
 
-    Returns ``True`` when a new revision was pulled.
+    Returns ``None`` when the checkout is current or the check failed.
     """
 
     git_dir = repo_path / ".git"
     if not git_dir.exists():
         LOGGER.info("%s is not a git repository; skipping update", repo_path)
-        return False
+        return None
 
     try:
         remotes = _run_git_command(["remote"], repo_path).stdout.splitlines()
-    except subprocess.CalledProcessError as exc:
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as exc:
         LOGGER.warning("Git command failed: %s", exc)
-        return False
+        return None
 
     if remote not in remotes:
         LOGGER.info("Remote '%s' is not configured; skipping update", remote)
-        return False
+        return None
 
     try:
         _run_git_command(["fetch", remote], repo_path)
         local_rev = _run_git_command(["rev-parse", "HEAD"], repo_path).stdout.strip()
         remote_rev = _run_git_command(["rev-parse", f"{remote}/{branch}"], repo_path).stdout.strip()
-    except subprocess.CalledProcessError as exc:
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as exc:
         LOGGER.warning("Git command failed: %s", exc)
-        return False
+        return None
 
     if local_rev == remote_rev:
         LOGGER.info("Repository already up to date")
-        return False
+        return None
+    return remote_rev
 
-    LOGGER.info("Updating repository to %s", remote_rev)
+
+def _fast_forward(repo_path: Path, remote: str, branch: str) -> bool:
     try:
         _run_git_command(["pull", "--ff-only", remote, branch], repo_path)
         return True
-    except subprocess.CalledProcessError:
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
         LOGGER.exception("Failed to fast-forward repository")
         return False
 
 
+def update_repository(repo_path: Path, remote: str = "origin", branch: str = "main") -> bool:
+    """Fetch updates from the remote and fast-forward if needed.
+
+    Returns ``True`` when a new revision was pulled.
+    """
+
+    remote_rev = check_for_update(repo_path, remote, branch)
+    if remote_rev is None:
+        return False
+
+    LOGGER.info("Updating repository to %s", remote_rev)
+    return _fast_forward(repo_path, remote, branch)
+
+
 def relaunch_if_updated(repo_path: Path, module: str) -> Optional[int]:
     """Update the repository and relaunch the provided module when changed.
 
@@ -132,3 +169,307 @@ def sync_environment(repo_path: Path, extras: Optional[str] = None) -> bool:
         return False
 
     return True
+
+
+def compute_source_fingerprint(repo_path: Path) -> str:
+    """Return a hash of ``pyproject.toml`` and the Python sources under ``src``.
+
+    Only these files influence what ``pip install`` places into the virtual
+    environment, so documentation or script changes do not force a reinstall.
+    """
+
+    digest = hashlib.sha256()
+    candidates = [repo_path / "pyproject.toml"]
+    src_dir = repo_path / "src"
+    if src_dir.is_dir():
+        candidates.extend(sorted(src_dir.rglob("*.py")))
+
+    for path in candidates:
+        try:
+            content = path.read_bytes()
+        except OSError:
+            continue
+        digest.update(str(path.relative_to(repo_path)).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(content)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _load_synced_fingerprint(repo_path: Path) -> Optional[str]:
+    if not FINGERPRINT_PATH.exists():
+        return None
+    try:
+        data = json.loads(FINGERPRINT_PATH.read_text())
+    except (json.JSONDecodeError, OSError):
+        LOGGER.debug("Unable to read update fingerprint %s", FINGERPRINT_PATH, exc_info=True)
+        return None
+    if not isinstance(data, dict):
+        return None
+    value = data.get(str(repo_path))
+    return value if isinstance(value, str) else None
+
+
+def _store_synced_fingerprint(repo_path: Path, fingerprint: str) -> None:
+    data: dict[str, str] = {}
+    if FINGERPRINT_PATH.exists():
+        try:
+            loaded = json.loads(FINGERPRINT_PATH.read_text())
+            if isinstance(loaded, dict):
+                data = {str(key): str(value) for key, value in loaded.items()}
+        except (json.JSONDecodeError, OSError):
+            LOGGER.debug("Replacing unreadable update fingerprint %s", FINGERPRINT_PATH, exc_info=True)
+    data[str(repo_path)] = fingerprint
+
+    tmp_path = FINGERPRINT_PATH.with_suffix(FINGERPRINT_PATH.suffix + ".tmp")
+    try:
+        ensure_config_dir()
+        tmp_path.write_text(json.dumps(data, indent=2))
+        tmp_path.replace(FINGERPRINT_PATH)
+    except OSError:
+        LOGGER.warning("Unable to persist update fingerprint to %s", FINGERPRINT_PATH, exc_info=True)
+
+
+def _env_seconds(name: str, default: float) -> float:
+    raw = os.environ.get(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        LOGGER.warning("Ignoring invalid %s value: %s", name, raw)
+        return default
+    return max(0.0, value)
+
+
+def auto_update_enabled() -> bool:
+    """Return ``False`` when ``FW_CYCLE_MONITOR_AUTO_UPDATE`` disables updates."""
+
+    value = os.environ.get("FW_CYCLE_MONITOR_AUTO_UPDATE", "1")
+    return value.strip().lower() not in {"0", "false", "no", "off"}
+
+
+class BackgroundUpdater:
+    """Check for repository updates on a daemon thread.
+
+    The first check runs ``initial_delay`` seconds after :meth:`start` and
+    further checks are rate limited to one every ``interval`` seconds.  When a
+    new revision is available the pull is deferred until ``idle_seconds``
+    reports at least ``idle_period`` seconds without activity, so updates are
+    applied between production runs rather than in the middle of one.  The
+    virtual environment is only reinstalled when the source fingerprint
+    changed.  ``on_updated`` is invoked once new code is on disk so the host
+    process can restart itself.
+    """
+
+    def __init__(
+        self,
+        repo_path: Path,
+        *,
+        extras: Optional[str] = None,
+        initial_delay: float = DEFAULT_UPDATE_DELAY,
+        interval: float = DEFAULT_UPDATE_INTERVAL,
+        idle_period: float = DEFAULT_UPDATE_IDLE_SECONDS,
+        idle_seconds: Optional[Callable[[], float]] = None,
+        on_updated: Optional[Callable[[], None]] = None,
+        remote: str = "origin",
+        branch: str = "main",
+    ) -> None:
+        self.repo_path = repo_path
+        self.extras = extras
+        self.initial_delay = initial_delay
+        self.interval = max(interval, 60.0)
+        self.idle_period = idle_period
+        self._idle_seconds = idle_seconds
+        self._on_updated = on_updated
+        self._remote = remote
+        self._branch = branch
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._restart_requested = False
+
+    @classmethod
+    def from_environment(
+        cls,
+        repo_path: Path,
+        *,
+        idle_seconds: Optional[Callable[[], float]] = None,
+        on_updated: Optional[Callable[[], None]] = None,
+    ) -> "BackgroundUpdater":
+        """Build an updater using the ``FW_CYCLE_MONITOR_UPDATE_*`` variables."""
+
+        return cls(
+            repo_path,
+            extras=os.environ.get("FW_CYCLE_MONITOR_INSTALL_EXTRAS"),
+            initial_delay=_env_seconds("FW_CYCLE_MONITOR_UPDATE_DELAY", DEFAULT_UPDATE_DELAY),
+            interval=_env_seconds("FW_CYCLE_MONITOR_UPDATE_INTERVAL", DEFAULT_UPDATE_INTERVAL),
+            idle_period=_env_seconds("FW_CYCLE_MONITOR_UPDATE_IDLE_SECONDS", DEFAULT_UPDATE_IDLE_SECONDS),
+            idle_seconds=idle_seconds,
+            on_updated=on_updated,
+        )
+
+    @property
+    def restart_requested(self) -> bool:
+        """Report whether new code was installed and a restart is pending."""
+
+        return self._restart_requested
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="background-updater", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1)
+        self._thread = None
+
+    def _run(self) -> None:  # pragma: no cover - background worker
+        if self._stop.wait(self.initial_delay):
+            return
+        while True:
+            try:
+                self.run_once()
+            except Exception:
+                LOGGER.exception("Background update check failed")
+            if self._restart_requested or self._stop.wait(self.interval):
+                return
+
+    def run_once(self) -> bool:
+        """Perform a single update check, returning ``True`` when code changed."""
+
+        LOGGER.info("Checking %s for updates", self.repo_path)
+        remote_rev = check_for_update(self.repo_path, self._remote, self._branch)
+        if remote_rev is None:
+            return False
+
+        LOGGER.info("Update to %s available; waiting for an idle period", remote_rev)
+        if not self._wait_for_quiet_period():
+            return False
+
+        previous = _load_synced_fingerprint(self.repo_path) or compute_source_fingerprint(self.repo_path)
+        LOGGER.info("Updating repository to %s", remote_rev)
+        if not _fast_forward(self.repo_path, self._remote, self._branch):
+            return False
+
+        current = compute_source_fingerprint(self.repo_path)
+        if current == previous:
+            LOGGER.info("Package sources unchanged; skipping environment refresh")
+            return False
+
+        if sync_environment(self.repo_path, self.extras):
+            _store_synced_fingerprint(self.repo_path, current)
+        else:
+            LOGGER.warning(
+                "Failed to refresh installed package; the restarted process may run with stale dependencies"
+            )
+
+        self._restart_requested = True
+        if self._on_updated is not None:
+            try:
+                self._on_updated()
+            except Exception:
+                LOGGER.exception("Update completion callback failed")
+        return True
+
+    def _wait_for_quiet_period(self) -> bool:
+        if self._idle_seconds is None or self.idle_period <= 0:
+            return not self._stop.is_set()
+        while not self._stop.is_set():
+            try:
+                idle = float(self._idle_seconds())
+            except Exception:
+                LOGGER.debug("Idle probe failed; treating process as busy", exc_info=True)
+                idle = 0.0
+            remaining = self.idle_period - idle
+            if remaining <= 0:
+                return True
+            self._stop.wait(min(remaining, 60.0))
+        return False
+
+
+class SourceWatcher:
+    """Notice when the checkout a process was started from has new code.
+
+    Only the monitor service pulls (see :class:`BackgroundUpdater`), so
+    updates wait for a quiet moment on the press.  Other long-running
+    processes on the same checkout, such as the remote supervisor, record the
+    source fingerprint they started with and call ``on_changed`` once the
+    sources on disk differ and the matching environment refresh has been
+    recorded, or the new sources have stayed unchanged for ``settle``
+    seconds, so they restart onto the same code as the monitor.
+    """
+
+    def __init__(
+        self,
+        repo_path: Path,
+        *,
+        interval: float = DEFAULT_SOURCE_CHECK_INTERVAL,
+        settle: float = DEFAULT_SOURCE_SETTLE_SECONDS,
+        on_changed: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.repo_path = repo_path
+        self.interval = max(interval, 1.0)
+        self.settle = settle
+        self.loaded = compute_source_fingerprint(repo_path)
+        self._on_changed = on_changed
+        self._changed_since: Optional[tuple[str, float]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._restart_requested = False
+
+    @property
+    def restart_requested(self) -> bool:
+        """Report whether the sources changed and a restart is pending."""
+
+        return self._restart_requested
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="source-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1)
+        self._thread = None
+
+    def _run(self) -> None:  # pragma: no cover - background worker
+        while not self._stop.wait(self.interval):
+            try:
+                if self.check_once():
+                    return
+            except Exception:
+                LOGGER.exception("Source change check failed")
+
+    def check_once(self) -> bool:
+        """Compare the sources on disk with the loaded ones; ``True`` requests a restart."""
+
+        current = compute_source_fingerprint(self.repo_path)
+        if current == self.loaded:
+            self._changed_since = None
+            return False
+        now = time.monotonic()
+        if self._changed_since is None or self._changed_since[0] != current:
+            # A pull may still be in progress; time the settle from the latest change.
+            self._changed_since = (current, now)
+        if _load_synced_fingerprint(self.repo_path) != current and now - self._changed_since[1] < self.settle:
+            LOGGER.info("Sources under %s changed; waiting for the environment refresh", self.repo_path)
+            return False
+
+        LOGGER.info("Sources under %s changed since start-up", self.repo_path)
+        self._restart_requested = True
+        if self._on_changed is not None:
+            try:
+                self._on_changed()
+            except Exception:
+                LOGGER.exception("Source change callback failed")
+        return True